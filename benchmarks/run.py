@@ -0,0 +1,276 @@
+"""
+Benchmarks for the dollop serve backends.
+
+Times serving of sequences, NumPy arrays, pandas objects, tensors and files across object sizes, serving sizes and
+dims, and writes the results to a JSON file so they can be compared between commits:
+
+    python benchmarks/run.py                          # writes benchmarks/results/<commit>.json
+    python benchmarks/run.py --quick --backend numpy  # smaller objects, one backend
+    python benchmarks/run.py --compare benchmarks/results/<old commit>.json
+
+For each case this reports the throughput (items/s and bytes/s), the time to the first dollop, and the peak memory
+allocated while serving, as traced by tracemalloc (which sees NumPy and Python allocations, but not torch's).
+"""
+
+import argparse
+import gc
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Tuple
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from dollop import serve  # noqa: E402
+
+RESULTS_DIR = pathlib.Path(__file__).resolve().parent / 'results'
+
+
+class Case(NamedTuple):
+    """
+    One benchmark: a way to build the object to serve, and the arguments to serve it with.
+
+    :param backend: The backend being benchmarked.
+    :param name: Unique name of the case, used to match cases between runs.
+    :param setup: Function returning the object to serve, its number of items along the served axis (e.g. the
+        columns when serving along dim 1, or the characters in chars mode) and its size in bytes.
+    :param kwargs: Arguments for dollop.serve.
+    """
+    backend: str
+    name: str
+    setup: Callable[[], Tuple[Any, int, int]]
+    kwargs: Dict[str, Any]
+
+
+def sequence_cases(n_items: int, serving_sizes: List[int]) -> Iterator[Case]:
+
+    def setup():
+        items = list(range(n_items))
+        return items, n_items, sys.getsizeof(items)
+
+    for serving_size in serving_sizes:
+        yield Case('sequence', f'sequence-list-{n_items}-ss{serving_size}', setup, dict(serving_size=serving_size))
+
+    yield Case('sequence', f'sequence-list-{n_items}-ns8', setup, dict(n_servings=8))
+
+
+def numpy_cases(n_items: int, serving_sizes: List[int]) -> Iterator[Case]:
+    import numpy
+
+    def setup(dim):
+        def setup_dim():
+            array = numpy.random.default_rng(0).random((n_items, 16), dtype=numpy.float32)
+            return array, array.shape[dim], array.nbytes
+        return setup_dim
+
+    # Along dim 1 there are only 16 columns to serve.
+    for dim, sizes in ((0, serving_sizes), (1, [1, 4])):
+        for size in sizes:
+            yield Case('numpy', f'numpy-{n_items}x16-dim{dim}-ss{size}', setup(dim), dict(serving_size=size, dim=dim))
+
+    yield Case('numpy', f'numpy-{n_items}x16-dim1-ss4-contiguous', setup(1),
+               dict(serving_size=4, dim=1, contiguous=True))
+
+
+def pandas_cases(n_items: int, serving_sizes: List[int]) -> Iterator[Case]:
+    import numpy
+    import pandas
+
+    def setup():
+        rng = numpy.random.default_rng(0)
+        df = pandas.DataFrame({f'x{i}': rng.random(n_items) for i in range(4)})
+        df['label'] = numpy.arange(n_items).astype(str)
+        return df, n_items, int(df.memory_usage(deep=True).sum())
+
+    for serving_size in serving_sizes:
+        yield Case('pandas', f'pandas-{n_items}-ss{serving_size}', setup, dict(serving_size=serving_size))
+
+    yield Case('pandas', f'pandas-{n_items}-bytes1mb', setup, dict(serving_bytes=1 << 20))
+
+
+def torch_cases(n_items: int, serving_sizes: List[int]) -> Iterator[Case]:
+    import torch
+
+    def setup(dim):
+        def setup_dim():
+            tensor = torch.rand(n_items, 16, generator=torch.Generator().manual_seed(0))
+            return tensor, tensor.shape[dim], tensor.numel() * tensor.element_size()
+        return setup_dim
+
+    # Along dim 1 there are only 16 columns to serve.
+    for dim, sizes in ((0, serving_sizes), (1, [1, 4])):
+        for size in sizes:
+            yield Case('torch', f'torch-{n_items}x16-dim{dim}-ss{size}', setup(dim), dict(serving_size=size, dim=dim))
+
+
+def file_cases(n_items: int, serving_sizes: List[int], directory: str) -> Iterator[Case]:
+
+    def setup():
+        path = pathlib.Path(directory) / f'lines-{n_items}.txt'
+        if not path.exists():
+            path.write_text(''.join(f'line {i}: {"x" * (i % 50)}\n' for i in range(n_items)))
+        return path, n_items, path.stat().st_size
+
+    def setup_chars():
+        # The file is ASCII, so it has one character per byte.
+        path, _, n_bytes = setup()
+        return path, n_bytes, n_bytes
+
+    for serving_size in serving_sizes:
+        yield Case('file', f'file-{n_items}-lines-ss{serving_size}', setup, dict(serving_size=serving_size))
+        yield Case('file', f'file-{n_items}-lines-ss{serving_size}-mmap', setup,
+                   dict(serving_size=serving_size, mmap=True))
+
+    yield Case('file', f'file-{n_items}-chars-ss{1 << 16}', setup_chars, dict(serving_size=1 << 16, mode='chars'))
+
+
+def run_case(case: Case, repeats: int) -> Dict[str, Any]:
+    """
+    Time one case, keeping the best of several runs, then measure its peak memory in a separate traced run.
+
+    :param case: The case.
+    :param repeats: The number of timed runs.
+    :return: Dict of results.
+    """
+
+    obj, n_items, n_bytes = case.setup()
+
+    best_total = best_first = float('inf')
+    n_dollops = 0
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        dollops = serve(obj, **case.kwargs)
+        first = None
+        n_dollops = 0
+        for _ in dollops:
+            if first is None:
+                first = time.perf_counter() - start
+            n_dollops += 1
+        total = time.perf_counter() - start
+        best_total = min(best_total, total)
+        best_first = min(best_first, first if first is not None else total)
+
+    gc.collect()
+    tracemalloc.start()
+    for _ in serve(obj, **case.kwargs):
+        pass
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'backend': case.backend,
+        'name': case.name,
+        'kwargs': dict(case.kwargs),
+        'n_items': n_items,
+        'n_bytes': n_bytes,
+        'n_dollops': n_dollops,
+        'seconds': best_total,
+        'first_dollop_seconds': best_first,
+        'items_per_second': n_items / best_total if best_total else None,
+        'bytes_per_second': n_bytes / best_total if best_total else None,
+        'peak_traced_bytes': peak_bytes,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """
+    Describe the commit and environment that the benchmarks were run in.
+    """
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=pathlib.Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = 'unknown'
+
+    versions = {}
+    for module in ('numpy', 'pandas', 'torch'):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            versions[module] = None
+
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'versions': versions,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    """
+    Print the speed-up of each case against the matching case in an earlier results file.
+    """
+
+    with open(baseline_path) as f:
+        baseline = {r['name']: r for r in json.load(f)['results']}
+
+    print(f'\n{"case":<48} {"baseline s":>12} {"current s":>12} {"speed-up":>9}')
+    for result in results:
+        old = baseline.get(result['name'])
+        if old is None:
+            continue
+        print(f'{result["name"]:<48} {old["seconds"]:>12.5f} {result["seconds"]:>12.5f} '
+              f'{old["seconds"] / result["seconds"]:>8.2f}x')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', action='append', choices=('sequence', 'numpy', 'pandas', 'torch', 'file'),
+                        help='Only run these backends (can be repeated). Default is all of them.')
+    parser.add_argument('--quick', action='store_true', help='Use smaller objects, e.g. for a smoke test.')
+    parser.add_argument('--repeats', type=int, default=5, help='Number of timed runs per case; the best is kept.')
+    parser.add_argument('--output', help='Path of the JSON results file. Default is benchmarks/results/<commit>.json.')
+    parser.add_argument('--compare', help='Path of an earlier JSON results file to compare against.')
+    args = parser.parse_args()
+
+    env = environment()
+    n_items = 10_000 if args.quick else 1_000_000
+    serving_sizes = [100, 10_000] if args.quick else [1_000, 100_000]
+
+    with tempfile.TemporaryDirectory() as directory:
+        factories = {
+            'sequence': lambda: sequence_cases(n_items, serving_sizes),
+            'numpy': lambda: numpy_cases(n_items, serving_sizes),
+            'pandas': lambda: pandas_cases(n_items, serving_sizes),
+            'torch': lambda: torch_cases(n_items, serving_sizes),
+            'file': lambda: file_cases(n_items, serving_sizes, directory),
+        }
+
+        results = []
+        for backend in args.backend or factories:
+            try:
+                cases = list(factories[backend]())
+            except ImportError as e:
+                print(f'Skipping {backend}: {e}')
+                continue
+
+            for case in cases:
+                result = run_case(case, args.repeats)
+                results.append(result)
+                print(f'{result["name"]:<48} {result["items_per_second"]:>14,.0f} items/s '
+                      f'{result["bytes_per_second"] / 1e6:>10,.1f} MB/s '
+                      f'first {result["first_dollop_seconds"] * 1e3:>8.3f} ms '
+                      f'peak {result["peak_traced_bytes"] / 1e6:>8.2f} MB')
+
+    output = pathlib.Path(args.output) if args.output else RESULTS_DIR / f'{env["commit"]}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'environment': env, 'results': results}, f, indent=2)
+    print(f'\nWrote {len(results)} results to {output}')
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,3 @@
-from .auto import serve
+from .auto import register, serve
+from .stats import DollopRecord, ServingStats
+from .collect import collect, serve_apply
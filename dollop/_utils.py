@@ -1,4 +1,14 @@
-from typing import List
+import queue
+import threading
+import time
+
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence as SequenceType
+from itertools import accumulate, product
+from typing import Any, Callable, Generator, Iterable, Iterator, List, NamedTuple, Tuple, TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    import numpy # Keep this here for string-based type-checking
 
 
 def validate_serving_args(serving_size=None, n_servings=None) -> None:
@@ -18,7 +28,95 @@ def validate_serving_args(serving_size=None, n_servings=None) -> None:
         raise TypeError("`serving_size` or `n_servings` must be an integer > 0.")
 
 
-def calculate_slices(total: int, serving_size: int = None, n_servings: int = None) -> List[slice]:
+class SlicePlan(SequenceType):
+    """
+    A lazy sequence of the slices used to cut up a known total number of items. Each slice is computed
+    arithmetically when it is needed, so the plan takes the same (tiny) amount of memory whatever the total.
+
+    :param total: Total number of items.
+    :param serving_size: Desired maximum size per dollop. Mutually exclusive with n_servings.
+    :param n_servings: Desired number of dollops. Mutually exclusive with serving_size.
+    :param dollops: The range of dollop numbers covered by this plan. Defaults to all of them.
+    """
+
+    def __init__(self, total: int, serving_size: int = None, n_servings: int = None, dollops: range = None):
+        self.total = total
+        self.serving_size = serving_size
+        self.n_servings = n_servings
+
+        if serving_size is not None:
+            n_dollops = -(-total // serving_size)
+        else:
+            # Divide total into `n_servings` chunks as evenly as possible
+            self._base, self._remainder = divmod(total, n_servings)
+            n_dollops = n_servings
+
+        self.dollops = range(n_dollops) if dollops is None else dollops
+
+    def _slice(self, k: int) -> slice:
+        if self.serving_size is not None:
+            start = k * self.serving_size
+            return slice(start, min(start + self.serving_size, self.total))
+
+        start = k * self._base + min(k, self._remainder)
+        return slice(start, start + self._base + (k < self._remainder))
+
+    def __len__(self) -> int:
+        return len(self.dollops)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[slice, "SlicePlan"]:
+        if isinstance(key, slice):
+            return SlicePlan(self.total, self.serving_size, self.n_servings, dollops=self.dollops[key])
+        return self._slice(self.dollops[key])
+
+    def __iter__(self) -> Iterator[slice]:
+        return map(self._slice, self.dollops)
+
+    def __reversed__(self) -> Iterator[slice]:
+        return map(self._slice, reversed(self.dollops))
+
+    def __repr__(self) -> str:
+        size = f'serving_size={self.serving_size}' if self.serving_size is not None else f'n_servings={self.n_servings}'
+        return f'SlicePlan(total={self.total}, {size}, dollops={self.dollops})'
+
+    @property
+    def starts(self) -> "numpy.ndarray":
+        """
+        NumPy array of the start index of every slice in the plan.
+        """
+        return self._bounds()[0]
+
+    @property
+    def stops(self) -> "numpy.ndarray":
+        """
+        NumPy array of the stop index of every slice in the plan.
+        """
+        return self._bounds()[1]
+
+    @property
+    def max_size(self) -> int:
+        """
+        The size of the largest slice in the plan. Slices never grow along the plan, so this is the first one's.
+        """
+        if not self.dollops:
+            return 0
+        first = self._slice(self.dollops[0] if self.dollops.step > 0 else self.dollops[-1])
+        return max(first.stop - first.start, 0)
+
+    def _bounds(self):
+        import numpy
+
+        k = numpy.arange(self.dollops.start, self.dollops.stop, self.dollops.step, dtype=numpy.int64)
+
+        if self.serving_size is not None:
+            starts = k * self.serving_size
+            return starts, numpy.minimum(starts + self.serving_size, self.total)
+
+        starts = k * self._base + numpy.minimum(k, self._remainder)
+        return starts, starts + self._base + (k < self._remainder)
+
+
+def calculate_slices(total: int, serving_size: int = None, n_servings: int = None) -> SlicePlan:
     """
     Return a sequence of slice indices for a known total number of items, using either a consistent
     serving size (consistent except for the last dollop) or a set number of servings.
@@ -26,7 +124,7 @@ def calculate_slices(total: int, serving_size: int = None, n_servings: int = Non
     :param total: Total number of items.
     :param serving_size: Desired maximum size per dollop. Mutually exclusive with n_servings.
     :param n_servings: Desired number of dollops. Mutually exclusive with serving_size.
-    :return: List of (start, stop) index tuples.
+    :return: Lazy SlicePlan of slice objects.
     """
     if (serving_size is None) == (n_servings is None):
         raise ValueError("Exactly one of serving_size or n_servings must be specified.")
@@ -35,27 +133,532 @@ def calculate_slices(total: int, serving_size: int = None, n_servings: int = Non
         raise ValueError("Total length must be non-negative.")
 
     if serving_size is not None:
-
         if not isinstance(serving_size, int) or serving_size <= 0:
             raise ValueError("serving_size must be a positive integer.")
 
-        slices = [slice(i, min(i + serving_size, total)) for i in range(0, total, serving_size)]
-
     else:
-
         if not isinstance(n_servings, int) or n_servings <= 0:
             raise ValueError("n_servings must be a positive integer.")
 
-        # Calculate sizes to divide total into `n_servings` chunks as evenly as possible
-        base = total // n_servings
-        remainder = total % n_servings
+    return SlicePlan(total, serving_size=serving_size, n_servings=n_servings)
+
+
+class BoundaryPlan(SequenceType):
+    """
+    A sequence of slices between consecutive boundaries, for dollops whose sizes are not all the same.
+
+    :param bounds: Increasing sequence of boundary indices, starting at 0 and ending at the total number of items.
+    """
+
+    def __init__(self, bounds: SequenceType):
+        self.bounds = bounds
+
+    def __len__(self) -> int:
+        return len(self.bounds) - 1
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[slice, "BoundaryPlan"]:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError('BoundaryPlan only supports contiguous slicing.')
+            return BoundaryPlan(self.bounds[start:max(start, stop) + 1])
+        k = range(len(self))[key]
+        return slice(int(self.bounds[k]), int(self.bounds[k + 1]))
+
+    def __iter__(self) -> Iterator[slice]:
+        return map(slice, map(int, self.bounds[:-1]), map(int, self.bounds[1:]))
+
+    def __reversed__(self) -> Iterator[slice]:
+        return map(self.__getitem__, reversed(range(len(self))))
+
+    def __repr__(self) -> str:
+        return f'BoundaryPlan(bounds={list(self.bounds)})'
+
+    @property
+    def starts(self) -> "numpy.ndarray":
+        """
+        NumPy array of the start index of every slice in the plan.
+        """
+        import numpy
+        return numpy.asarray(self.bounds[:-1], dtype=numpy.int64)
+
+    @property
+    def stops(self) -> "numpy.ndarray":
+        """
+        NumPy array of the stop index of every slice in the plan.
+        """
+        import numpy
+        return numpy.asarray(self.bounds[1:], dtype=numpy.int64)
+
+    @property
+    def max_size(self) -> int:
+        """
+        The size of the largest slice in the plan.
+        """
+        import numpy
+        return int(numpy.diff(numpy.asarray(self.bounds, dtype=numpy.int64)).max(initial=0))
+
+
+class WindowPlan(SequenceType):
+    """
+    A lazy sequence of the slices for (possibly overlapping) windows of a fixed size, one every `step` items.
+    Only whole windows are included.
+
+    :param total: Total number of items.
+    :param window: The number of items per window.
+    :param step: The number of items between the starts of consecutive windows.
+    :param start_range: The range of window start indices covered by this plan. Defaults to all of them.
+    """
+
+    def __init__(self, total: int, window: int, step: int = 1, start_range: range = None):
+        self.total = total
+        self.window = window
+        self.step = step
+        self._start_range = range(0, total - window + 1, step) if start_range is None else start_range
+
+    def __len__(self) -> int:
+        return len(self._start_range)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[slice, "WindowPlan"]:
+        if isinstance(key, slice):
+            return WindowPlan(self.total, self.window, self.step, self._start_range[key])
+        start = self._start_range[key]
+        return slice(start, start + self.window)
+
+    def __iter__(self) -> Iterator[slice]:
+        window = self.window
+        return (slice(start, start + window) for start in self._start_range)
+
+    def __reversed__(self) -> Iterator[slice]:
+        return map(self.__getitem__, reversed(range(len(self))))
+
+    def __repr__(self) -> str:
+        return f'WindowPlan(total={self.total}, window={self.window}, step={self.step})'
+
+    @property
+    def starts(self) -> "numpy.ndarray":
+        """
+        NumPy array of the start index of every slice in the plan.
+        """
+        import numpy
+        r = self._start_range
+        return numpy.arange(r.start, r.stop, r.step, dtype=numpy.int64)
+
+    @property
+    def stops(self) -> "numpy.ndarray":
+        """
+        NumPy array of the stop index of every slice in the plan.
+        """
+        return self.starts + self.window
+
+    @property
+    def max_size(self) -> int:
+        """
+        The size of the largest slice in the plan.
+        """
+        return self.window if len(self) else 0
+
+
+def calculate_windows(total: int, window: int, step: int = 1, serving_size: int = None, n_servings: int = None,
+                      weights: Any = None) -> WindowPlan:
+    """
+    Return a sequence of slice indices for sliding windows over a known total number of items.
+
+    :param total: Total number of items.
+    :param window: The number of items per window.
+    :param step: The number of items between the starts of consecutive windows. Default is 1.
+    :param serving_size: Passed through only to check that it isn't also given.
+    :param n_servings: Passed through only to check that it isn't also given.
+    :param weights: Passed through only to check that it isn't also given.
+    :return: Lazy WindowPlan of slice objects.
+    """
+
+    if serving_size is not None or n_servings is not None or weights is not None:
+        raise ValueError("window cannot be combined with serving_size, n_servings or weights.")
+
+    if total < 0:
+        raise ValueError("Total length must be non-negative.")
+
+    if not isinstance(window, int) or window <= 0:
+        raise ValueError("window must be a positive integer.")
+
+    if not isinstance(step, int) or step <= 0:
+        raise ValueError("step must be a positive integer.")
+
+    return WindowPlan(total, window, step)
+
+
+def prefix_sums(costs: SequenceType) -> SequenceType:
+    """
+    Return the running totals of a sequence of costs, starting from 0, so that sum(costs[i:j]) is
+    prefix[j] - prefix[i]. NumPy arrays, tensors and pandas objects are summed with NumPy.
+
+    :param costs: The cost of each item.
+    :return: List or NumPy array with one more entry than costs.
+    """
+
+    if hasattr(costs, 'cumsum'):
+        import numpy
+        return numpy.concatenate(([0], numpy.cumsum(numpy.asarray(costs))))
+
+    return [0, *accumulate(costs)]
+
+
+def budget_bounds(prefix: SequenceType, budget: float) -> List[int]:
+    """
+    Greedily pack consecutive items into dollops whose total cost is at most `budget`, by searching the
+    prefix sums of the costs for each dollop boundary in turn. An item that costs more than the budget gets
+    a dollop of its own.
+
+    :param prefix: Prefix sums of the item costs, as returned by `prefix_sums`.
+    :param budget: The max total cost per dollop.
+    :return: List of dollop boundaries, from 0 to the number of items.
+    """
+
+    if budget <= 0:
+        raise ValueError("The budget per dollop must be positive.")
+
+    if hasattr(prefix, 'searchsorted'):
+        def search(value):
+            return int(prefix.searchsorted(value, side='right'))
+    else:
+        def search(value):
+            return bisect_right(prefix, value)
+
+    total = len(prefix) - 1
+    bounds = [0]
+    start = 0
+    while start < total:
+        stop = max(search(prefix[start] + budget) - 1, start + 1)
+        bounds.append(stop)
+        start = stop
+
+    return bounds
+
+
+def calculate_weighted_slices(weights: Union[SequenceType, Callable], items: Iterable = None, total: int = None,
+                              serving_size: int = None, n_servings: int = None) -> BoundaryPlan:
+    """
+    Split items into n_servings dollops of roughly equal total weight, rather than equal numbers of items.
+
+    Each boundary is placed where the running total of the weights comes closest to an even share of the
+    grand total, found by searching the prefix sums.
+
+    :param weights: The (non-negative) weight of each item, or a function that returns the weight of an item.
+    :param items: The items, which are passed to the weights function. Not needed if weights are given.
+    :param total: Total number of items.
+    :param serving_size: Must be None, since weights are only used to balance n_servings.
+    :param n_servings: Desired number of dollops.
+    :return: BoundaryPlan of slices.
+    """
+
+    if serving_size is not None or n_servings is None:
+        raise ValueError("weights can only be used with n_servings.")
+
+    if not isinstance(n_servings, int) or n_servings <= 0:
+        raise ValueError("n_servings must be a positive integer.")
+
+    if callable(weights):
+        weights = list(map(weights, items))
+
+    if len(weights) != total:
+        raise ValueError(f"Expected {total} weights, one per item, but got {len(weights)}.")
+
+    prefix = prefix_sums(weights)
+
+    if hasattr(prefix, 'searchsorted'):
+        if (prefix[1:] < prefix[:-1]).any():
+            raise ValueError("weights must be non-negative.")
+
+        def search(value):
+            return int(prefix.searchsorted(value, side='left'))
+    else:
+        if any(weight < 0 for weight in weights):
+            raise ValueError("weights must be non-negative.")
+
+        def search(value):
+            return bisect_left(prefix, value)
+
+    bounds = [0]
+    for k in range(1, n_servings):
+        target = prefix[-1] * k / n_servings
+
+        # Take whichever neighbouring boundary is closer to the target, favouring the lower one in a tie.
+        stop = min(search(target), total)
+        if stop > 0 and target - prefix[stop - 1] <= prefix[stop] - target:
+            stop -= 1
+        bounds.append(max(stop, bounds[-1]))
+
+    bounds.append(total)
+    return BoundaryPlan(bounds)
+
+
+def serving_size_from_bytes(serving_bytes: int, row_bytes: int, total: int, serving_size: int = None,
+                            n_servings: int = None) -> int:
+    """
+    Convert a memory budget per dollop into a serving size, for items that all take the same number of bytes.
+
+    :param serving_bytes: The max number of bytes per dollop.
+    :param row_bytes: The number of bytes per item.
+    :param total: The total number of items.
+    :param serving_size: Must be None, since serving_bytes replaces it.
+    :param n_servings: Must be None, since serving_bytes replaces it.
+    :return: The number of items per dollop.
+    """
+
+    validate_serving_bytes(serving_bytes, serving_size, n_servings)
+
+    if row_bytes == 0:
+        return max(total, 1)
+
+    return max(serving_bytes // row_bytes, 1)
+
+
+def validate_serving_bytes(serving_bytes: int, serving_size: int = None, n_servings: int = None) -> None:
+    """
+    Check the type and value of serving_bytes, and that neither serving_size nor n_servings is given alongside it.
+
+    :param serving_bytes: The max number of bytes per dollop.
+    :param serving_size: The serving size.
+    :param n_servings: The number of servings.
+    """
+
+    if serving_size is not None or n_servings is not None:
+        raise ValueError("Exactly one of `serving_size`, `n_servings` or `serving_bytes` must be specified.")
+
+    if not isinstance(serving_bytes, int) or serving_bytes <= 0:
+        raise ValueError("`serving_bytes` must be an integer > 0.")
+
+
+def calculate_adaptive_sizes(target_latency: float, min_serving_size: int = 1, max_serving_size: int = None,
+                             n_servings: int = None, smoothing: float = 0.5,
+                             clock: Callable[[], float] = time.perf_counter) -> Generator[int, None, None]:
+    """
+    Choose the size of each dollop in turn, so that each takes about `target_latency` seconds.
+
+    Each size is timed from when it is handed out to when the next size is asked for, i.e. over the production and
+    consumption of its dollop. The time per item is smoothed with an exponentially weighted moving average, and
+    the next size is the one that would take target_latency at that rate. Sizes start at min_serving_size and at
+    most double from one dollop to the next, so a single quick dollop can't lead to a huge one.
+
+    :param target_latency: The desired time per dollop, in seconds.
+    :param min_serving_size: The smallest size to choose. Default is 1.
+    :param max_serving_size: The largest size to choose. Default is no limit.
+    :param n_servings: Must be None, since the number of dollops follows from the sizes.
+    :param smoothing: The weight of the latest measurement in the moving average, between 0 (exclusive) and 1.
+    :param clock: Function returning the current time in seconds.
+    :return: Endless generator yielding sizes.
+    """
+
+    if n_servings is not None:
+        raise ValueError("serving_size='auto' cannot be combined with n_servings.")
+
+    if target_latency is None or not isinstance(target_latency, (int, float)) or target_latency <= 0:
+        raise ValueError("serving_size='auto' needs a positive target_latency, in seconds.")
+
+    if not isinstance(min_serving_size, int) or min_serving_size <= 0:
+        raise ValueError("min_serving_size must be a positive integer.")
+
+    if max_serving_size is not None and (not isinstance(max_serving_size, int) or max_serving_size < min_serving_size):
+        raise ValueError("max_serving_size must be an integer no smaller than min_serving_size.")
+
+    if not 0 < smoothing <= 1:
+        raise ValueError("smoothing must be greater than 0 and at most 1.")
+
+    return _adaptive_sizes(target_latency, min_serving_size, max_serving_size or float('inf'), smoothing, clock)
+
+
+def _adaptive_sizes(target_latency: float, min_serving_size: int, max_serving_size: float, smoothing: float,
+                    clock: Callable[[], float]) -> Generator[int, None, None]:
+    """
+    Generator behind `calculate_adaptive_sizes`, once its arguments have been checked.
+    """
+
+    size = min_serving_size
+    seconds_per_item = None
+
+    while True:
+        start = clock()
+        yield size
+        observed = (clock() - start) / size
+
+        if seconds_per_item is None:
+            seconds_per_item = observed
+        else:
+            seconds_per_item += smoothing * (observed - seconds_per_item)
+
+        ideal = target_latency / seconds_per_item if seconds_per_item > 0 else float('inf')
+        size = max(int(min(ideal, 2 * size, max_serving_size)), min_serving_size)
+
+
+def calculate_adaptive_slices(total: int, target_latency: float, min_serving_size: int = 1,
+                              max_serving_size: int = None, n_servings: int = None) -> Generator[slice, None, None]:
+    """
+    Return slices covering a known total number of items, sized on the fly by `calculate_adaptive_sizes` so that
+    each dollop takes about `target_latency` seconds to produce and consume. Since each size depends on the time
+    taken by the dollops before it, the slices must be used as they are generated.
+
+    :param total: Total number of items.
+    :param target_latency: The desired time per dollop, in seconds.
+    :param min_serving_size: The smallest dollop size. Default is 1.
+    :param max_serving_size: The largest dollop size. Default is no limit.
+    :param n_servings: Must be None, since the number of dollops follows from the sizes.
+    :return: Generator yielding slice objects.
+    """
+
+    if total < 0:
+        raise ValueError("Total length must be non-negative.")
+
+    sizes = calculate_adaptive_sizes(target_latency, min_serving_size, max_serving_size, n_servings)
+    return _slices_from_sizes(total, sizes)
+
+
+def max_adaptive_size(max_serving_size: int, total: int, option: str) -> int:
+    """
+    Get the size of the largest dollop that serving_size='auto' can serve, for options that need to allocate
+    buffers to hold it.
+
+    :param max_serving_size: The largest dollop size, which must be given.
+    :param total: Total number of items.
+    :param option: The option that needs the buffers, for the error message.
+    :return: The size of the largest dollop.
+    """
+
+    if max_serving_size is None:
+        raise ValueError(f"{option} with serving_size='auto' needs max_serving_size, to size its buffers.")
+
+    return min(max_serving_size, total)
+
+
+def _slices_from_sizes(total: int, sizes: Iterator[int]) -> Generator[slice, None, None]:
+    """
+    Cut a total number of items into consecutive slices of the given sizes, the last of which may be cut short.
+    """
+
+    start = 0
+    for size in sizes:
+        if start >= total:
+            return
+        stop = min(start + size, total)
+        yield slice(start, stop)
+        start = stop
+
+
+class Tile(NamedTuple):
+    """
+    Where a tile sits in an N-D array. Each field has one entry per array dimension, with whole dimensions
+    for those that aren't tiled, so it can be used to index the array directly.
+
+    :param index: The position of the tile in the grid of tiles, along each tiled dim.
+    :param core: Slices of the array covered by this tile alone, without the halo. The cores of all tiles
+        exactly cover the array.
+    :param region: Slices of the array served for this tile: the core, grown by the halo and clipped at the
+        edges of the array.
+    :param inner: Slices picking the core out of the served region.
+    """
+
+    index: Tuple[int, ...]
+    core: Tuple[slice, ...]
+    region: Tuple[slice, ...]
+    inner: Tuple[slice, ...]
+
+
+def calculate_tiles(shape: Tuple[int, ...], tile: Tuple[int, ...], dims: Tuple[int, ...] = None,
+                    halo: Union[int, Tuple[int, ...]] = 0) -> Generator[Tile, None, None]:
+    """
+    Work out the tiles used to cut an N-D array into a grid of (overlapping) blocks, in C order.
+
+    :param shape: The shape of the array.
+    :param tile: The size of each tile along each of dims. Tiles at the far edges may be smaller.
+    :param dims: The dims to tile, one per entry of tile. Defaults to the leading dims.
+    :param halo: The margin of extra elements on each side of a tile, either one for all of dims or one per dim.
+    :return: Generator yielding Tile objects.
+    """
+
+    tile = tuple(tile)
+    dims = tuple(range(len(tile))) if dims is None else tuple(dims)
+    halo = (halo,) * len(tile) if isinstance(halo, int) else tuple(halo)
+
+    if not tile or len(dims) != len(tile) or len(halo) != len(tile):
+        raise ValueError("tile, dims and halo (if given per dim) must have the same, non-zero length.")
+    if len(set(dims)) != len(dims) or any(d < 0 or d >= len(shape) for d in dims):
+        raise ValueError(f"dims must be distinct dimensions of an array with {len(shape)} dimensions, not {dims}.")
+    if any(not isinstance(t, int) or t <= 0 for t in tile):
+        raise TypeError("Each tile size must be an integer > 0.")
+    if any(not isinstance(h, int) or h < 0 for h in halo):
+        raise TypeError("Each halo must be an integer >= 0.")
+
+    # For each tiled dim, the (core, region, inner) slices of each tile along it.
+    per_dim = []
+    for dim, size, margin in zip(dims, tile, halo):
+        total = shape[dim]
+        spans = []
+        for start in range(0, total, size):
+            stop = min(start + size, total)
+            lo, hi = max(start - margin, 0), min(stop + margin, total)
+            spans.append((slice(start, stop), slice(lo, hi), slice(start - lo, stop - lo)))
+        per_dim.append(spans)
+
+    whole = (slice(None),) * len(shape)
+    for index in product(*(range(len(spans)) for spans in per_dim)):
+        core, region, inner = list(whole), list(whole), list(whole)
+        for dim, spans, i in zip(dims, per_dim, index):
+            core[dim], region[dim], inner[dim] = spans[i]
+        yield Tile(index, tuple(core), tuple(region), tuple(inner))
+
+
+def prefetch(dollops: Iterator[Any], n_dollops: int) -> Generator[Any, None, None]:
+    """
+    Produce upcoming dollops on a background thread while the consumer works on the current one.
+
+    At most `n_dollops` produced dollops wait in a bounded queue, so a slow consumer holds back the producer.
+    Any exception raised while producing is re-raised in the consumer at the point where it occurred.
+
+    :param dollops: The iterator of dollops, which is consumed on the background thread.
+    :param n_dollops: The max number of dollops to produce ahead of the consumer.
+    :return: Generator yielding the same dollops, in order.
+    """
+
+    if not isinstance(n_dollops, int) or n_dollops <= 0:
+        raise ValueError("prefetch must be a positive integer.")
+
+    buffer = queue.Queue(maxsize=n_dollops)
+    stopped = threading.Event()
+    finished = object()
+
+    def put(item) -> bool:
+        # Poll so that the producer notices if the consumer goes away while the queue is full.
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce() -> None:
+        try:
+            for dollop in dollops:
+                if not put((dollop, None)):
+                    return
+            put((finished, None))
+        except BaseException as e:
+            put((None, e))
+        finally:
+            close = getattr(dollops, 'close', None)
+            if close is not None:
+                close()
 
-        slices = []
-        start = 0
-        for i in range(n_servings):
-            dollop_size = base + 1 if i < remainder else base
-            stop = start + dollop_size
-            slices.append(slice(start, stop))
-            start = stop
+    producer = threading.Thread(target=produce, name='dollop-prefetch', daemon=True)
+    producer.start()
 
-    return slices
+    try:
+        while True:
+            dollop, error = buffer.get()
+            if error is not None:
+                raise error
+            if dollop is finished:
+                return
+            yield dollop
+    finally:
+        stopped.set()
@@ -0,0 +1,210 @@
+import os
+import pathlib
+import sys
+
+from collections import deque
+from typing import Any, Callable, Generator, Iterator, List, TYPE_CHECKING
+
+from .stats import DollopRecord, ServingStats, instrument
+from ._utils import SlicePlan, calculate_slices
+
+if TYPE_CHECKING:
+    import pyarrow # Keep this here for string-based type-checking
+
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+IPC_SUFFIXES = ('.arrow', '.feather', '.ipc')
+
+
+def serve(arrow_obj: "pyarrow.Table | pyarrow.RecordBatch | str | os.PathLike | Any", serving_size: int = None,
+          n_servings: int = None, columns: List[str] = None, format: str = None, stats: ServingStats = None,
+          on_dollop: Callable[[DollopRecord], None] = None) \
+        -> Generator["pyarrow.Table | pyarrow.RecordBatch", None, None]:
+    """
+    Read an Arrow table or record batch, or a Parquet or Arrow IPC file, small dollops at a time.
+
+    Tables and record batches are cut with their zero-copy `slice()`. Files are streamed a row group (Parquet) or
+    record batch (IPC) at a time, so only the rows needed for the next dollop are read, and only the requested
+    columns are read from disk.
+
+    :param arrow_obj: A pyarrow Table or RecordBatch, or a path or file object for a Parquet or Arrow IPC file.
+    :param serving_size: The number of rows in each dollop. Mutually exclusive with n_servings.
+    :param n_servings: The number of dollops, of roughly equal size. Mutually exclusive with serving_size.
+    :param columns: If given, only serve these columns.
+    :param format: 'parquet' or 'ipc'. Worked out from the file suffix if not given (needed for file objects).
+    :param stats: A ServingStats in which to record the timings, sizes and throughput of the dollops.
+    :param on_dollop: Function called with a DollopRecord of the measurements for each dollop.
+    :return: Generator yielding Tables (RecordBatches for a RecordBatch input).
+    """
+
+    cls = arrow_obj.__class__
+    if cls.__module__.startswith("pyarrow") and cls.__name__ in ("Table", "RecordBatch"):
+        if columns is not None:
+            arrow_obj = arrow_obj.select(columns)
+        slices = calculate_slices(total=arrow_obj.num_rows, serving_size=serving_size, n_servings=n_servings)
+        dollops = (arrow_obj.slice(slc.start, slc.stop - slc.start) for slc in slices)
+
+    else:
+        format = format or _infer_format(arrow_obj)
+
+        if format == 'parquet':
+            dollops = _serve_parquet(arrow_obj, serving_size, n_servings, columns)
+        elif format == 'ipc':
+            dollops = _serve_ipc(arrow_obj, serving_size, n_servings, columns)
+        else:
+            raise ValueError(f"format must be 'parquet' or 'ipc', not {format!r}.")
+
+    if stats is not None or on_dollop is not None:
+        dollops = instrument(dollops, stats, on_dollop)
+
+    yield from dollops
+
+
+def _infer_format(source: Any) -> str:
+    """
+    Work out the format of a Parquet or Arrow IPC file from the suffix of its path.
+
+    :param source: A path to the file.
+    :return: 'parquet' or 'ipc'.
+    """
+
+    if not isinstance(source, (str, os.PathLike)):
+        raise TypeError("Dollop arrow.serve only supports pyarrow Tables and RecordBatches, or Parquet and Arrow IPC "
+                        "files. Pass format= to serve a file object.")
+
+    suffix = pathlib.Path(source).suffix.lower()
+    if suffix in PARQUET_SUFFIXES:
+        return 'parquet'
+    if suffix in IPC_SUFFIXES:
+        return 'ipc'
+
+    raise ValueError(f"Cannot tell the format of {source} from its suffix. Pass format='parquet' or format='ipc'.")
+
+
+def _serve_parquet(source: Any, serving_size: int = None, n_servings: int = None, columns: List[str] = None) \
+        -> Generator["pyarrow.Table", None, None]:
+    """
+    Stream a Parquet file in dollops, reading one row group at a time.
+
+    :param source: A path or file object for the Parquet file.
+    :param serving_size: The number of rows in each dollop. Mutually exclusive with n_servings.
+    :param n_servings: The number of dollops, of roughly equal size. Mutually exclusive with serving_size.
+    :param columns: If given, only read these columns.
+    :return: Generator yielding Tables.
+    """
+
+    import pyarrow.parquet
+
+    with pyarrow.parquet.ParquetFile(source) as parquet_file:
+        slices = calculate_slices(total=parquet_file.metadata.num_rows, serving_size=serving_size,
+                                  n_servings=n_servings)
+        if not slices:
+            return
+
+        # The first dollop is the largest, so most dollops are made from a single batch.
+        batch_size = max(slices[0].stop - slices[0].start, 1)
+        schema = _select_schema(parquet_file.schema_arrow, columns)
+        yield from _rebatch(parquet_file.iter_batches(batch_size=batch_size, columns=columns), slices, schema)
+
+
+def _serve_ipc(source: Any, serving_size: int = None, n_servings: int = None, columns: List[str] = None) \
+        -> Generator["pyarrow.Table", None, None]:
+    """
+    Stream an Arrow IPC (Feather v2) file in dollops. Paths are memory-mapped, so record batches are read
+    lazily, and the buffers of unselected columns are skipped for file objects too.
+
+    With serving_size, batches are cut until they run out, without counting the rows first. With n_servings, the
+    rows are counted from the batch metadata, which reads through a file object (but not a memory-mapped path)
+    once before serving it.
+
+    :param source: A path or file object for the IPC file.
+    :param serving_size: The number of rows in each dollop. Mutually exclusive with n_servings.
+    :param n_servings: The number of dollops, of roughly equal size. Mutually exclusive with serving_size.
+    :param columns: If given, only read these columns.
+    :return: Generator yielding Tables.
+    """
+
+    import pyarrow
+    import pyarrow.ipc
+
+    is_path = isinstance(source, (str, os.PathLike))
+    source = pyarrow.memory_map(os.fspath(source)) if is_path else source
+
+    try:
+        reader = pyarrow.ipc.open_file(source)
+        schema = _select_schema(reader.schema, columns)
+
+        if columns is not None:
+            # Batches from this reader hold the selected columns in file order, so they are reordered below.
+            options = pyarrow.ipc.IpcReadOptions(included_fields=sorted(map(reader.schema.get_field_index, columns)))
+            reader = pyarrow.ipc.open_file(source, options=options)
+
+        def batches():
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                yield batch if columns is None else batch.select(columns)
+
+        total = reader.count_rows() if n_servings is not None else sys.maxsize
+        slices = calculate_slices(total=total, serving_size=serving_size, n_servings=n_servings)
+        yield from _rebatch(batches(), slices, schema)
+
+    finally:
+        if is_path:
+            source.close()
+
+
+def _select_schema(schema: "pyarrow.Schema", columns: List[str] = None) -> "pyarrow.Schema":
+    """
+    Get the schema of the given columns, in order, or the whole schema if columns is None.
+    """
+
+    import pyarrow
+
+    if columns is None:
+        return schema
+
+    return pyarrow.schema([schema.field(name) for name in columns])
+
+
+def _rebatch(batches: Iterator["pyarrow.RecordBatch"], slices: SlicePlan, schema: "pyarrow.Schema") \
+        -> Generator["pyarrow.Table", None, None]:
+    """
+    Regroup a stream of record batches into Tables covering the given slices of rows, without copying.
+
+    :param batches: The record batches, in order.
+    :param slices: Consecutive slices covering all of the rows. Slices past the last row are cut short or dropped.
+    :param schema: The schema of the batches, for the empty Tables of any empty slices.
+    :return: Generator yielding Tables.
+    """
+
+    import pyarrow
+
+    pending = deque()
+    n_pending = 0
+
+    for slc in slices:
+        size = slc.stop - slc.start
+
+        while n_pending < size:
+            batch = next(batches, None)
+            if batch is None:
+                # The slices ran past the rows, so serve what is left and stop.
+                if not n_pending:
+                    return
+                size = n_pending
+                break
+            pending.append(batch)
+            n_pending += batch.num_rows
+
+        taken = []
+        needed = size
+        while needed:
+            batch = pending.popleft()
+            if batch.num_rows > needed:
+                pending.appendleft(batch.slice(needed))
+                batch = batch.slice(0, needed)
+            taken.append(batch)
+            needed -= batch.num_rows
+
+        n_pending -= size
+        yield pyarrow.Table.from_batches(taken) if taken else schema.empty_table()
@@ -0,0 +1,164 @@
+import asyncio
+import io
+import inspect
+import pathlib
+import threading
+
+from typing import Any, AsyncGenerator, Callable
+
+from ._utils import validate_serving_args
+from .auto import serve as serve_sync
+from .file import FileShard
+from .iterable import _container_factory
+
+
+async def serve(obj: Any, serving_size: int = None, n_servings: int = None, **kwargs) -> AsyncGenerator[Any, None]:
+    """
+    Split an object into a series of smaller chunks, for use with `async for`.
+
+    - Async readers (e.g. `asyncio.StreamReader`, aiofiles handles) are read in lines or chars mode.
+    - Async iterables are grouped into containers of items, as for `dollop.iterable.serve`.
+    - Files and file handles are served by `dollop.serve` on a worker thread, so reads don't block the event loop.
+    - Anything else is served by `dollop.serve` directly.
+
+    :param obj: The object that we wish to serve.
+    :param serving_size: The max number of items in each outputted subiterable. Mutually exclusive with n_servings.
+    :param n_servings: The number of (almost equal-sized) servings to serve. Mutually exclusive with serving_size.
+    :param kwargs: Any additional arguments to pass to the type-specific function.
+    :return:
+    """
+
+    if inspect.iscoroutinefunction(getattr(obj, 'read', None)):
+        generator = _serve_reader(obj, serving_size=serving_size, n_servings=n_servings, **kwargs)
+
+    elif hasattr(obj, '__aiter__'):
+        generator = _serve_async_iterable(obj, serving_size=serving_size, n_servings=n_servings, **kwargs)
+
+    elif isinstance(obj, (io.IOBase, pathlib.Path, FileShard)):
+        generator = _serve_in_executor(obj, serving_size=serving_size, n_servings=n_servings, **kwargs)
+
+    else:
+        for dollop in serve_sync(obj, serving_size=serving_size, n_servings=n_servings, **kwargs):
+            yield dollop
+        return
+
+    async for dollop in generator:
+        yield dollop
+
+
+async def _serve_reader(reader, serving_size: int = None, n_servings: int = None, mode='lines') \
+        -> AsyncGenerator[Any, None]:
+    """
+    Serve an async reader, such as an `asyncio.StreamReader` or an aiofiles handle.
+
+    :param reader: The reader, with a coroutine `read` method.
+    :param serving_size: The max number of lines or characters in each serving.
+    :param n_servings: Not supported, since the length of a stream is not known in advance.
+    :param mode: Either 'lines' or 'chars'/'characters' to read line-by-line or character-by-character.
+    :return: Async generator yielding str or bytes dollops, matching the reader type.
+    """
+
+    if n_servings is not None:
+        raise ValueError('Async readers cannot be dolloped using n_servings. Use serving_size instead.')
+
+    validate_serving_args(serving_size, n_servings)
+
+    if mode == 'lines':
+        async def read_dollop():
+            lines = []
+            for _ in range(serving_size):
+                line = await reader.readline()
+                if not line:
+                    break
+                lines.append(line)
+            return lines
+
+    elif mode in ('characters', 'chars'):
+        async def read_dollop():
+            # Stream reads can return fewer characters than asked for, so keep reading until the dollop is full.
+            pieces = []
+            remaining = serving_size
+            while remaining > 0:
+                piece = await reader.read(remaining)
+                if not piece:
+                    break
+                pieces.append(piece)
+                remaining -= len(piece)
+            return pieces
+
+    else:
+        raise ValueError('Invalid mode for dollop.asyncio.serve')
+
+    while True:
+        pieces = await read_dollop()
+
+        if not pieces:
+            return
+
+        yield pieces[0][:0].join(pieces)
+
+
+async def _serve_async_iterable(items, serving_size: int = None, n_servings: int = None, container: Callable = None) \
+        -> AsyncGenerator[Any, None]:
+    """
+    Group the items of an async iterable into dollops as they arrive.
+
+    :param items: The async iterable of items.
+    :param serving_size: The number of items per dollop.
+    :param n_servings: Not supported, since the length of an async iterable is not known in advance.
+    :param container: The type of each dollop, as for `dollop.iterable.serve`.
+    :return: Async generator yielding containers of items.
+    """
+
+    if n_servings is not None:
+        raise ValueError('Async iterables cannot be dolloped using n_servings. Use serving_size instead.')
+
+    validate_serving_args(serving_size, n_servings)
+
+    make_container = _container_factory(container)
+
+    dollop = []
+    async for item in items:
+        dollop.append(item)
+        if len(dollop) == serving_size:
+            yield make_container(dollop)
+            dollop = []
+
+    if dollop:
+        yield make_container(dollop)
+
+
+async def _serve_in_executor(obj: Any, **kwargs) -> AsyncGenerator[Any, None]:
+    """
+    Run `dollop.serve` on a worker thread, producing one dollop per executor call.
+
+    If this is cancelled while a dollop is being produced, e.g. by `asyncio.wait_for`, the worker thread carries on
+    until that dollop is done, so the generator is closed on a worker thread too, once it is free.
+
+    :param obj: The object that we wish to serve.
+    :param kwargs: Arguments to pass to `dollop.serve`.
+    :return: Async generator yielding the dollops.
+    """
+
+    loop = asyncio.get_running_loop()
+    generator = serve_sync(obj, **kwargs)
+    finished = object()
+    lock = threading.Lock()
+
+    def produce():
+        with lock:
+            return next(generator, finished)
+
+    def close():
+        with lock:
+            generator.close()
+
+    try:
+        while True:
+            dollop = await loop.run_in_executor(None, produce)
+            if dollop is finished:
+                return
+            yield dollop
+    finally:
+        # Shielded, so that the generator is still closed if this is cancelled again.
+        await asyncio.shield(loop.run_in_executor(None, close))
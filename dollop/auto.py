@@ -1,17 +1,16 @@
+import importlib
 import io
-import pathlib
 
-from typing import Any, Generator
-from collections.abc import Sequence as SequenceType
+from typing import Any, Callable, Dict, Generator, List, Tuple, Union
+from collections.abc import Iterable as IterableType, Sequence as SequenceType
 
-from .sequence import serve as serve_sequence
-from .file import serve as serve_file
-from .pandas import serve as serve_pandas
-from .numpy import serve as serve_numpy
-from .torch import serve as serve_torch
+from .stats import DollopRecord, ServingStats
+from ._utils import prefetch as prefetch_dollops
 
 
-def serve(obj: Any, serving_size: int = None, n_servings: int = None, **kwargs) -> Generator[Any, None, None]:
+def serve(obj: Any, serving_size: Union[int, str] = None, n_servings: int = None, prefetch: int = None,
+          stats: ServingStats = None, on_dollop: Callable[[DollopRecord], None] = None, **kwargs) \
+        -> Generator[Any, None, None]:
     """
     Split an object into a series of smaller chunks, either by fixed serving size or by number of servings.
 
@@ -19,32 +18,136 @@ def serve(obj: Any, serving_size: int = None, n_servings: int = None, **kwargs)
 
     - If `serving_size` is given, each output will contain up to that many items (the last may be smaller).
     - If `n_servings` is given, the input will be split into that many chunks, as evenly as possible.
+    - For sequences, arrays, tensors, pandas objects and files, `serving_size='auto'` with `target_latency=` sizes
+      each dollop so that it takes about that many seconds to produce and consume.
 
 
     :param obj: The object that we wish to serve.
     :param serving_size: The max number of items in each outputted subiterable. Mutually exclusive with n_servings.
     :param n_servings: The number of (almost equal-sized) servings to serve. Mutually exclusive with serving_size.
+    :param prefetch: If given, produce up to this many upcoming dollops on a background thread while the current
+        one is being consumed. With serving_size='auto', the time per dollop is then measured on the background
+        thread, which is held back by the consumer once the queue is full. Can't be combined with the
+        `contiguous` or `out` options for arrays, whose reused buffers would be refilled while still in use.
+    :param stats: A ServingStats in which to record the timings, sizes and throughput of the dollops. With
+        prefetch, dollops are measured on the background thread, so the consume time of each dollop is the time
+        until the next one was started, including any wait for room in the prefetch queue.
+    :param on_dollop: Function called with a DollopRecord of the measurements for each dollop. With prefetch, it
+        is called on the background thread.
     :param kwargs: Any additional arguments to pass to the type-specific function.
     :return:
     """
 
-    if isinstance(obj, SequenceType):
-        yield from serve_sequence(obj, serving_size=serving_size, n_servings=n_servings, **kwargs)
+    if prefetch is not None and (kwargs.get('contiguous') or kwargs.get('out') is not None):
+        raise ValueError('prefetch cannot be combined with contiguous or out, since the dollops share reused buffers.')
 
-    elif obj.__class__.__module__.startswith("pandas"):
-        yield from serve_pandas(obj, serving_size=serving_size, n_servings=n_servings, **kwargs)
+    if stats is not None or on_dollop is not None:
+        # The type-specific function knows how to count the items in its dollops.
+        kwargs.update(stats=stats, on_dollop=on_dollop)
 
-    elif obj.__class__.__module__.startswith("numpy"):
-        yield from serve_numpy(obj, serving_size=serving_size, n_servings=n_servings, **kwargs)
+    dollops = _serve(obj, serving_size=serving_size, n_servings=n_servings, **kwargs)
 
-    elif obj.__class__.__module__.startswith("torch"):
-        yield from serve_torch(obj, serving_size=serving_size, n_servings=n_servings, **kwargs)
+    if prefetch is not None:
+        dollops = prefetch_dollops(dollops, prefetch)
 
-    elif isinstance(obj, (io.IOBase, pathlib.Path)):
-        if n_servings is not None:
-            raise ValueError('Files and IO streams cannot be dolloped using n_servings. Use serving_size instead.')
-        else:
-            yield from serve_file(obj, serving_size=serving_size, **kwargs)
+    yield from dollops
+
+
+def register(key: Union[type, str], backend: Union[Callable, str]) -> None:
+    """
+    Register a type-specific serve function, so that `serve` can dispatch objects of a new type to it. Later
+    registrations take precedence over earlier ones and over the built-in backends.
+
+    :param key: Either a type, which also covers its subclasses (and, for abstract base classes, any registered
+        virtual subclasses), or a string: the name of a module or package, to cover every type defined in it (e.g.
+        'polars'), or the full name of a single type (e.g. 'polars.dataframe.frame.DataFrame'). Strings let a
+        backend be registered without importing the library that defines the type.
+    :param backend: The serve function, called as backend(obj, serving_size=..., n_servings=..., **kwargs), or a
+        'module:function' string naming it, which is imported the first time an object is dispatched to it.
+    """
+
+    _registry.insert(0, (key, backend))
+    _backends.clear()
+
+
+def _serve(obj: Any, serving_size: int = None, n_servings: int = None, **kwargs) -> Generator[Any, None, None]:
+    """
+    Dispatch an object to the type-specific serve function. The backend for each class is looked up once, then
+    cached.
 
-    else:
+    :param obj: The object that we wish to serve.
+    :param serving_size: The max number of items in each outputted subiterable. Mutually exclusive with n_servings.
+    :param n_servings: The number of (almost equal-sized) servings to serve. Mutually exclusive with serving_size.
+    :param kwargs: Any additional arguments to pass to the type-specific function.
+    :return:
+    """
+
+    cls = obj.__class__
+
+    try:
+        backend = _backends[cls]
+    except KeyError:
+        backend = _backends[cls] = _find_backend(cls)
+
+    if backend is None:
         raise NotImplementedError(f'Object of type {type(obj)} is not dollopable.')
+
+    # Lazy backends are cached as (module, name), and looked up on each call so that they can be patched.
+    serve_backend = getattr(*backend) if isinstance(backend, tuple) else backend
+    return serve_backend(obj, serving_size=serving_size, n_servings=n_servings, **kwargs)
+
+
+def _find_backend(cls: type) -> Union[Callable, Tuple[Any, str], None]:
+    """
+    Find the first registered backend whose key matches a class, importing it if needed.
+
+    :param cls: The class of the object to serve.
+    :return: The serve function, a (module, name) pair for a lazily imported one, or None if there is no match.
+    """
+
+    module = cls.__module__
+    full_name = f'{module}.{cls.__qualname__}'
+
+    for key, backend in _registry:
+        if isinstance(key, str):
+            matches = key in (module, full_name) or module.startswith(key + '.')
+        else:
+            matches = issubclass(cls, key)
+
+        if matches:
+            if isinstance(backend, str):
+                module_name, _, name = backend.partition(':')
+                return importlib.import_module(module_name), name
+            return backend
+
+    return None
+
+
+def _serve_path(path: Any, serving_size: int = None, n_servings: int = None, **kwargs) -> Generator[Any, None, None]:
+    """
+    Serve a path with the Arrow backend if it has a Parquet or Arrow IPC suffix, or the file backend otherwise.
+    """
+
+    from . import arrow, file
+
+    if path.suffix.lower() in arrow.PARQUET_SUFFIXES + arrow.IPC_SUFFIXES:
+        return arrow.serve(path, serving_size=serving_size, n_servings=n_servings, **kwargs)
+
+    return file.serve(path, serving_size=serving_size, n_servings=n_servings, **kwargs)
+
+
+# Registered (key, backend) pairs, checked in order. See `register`.
+_registry: List[Tuple[Union[type, str], Union[Callable, str]]] = [
+    ('dollop.file.FileShard', 'dollop.file:serve'),
+    (SequenceType, 'dollop.sequence:serve'),
+    ('pandas', 'dollop.pandas:serve'),
+    ('numpy', 'dollop.numpy:serve'),
+    ('torch', 'dollop.torch:serve'),
+    ('pyarrow', 'dollop.arrow:serve'),
+    ('pathlib', _serve_path),
+    (io.IOBase, 'dollop.file:serve'),
+    (IterableType, 'dollop.iterable:serve'),
+]
+
+# The backend found for each class that has been served.
+_backends: Dict[type, Union[Callable, Tuple[Any, str], None]] = {}
@@ -0,0 +1,242 @@
+from itertools import chain
+from typing import Any, Callable, Iterable, Iterator, TYPE_CHECKING
+
+from .auto import serve
+
+if TYPE_CHECKING:
+    import pandas # Keep this here for string-based type-checking
+
+
+# Marks an empty iterable of results.
+_missing = object()
+
+
+def serve_apply(fn: Callable[[Any], Any], obj: Any, serving_size: int = None, n_servings: int = None, dim: int = 0,
+                out: Any = None, workers: int = None, **kwargs) -> Any:
+    """
+    Apply a function to every dollop of an object, and assemble the results into a single object of the same type
+    as the results, using `collect`.
+
+    When fn keeps the size of each dollop along dim (as elementwise functions do), array, tensor and pandas
+    results are written straight into a preallocated output, so no list of results and no second full-size copy
+    is made.
+
+    :param fn: The function to apply to each dollop.
+    :param obj: The object that we wish to serve.
+    :param serving_size: The max number of items in each dollop. Mutually exclusive with n_servings.
+    :param n_servings: The number of (almost equal-sized) dollops. Mutually exclusive with serving_size.
+    :param dim: For arrays and tensors, the dimension along which to slice and reassemble. Default is 0.
+    :param out: Array or tensor into which to write the results.
+    :param workers: If given, apply fn in this many worker processes, using `dollop.parallel.serve_map`.
+    :param kwargs: Any additional arguments to pass to `dollop.serve`.
+    :return: The assembled results.
+    """
+
+    if dim:
+        kwargs['dim'] = dim
+
+    if workers is not None:
+        from .parallel import serve_map
+        results = serve_map(fn, obj, serving_size=serving_size, n_servings=n_servings, workers=workers, **kwargs)
+    else:
+        results = map(fn, serve(obj, serving_size=serving_size, n_servings=n_servings, **kwargs))
+
+    return collect(results, total=_size(obj, dim), dim=dim, out=out)
+
+
+def collect(results: Iterable[Any], total: int = None, dim: int = 0, out: Any = None) -> Any:
+    """
+    Assemble processed dollops, in order, into a single object of their type.
+
+    NumPy arrays, tensors, and pandas objects with NumPy dtypes are written into a preallocated output when its size
+    along dim is known, from `total` or `out`. Its dtype and other dims are taken from the first result. If the
+    results turn out not to fit, or to have other dtypes, or the size isn't known, they are concatenated instead,
+    so the dtypes are promoted as usual. Results are cast to the dtype of `out`. Strings and bytes are joined,
+    lists and tuples chained, and Arrow tables combined without copying. Anything else is returned as a list.
+
+    :param results: The processed dollops.
+    :param total: The total size of the results along dim, e.g. the size of the original object.
+    :param dim: For arrays and tensors, the dimension along which to assemble the results. Default is 0.
+    :param out: Array or tensor into which to write the results. It must be exactly filled by them.
+    :return: The assembled results.
+    """
+
+    results = iter(results)
+    first = next(results, _missing)
+
+    if first is _missing:
+        if out is not None:
+            return out
+        raise ValueError("There are no results to collect.")
+
+    results = chain([first], results)
+    cls = first.__class__
+    module = cls.__module__
+
+    if module.startswith("numpy") and cls.__name__ == "ndarray":
+        import numpy
+        return _collect_arrays(results, first, total, dim, out, numpy.empty, numpy.concatenate)
+
+    if module.startswith("torch") and cls.__name__ == "Tensor":
+        import torch
+
+        def empty(shape, dtype):
+            return torch.empty(shape, dtype=dtype, device=first.device)
+
+        return _collect_arrays(results, first, total, dim, out, empty, torch.cat)
+
+    if out is not None:
+        raise TypeError("out can only be used for NumPy arrays and tensors.")
+
+    if module.startswith("pandas"):
+        return _collect_pandas(results, first, total)
+
+    if module.startswith("pyarrow"):
+        import pyarrow
+        if cls.__name__ == "RecordBatch":
+            return pyarrow.Table.from_batches(list(results))
+        return pyarrow.concat_tables(list(results))
+
+    if isinstance(first, (str, bytes, bytearray)):
+        return first[:0].join(results)
+
+    if isinstance(first, (list, tuple)):
+        return type(first)(chain.from_iterable(results))
+
+    return list(results)
+
+
+def _size(obj: Any, dim: int = 0) -> "int | None":
+    """
+    Get the size of an object along dim, or None if it can't be known without consuming it.
+    """
+
+    shape = getattr(obj, 'shape', None)
+    if isinstance(shape, tuple) and len(shape) > dim:
+        return int(shape[dim])
+
+    num_rows = getattr(obj, 'num_rows', None)
+    if isinstance(num_rows, int):
+        return num_rows
+
+    return None
+
+
+def _collect_arrays(results: Iterator[Any], first: Any, total: int, dim: int, out: Any,
+                    empty: Callable, concatenate: Callable) -> Any:
+    """
+    Write arrays or tensors into consecutive slices of a preallocated output along dim, falling back to
+    concatenation if they don't fit.
+
+    :param results: The results, including the first.
+    :param first: The first result.
+    :param total: The total size of the results along dim, or None if not known.
+    :param dim: The dimension along which to assemble the results.
+    :param out: Caller-supplied output, or None to allocate one.
+    :param empty: Function allocating an output, given its shape and dtype.
+    :param concatenate: Function concatenating a list of results along dim.
+    :return: The assembled array or tensor.
+    """
+
+    if dim < 0 or dim >= first.ndim:
+        raise ValueError(f"Specified dim ({dim}) must be smaller than the number of result dimensions ({first.ndim})")
+
+    if out is None:
+        if total is None:
+            return concatenate(list(results), dim)
+        out_shape = list(first.shape)
+        out_shape[dim] = total
+        target = empty(tuple(out_shape), first.dtype)
+    else:
+        target = out
+
+    size = target.shape[dim]
+    other_dims = [size_ for d, size_ in enumerate(target.shape) if d != dim]
+    before = (slice(None),) * dim
+    offset = 0
+
+    for result in results:
+        n = result.shape[dim]
+        # Results with another dtype would be cast into the output, so they are concatenated instead, unless the
+        # caller chose the dtype by passing out.
+        fits = result.ndim == target.ndim and (out is not None or result.dtype == target.dtype) and \
+            offset + n <= size and [size_ for d, size_ in enumerate(result.shape) if d != dim] == other_dims
+
+        if not fits:
+            if out is not None:
+                raise ValueError("The results don't fit in out.")
+            # Keep what has been written so far, and concatenate the rest on to it.
+            return concatenate([target[before + (slice(0, offset),)], result, *results], dim)
+
+        target[before + (slice(offset, offset + n),)] = result
+        offset += n
+
+    if offset < size:
+        if out is not None:
+            raise ValueError(f"The results only filled {offset} of the {size} places along dim {dim} of out.")
+        return concatenate([target[before + (slice(0, offset),)]], dim)
+
+    return target
+
+
+def _collect_pandas(results: Iterator[Any], first: "pandas.DataFrame | pandas.Series", total: int = None) \
+        -> "pandas.DataFrame | pandas.Series":
+    """
+    Write the columns of pandas objects into preallocated NumPy arrays, then wrap them without copying. Objects
+    with columns of Python objects or extension types, or of unknown total length, are concatenated instead.
+
+    :param results: The results, including the first.
+    :param first: The first result.
+    :param total: The total number of rows, or None if not known.
+    :return: The assembled DataFrame or Series.
+    """
+
+    import numpy
+    import pandas
+
+    is_dataframe = isinstance(first, pandas.DataFrame)
+    dtypes = list(first.dtypes) if is_dataframe else [first.dtype]
+
+    if total is None or not all(isinstance(dtype, numpy.dtype) and dtype != object for dtype in dtypes):
+        return pandas.concat(list(results))
+
+    arrays = [numpy.empty(total, dtype=dtype) for dtype in dtypes]
+    indexes = []
+    offset = 0
+
+    for result in results:
+        n = len(result)
+        result_dtypes = list(result.dtypes) if is_dataframe else [result.dtype]
+        fits = isinstance(result, type(first)) and offset + n <= total and result_dtypes == dtypes and \
+            (not is_dataframe or result.columns.equals(first.columns))
+
+        if not fits:
+            # Wrap what has been written so far, and concatenate the rest on to it.
+            written = _wrap_pandas(first, [array[:offset] for array in arrays], indexes)
+            return pandas.concat([written, result, *results])
+
+        columns = [result.iloc[:, i] for i in range(result.shape[1])] if is_dataframe else [result]
+        for array, column in zip(arrays, columns):
+            array[offset:offset + n] = column.to_numpy()
+        indexes.append(result.index)
+        offset += n
+
+    return _wrap_pandas(first, [array[:offset] for array in arrays], indexes)
+
+
+def _wrap_pandas(first: "pandas.DataFrame | pandas.Series", arrays: list, indexes: list) \
+        -> "pandas.DataFrame | pandas.Series":
+    """
+    Wrap column arrays and index pieces in a pandas object like the first result, without copying the columns.
+    """
+
+    import pandas
+
+    index = indexes[0].append(indexes[1:]) if indexes else first.index[:0]
+
+    if isinstance(first, pandas.Series):
+        return pandas.Series(arrays[0], index=index, name=first.name, copy=False)
+
+    df = pandas.DataFrame(dict(enumerate(arrays)), index=index, copy=False)
+    df.columns = first.columns
+    return df
@@ -1,62 +1,725 @@
 import io
+import mmap as mmap_lib
+import os
 import pathlib
+import re
+import struct
+import sys
 
-from typing import Union, Generator
+from array import array
+from functools import partial
+from itertools import accumulate, islice, repeat
+from operator import add
+from stat import S_ISREG
+from typing import Callable, Generator, Iterable, List, NamedTuple, Union
 
-from ._utils import validate_serving_args
+from .stats import DollopRecord, ServingStats, instrument
+from ._utils import calculate_adaptive_sizes, calculate_slices, prefetch, validate_serving_args
 
+# Number of characters (or bytes) to pull from the underlying handle per read in chars mode.
+BLOCK_SIZE = 1 << 20
 
-def serve(file: Union[str, pathlib.Path, io.IOBase], serving_size: int, mode='lines') \
-                -> Generator[str, None, None]:
+# Dollops of up to this many lines are cut at listed newline offsets in mmap lines mode, rather than counted.
+SHORT_SERVING_LINES = 16
+
+# Number of decompressed blocks to hold ready ahead of the reader of a compressed file.
+N_DECOMPRESSED_BLOCKS = 4
+
+# Compression formats, recognised by file suffix or by the magic bytes at the start of the file.
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.gzip': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.lzma': 'xz'}
+COMPRESSION_MAGIC = {
+    'gzip': re.compile(b'\x1f\x8b\x08'),
+    'bz2': re.compile(b'BZh[1-9](1AY&SY|\x17rE8P\x90)'),
+    'xz': re.compile(b'\xfd7zXZ\x00'),
+}
+
+
+class FileShard(NamedTuple):
+    """
+    A byte range of a file, produced by `shard`, that can be served independently of the rest of the file.
+
+    :param path: The path of the file.
+    :param start: The offset of the first byte in the shard.
+    :param end: The offset one past the last byte in the shard.
+    """
+    path: str
+    start: int
+    end: int
+
+
+def serve(file: Union[str, pathlib.Path, io.IOBase, FileShard], serving_size: Union[int, str] = None,
+          mode='lines', n_servings: int = None, as_list: bool = False, mmap: bool = False, index: "LineIndex" = None,
+          start: int = 0, compression: str = 'infer', target_latency: float = None, min_serving_size: int = 1,
+          max_serving_size: int = None, stats: ServingStats = None, on_dollop: Callable[[DollopRecord], None] = None) \
+        -> Generator[str, None, None]:
     """
     Read a file small dollops at a time.
 
-    :param file: The path or file handle.
-    :param serving_size: The max number of lines or characters in each serving.
+    :param file: The path, file handle, or a FileShard from `shard`.
+    :param serving_size: The max number of lines or characters in each serving, or 'auto' to size each dollop so
+        that it takes about target_latency seconds. 'auto' can't be used with mmap=True or an index.
     :param mode: Either 'lines' or 'chars'/'characters' to read line-by-line or character-by-character.
+    :param n_servings: The number of dollops, of roughly equal size. Only available with mmap=True, or with an
+        index in lines mode.
+    :param as_list: In lines mode, yield each dollop as a list of lines instead of a single joined string.
+    :param mmap: If True, memory-map the whole file and yield zero-copy memoryview slices of it. In chars mode
+        servings are counted in bytes; in lines mode each slice ends on a line boundary.
+    :param index: A LineIndex for the file, from `build_index`. Lines mode only. Allows n_servings, and lets
+        `start` seek directly to the requested dollop.
+    :param start: The number of the first dollop to serve, e.g. to resume a job part of the way through a file.
+    :param compression: For file paths, 'gzip', 'bz2', 'xz' or None. Default 'infer' works it out from the file
+        suffix, or failing that the first few bytes of the file. Compressed files are decompressed as they are
+        read, on a background thread, and can't be used with mmap=True or an index.
+    :param target_latency: With serving_size='auto', the desired time in seconds to read and consume each dollop.
+        Dollop sizes start at min_serving_size, and are adjusted to a smoothed estimate of the time taken per line
+        (or character).
+    :param min_serving_size: With serving_size='auto', the smallest dollop size. Default is 1.
+    :param max_serving_size: With serving_size='auto', the largest dollop size. Default is no limit.
+    :param stats: A ServingStats in which to record the timings, sizes and throughput of the dollops. Items are
+        counted as lines in lines mode, and characters (or bytes, with mmap=True) in chars mode.
+    :param on_dollop: Function called with a DollopRecord of the measurements for each dollop.
     :return:
     """
 
-    validate_serving_args(serving_size, n_servings=None)
+    if serving_size == 'auto':
+        if mmap or index is not None:
+            raise ValueError("serving_size='auto' cannot be used with mmap=True or an index.")
+        sizes = calculate_adaptive_sizes(target_latency, min_serving_size, max_serving_size, n_servings)
+    else:
+        validate_serving_args(serving_size, n_servings)
+        sizes = None
+
+    if n_servings is not None and not (mmap or index is not None):
+        raise ValueError('Files and IO streams can only be dolloped using n_servings with mmap=True or an index.')
+
+    if not isinstance(start, int) or start < 0:
+        raise ValueError('start must be a non-negative integer.')
 
     if mode == 'lines':
-        def read_next(h):
-            try:
-                return next(h)
-            except StopIteration:
-                return ''
+        serve_handle = partial(_serve_lines, serving_size=sizes or serving_size, as_list=as_list)
 
     elif mode in ('characters', 'chars'):
-        def read_next(h):
-            return h.read(1)
+        if as_list:
+            raise ValueError('as_list can only be used in lines mode.')
+        if sizes is not None:
+            serve_handle = partial(_serve_chars_adaptive, sizes=sizes)
+        else:
+            serve_handle = partial(_serve_chars, serving_size=serving_size)
 
     else:
         raise ValueError('Invalid mode for dollop.file.serve')
 
-    def _serve_handle(h):
-        binary = 'b' in h.mode
+    if mmap:
+        if as_list:
+            raise ValueError('as_list cannot be used with mmap=True.')
+        serve_handle = partial(_serve_mmap, serving_size=serving_size, n_servings=n_servings, mode=mode)
 
-        finished = False
-        while not finished:
+    if index is not None:
+        if mode != 'lines' or mmap:
+            raise ValueError('A line index can only be used in lines mode, without mmap.')
+        serve_handle = partial(_serve_indexed_lines, index=index, serving_size=serving_size,
+                               n_servings=n_servings, start=start, as_list=as_list)
 
-            dollop = b'' if binary else ''
-            for _ in range(serving_size):
-                token = read_next(h)
-                if token:
-                    dollop += token
-                else:
-                    finished = True
-                    break
+    elif start:
+        # Without an index there is nowhere to seek to, so read through the skipped dollops.
+        serve_handle = partial(_skip_dollops, serve_handle=serve_handle, n_dollops=start)
+
+    if stats is not None or on_dollop is not None:
+        count = _count_dollop_lines if mode == 'lines' and not as_list else len
+        serve_handle = partial(_instrument_dollops, serve_handle=serve_handle, stats=stats, on_dollop=on_dollop,
+                               count=count)
 
-            # Check for edge case where there's nothing left.
-            if dollop:
-                yield dollop
+    if isinstance(file, FileShard):
+        if mmap or index is not None:
+            raise ValueError('File shards cannot be served with mmap=True or an index.')
+        with _open_shard(file) as f:
+            yield from serve_handle(f)
 
-    if isinstance(file, io.IOBase):
+    elif isinstance(file, io.IOBase):
         if 'r' not in file.mode:
             raise ValueError('Can only dollop file handles with a read attribute.')
-        yield from _serve_handle(file)
+        yield from serve_handle(file)
 
     elif isinstance(file, (str, pathlib.Path)):
-        with open(file, 'r') as f:
-            yield from _serve_handle(f)
+        # Open the file only once, so that pipes aren't drained (or blocked on) by checking for compression.
+        with open(file, 'rb') as raw:
+            if compression == 'infer':
+                compression = _infer_compression(file, raw)
+
+            if compression is None:
+                with raw if mmap else io.TextIOWrapper(raw) as f:
+                    yield from serve_handle(f)
+
+            else:
+                if mmap or index is not None:
+                    raise ValueError('Compressed files cannot be served with mmap=True or an index.')
+                with _open_compressed(raw, compression) as f:
+                    yield from serve_handle(f)
+
+
+def shard(file: Union[str, pathlib.Path], n_shards: int) -> List[FileShard]:
+    """
+    Split a file into (almost) equal byte ranges for independent processing, e.g. one per worker process.
+
+    The boundaries are first placed evenly using `calculate_slices`, then each is moved forward to the start of
+    the next line, so no line is split across shards. Shards may be empty if a single line spans several of them.
+    Compressed files can't be sharded, as a byte range of one can't be decompressed on its own.
+
+    :param file: The path of the file.
+    :param n_shards: The number of shards.
+    :return: List of FileShard descriptors, covering the whole file in order.
+    """
+
+    if not isinstance(file, (str, pathlib.Path)):
+        raise TypeError('Dollop file.shard only supports file paths.')
+
+    size = os.path.getsize(file)
+    slices = calculate_slices(size, n_servings=n_shards)
+
+    shards = []
+    with open(file, 'rb') as f:
+        if _infer_compression(file, f) is not None:
+            raise ValueError('Compressed files cannot be sharded.')
+
+        start = 0
+        for slc in slices:
+            end = slc.stop
+            if start < end < size:
+                # Read through to the end of the line containing the byte before the boundary.
+                f.seek(end - 1)
+                f.readline()
+                end = f.tell()
+            end = max(start, end)
+            shards.append(FileShard(str(file), start, end))
+            start = end
+
+    return shards
+
+
+def _open_shard(file_shard: FileShard) -> io.TextIOWrapper:
+    """
+    Open a text handle over the byte range of a file shard, which ends at the end of the shard.
+
+    :param file_shard: The shard descriptor.
+    :return: The open text handle.
+    """
+
+    raw = open(file_shard.path, 'rb', buffering=0)
+    raw.seek(file_shard.start)
+    return io.TextIOWrapper(io.BufferedReader(_RangeReader(raw, file_shard.end)))
+
+
+class _RangeReader(io.RawIOBase):
+    """
+    A raw stream that reads from another raw stream up to a fixed end offset.
+    """
+
+    def __init__(self, raw: io.RawIOBase, end: int):
+        self._raw = raw
+        self._remaining = end - raw.tell()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n_bytes = min(len(b), self._remaining)
+        if n_bytes <= 0:
+            return 0
+        n_bytes = self._raw.readinto(memoryview(b)[:n_bytes])
+        self._remaining -= n_bytes
+        return n_bytes
+
+    def close(self) -> None:
+        self._raw.close()
+        super().close()
+
+
+def _infer_compression(file: Union[str, pathlib.Path], h: io.BufferedReader) -> Union[str, None]:
+    """
+    Work out the compression format of a file from its suffix, or failing that its magic bytes. The magic bytes
+    are only checked for regular files, by peeking at the open handle without moving it.
+
+    :param file: The path of the file.
+    :param h: The file, open in binary mode.
+    :return: 'gzip', 'bz2', 'xz', or None if the file isn't compressed.
+    """
+
+    compression = COMPRESSION_SUFFIXES.get(pathlib.Path(file).suffix.lower())
+    if compression is not None:
+        return compression
+
+    if not S_ISREG(os.fstat(h.fileno()).st_mode):
+        return None
+
+    head = h.peek(16)[:16]
+
+    for compression, magic in COMPRESSION_MAGIC.items():
+        if magic.match(head):
+            return compression
+
+    return None
+
+
+def _open_compressed(h: io.BufferedReader, compression: str) -> io.TextIOWrapper:
+    """
+    Open a text handle that decompresses a file as it is read. The decompression runs on a background thread,
+    a block at a time, while the consumer works on the blocks already decompressed.
+
+    :param h: The compressed file, open in binary mode. It is left open when the text handle is closed.
+    :param compression: 'gzip', 'bz2' or 'xz'.
+    :return: The open text handle.
+    """
+
+    if compression == 'gzip':
+        import gzip
+        open_compressed = gzip.open
+    elif compression == 'bz2':
+        import bz2
+        open_compressed = bz2.open
+    elif compression == 'xz':
+        import lzma
+        open_compressed = lzma.open
+    else:
+        raise ValueError(f"compression must be 'infer', 'gzip', 'bz2', 'xz' or None, not {compression!r}.")
+
+    raw = _ThreadedReader(partial(open_compressed, h, 'rb'))
+    return io.TextIOWrapper(io.BufferedReader(raw, buffer_size=BLOCK_SIZE))
+
+
+class _ThreadedReader(io.RawIOBase):
+    """
+    A raw stream over blocks read from another stream on a background thread, using `prefetch`. The other stream is
+    opened, read and closed on that thread.
+    """
+
+    def __init__(self, opener: Callable[[], io.IOBase]):
+        self._blocks = prefetch(self._read_blocks(opener), N_DECOMPRESSED_BLOCKS)
+        self._block = memoryview(b'')
+
+    @staticmethod
+    def _read_blocks(opener: Callable[[], io.IOBase]) -> Generator[bytes, None, None]:
+        with opener() as f:
+            yield from iter(partial(f.read, BLOCK_SIZE), b'')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if not self._block:
+            self._block = memoryview(next(self._blocks, b''))
+        n_bytes = min(len(b), len(self._block))
+        b[:n_bytes] = self._block[:n_bytes]
+        self._block = self._block[n_bytes:]
+        return n_bytes
+
+    def close(self) -> None:
+        self._blocks.close()
+        super().close()
+
+
+class LineIndex:
+    """
+    The byte offset of the start of every line in a file, along with the size and modification time of the file
+    when it was indexed, so that a stale index can be detected.
+
+    :param offsets: Array of line start offsets, followed by the file size. Has one more entry than there are lines.
+    :param size: The size of the indexed file, in bytes.
+    :param mtime_ns: The modification time of the indexed file, in nanoseconds.
+    """
+
+    _MAGIC = b'DOLLOPIX'
+    _HEADER = struct.Struct('<8sQQQ')
+
+    def __init__(self, offsets: array, size: int, mtime_ns: int):
+        self.offsets = offsets
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def is_valid(self, file: Union[str, pathlib.Path, io.IOBase]) -> bool:
+        """
+        Check whether the index still describes a file, by comparing its size and modification time.
+
+        :param file: The path or file handle.
+        :return: True if the file is unchanged since it was indexed.
+        """
+
+        stat = os.fstat(file.fileno()) if isinstance(file, io.IOBase) else os.stat(file)
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+    def save(self, path: Union[str, pathlib.Path]) -> None:
+        """
+        Write the index to a sidecar file.
+
+        :param path: The path of the sidecar file.
+        """
+
+        offsets = array('Q', self.offsets)
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+
+        with open(path, 'wb') as f:
+            f.write(self._HEADER.pack(self._MAGIC, self.size, self.mtime_ns, len(offsets)))
+            offsets.tofile(f)
+
+    @classmethod
+    def load(cls, path: Union[str, pathlib.Path]) -> "LineIndex":
+        """
+        Read an index from a sidecar file written by `save`.
+
+        :param path: The path of the sidecar file.
+        :return: The loaded index.
+        """
+
+        with open(path, 'rb') as f:
+            magic, size, mtime_ns, n_offsets = cls._HEADER.unpack(f.read(cls._HEADER.size))
+            if magic != cls._MAGIC:
+                raise ValueError(f'{path} is not a dollop line index.')
+
+            offsets = array('Q')
+            offsets.fromfile(f, n_offsets)
+
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+
+        return cls(offsets, size, mtime_ns)
+
+
+def build_index(file: Union[str, pathlib.Path], sidecar: Union[bool, str, pathlib.Path] = None) -> LineIndex:
+    """
+    Build an index of the line offsets in a file, scanning it a block at a time.
+
+    If a sidecar path is given (or True, for `<file>.idx`), a valid index already stored there is loaded instead
+    of rescanning the file, and a freshly built index is written there.
+
+    :param file: The path of the file.
+    :param sidecar: Optional path of a sidecar file in which to cache the index.
+    :return: The line index.
+    """
+
+    if not isinstance(file, (str, pathlib.Path)):
+        raise TypeError('Dollop file.build_index only supports file paths.')
+
+    if sidecar is True:
+        sidecar = f'{file}.idx'
+
+    if sidecar and os.path.exists(sidecar):
+        index = LineIndex.load(sidecar)
+        if index.is_valid(file):
+            return index
+
+    with open(file, 'rb') as f:
+        stat = os.fstat(f.fileno())
+
+        offsets = array('Q', [0])
+        position = 0
+        for block in iter(partial(f.read, BLOCK_SIZE), b''):
+            # Each newline ends a line, so the next line starts one byte after it.
+            line_lengths = map(add, map(len, block.split(b'\n')[:-1]), repeat(1))
+            offsets.extend(map(add, accumulate(line_lengths), repeat(position)))
+            position += len(block)
+
+    # Close off a final line with no trailing newline.
+    if offsets[-1] != position:
+        offsets.append(position)
+
+    index = LineIndex(offsets, stat.st_size, stat.st_mtime_ns)
+    if sidecar:
+        index.save(sidecar)
+
+    return index
+
+
+def _serve_lines(h, serving_size: Union[int, Iterable[int]], as_list: bool = False) -> Generator[str, None, None]:
+    """
+    Serve an open handle in lines mode, pulling each batch of lines with a single islice and joining them once.
+
+    :param h: The open file handle.
+    :param serving_size: The max number of lines in each serving, or an iterable of the max number in each one.
+    :param as_list: If True, yield each dollop as a list of lines rather than joining them.
+    :return: Generator yielding str or bytes dollops, matching the handle type.
+    """
+
+    join = h.read(0).join
+    sizes = repeat(serving_size) if isinstance(serving_size, int) else serving_size
+
+    for size in sizes:
+        lines = list(islice(h, size))
+
+        # Check for edge case where there's nothing left.
+        if not lines:
+            return
+
+        yield lines if as_list else join(lines)
+
+
+def _serve_chars(h, serving_size: int) -> Generator[str, None, None]:
+    """
+    Serve an open handle in chars mode, reading it in large blocks and cutting each block into dollops.
+
+    Reads may return fewer characters than requested (e.g. raw or non-blocking streams), so any
+    incomplete dollop is carried over and topped up by the next block.
+
+    :param h: The open file handle.
+    :param serving_size: The max number of characters (or bytes) in each serving.
+    :return: Generator yielding str or bytes dollops, matching the handle type.
+    """
+
+    block_size = max(serving_size, BLOCK_SIZE)
+    buffer = h.read(0)
+
+    finished = False
+    while not finished:
+        block = h.read(block_size)
+        finished = not block
+        buffer = buffer + block if buffer else block
+
+        n_full = len(buffer) // serving_size
+        for i in range(n_full):
+            yield buffer[i * serving_size:(i + 1) * serving_size]
+        buffer = buffer[n_full * serving_size:]
+
+    if buffer:
+        yield buffer
+
+
+def _serve_chars_adaptive(h, sizes: Iterable[int]) -> Generator[str, None, None]:
+    """
+    Serve an open handle in chars mode, with a size for each dollop, reading each dollop directly from the handle.
+
+    :param h: The open file handle.
+    :param sizes: The max number of characters (or bytes) in each serving.
+    :return: Generator yielding str or bytes dollops, matching the handle type.
+    """
+
+    for size in sizes:
+        dollop = h.read(size)
+        if not dollop:
+            return
+        yield dollop
+
+
+def _serve_mmap(h, serving_size: int = None, n_servings: int = None, mode='lines') \
+        -> Generator[memoryview, None, None]:
+    """
+    Serve an open handle by memory-mapping the underlying file and slicing it without copying.
+
+    The mapping stays alive for as long as any yielded slice does, and is released once they are all gone.
+
+    :param h: The open file handle. Must be backed by a real file descriptor.
+    :param serving_size: The max number of lines or bytes in each serving. Mutually exclusive with n_servings.
+    :param n_servings: The number of dollops, of roughly equal size. Mutually exclusive with serving_size.
+    :param mode: Either 'lines' or 'chars'/'characters'.
+    :return: Generator yielding memoryview slices of the file.
+    """
+
+    size = os.fstat(h.fileno()).st_size
+
+    # Empty files cannot be mapped, but still need to produce n_servings empty dollops.
+    mm = mmap_lib.mmap(h.fileno(), 0, access=mmap_lib.ACCESS_READ) if size else None
+    view = memoryview(mm if mm is not None else b'')
+
+    try:
+        if mode == 'lines':
+            if n_servings is not None:
+                total_lines = _count_lines(view)
+                sizes = (slc.stop - slc.start for slc in calculate_slices(total_lines, n_servings=n_servings))
+            else:
+                sizes = repeat(serving_size)
+
+            start = 0
+            cursor = _LineCursor(mm) if mm is not None else None
+            for n_lines in sizes:
+                if start >= size and n_servings is None:
+                    break
+                stop = cursor.skip(start, n_lines) if cursor is not None else 0
+                yield view[start:stop]
+                start = stop
+
+        else:
+            for slc in calculate_slices(size, serving_size=serving_size, n_servings=n_servings):
+                yield view[slc]
+
+    finally:
+        view.release()
+        if mm is not None:
+            try:
+                mm.close()
+            except BufferError:
+                # Slices are still held by the consumer; the mapping is closed when the last one is collected.
+                pass
+
+
+def _count_lines(buffer) -> int:
+    """
+    Count the lines in a bytes-like buffer, including a final line with no trailing newline.
+
+    :param buffer: The bytes-like buffer.
+    :return: The number of lines.
+    """
+
+    size = len(buffer)
+    n_newlines = sum(bytes(buffer[i:i + BLOCK_SIZE]).count(b'\n') for i in range(0, size, BLOCK_SIZE))
+    ends_with_newline = size == 0 or buffer[size - 1] == ord('\n')
+    return n_newlines if ends_with_newline else n_newlines + 1
+
+
+class _LineCursor:
+    """
+    Finds the line boundaries in a memory-mapped file, one dollop at a time, scanning it in place a window at a time.
+
+    Dollops of a few lines are cut at the newline offsets of the block ahead, which are all listed in one pass.
+    For dollops of many lines, the newlines are counted in windows sized from the line length seen so far, until
+    there are enough of them, and the last one is then found by searching back from the end of the last window.
+
+    :param mm: The memory-mapped file.
+    """
+
+    def __init__(self, mm: mmap_lib.mmap):
+        self._mm = mm
+        self._size = len(mm)
+        self._line_bytes = 64.
+        # Offsets just past the listed newlines that have not been used yet, up to the offset scanned so far.
+        self._ends = []
+        self._next = 0
+        self._scanned = 0
+
+    def skip(self, start: int, n_lines: int) -> int:
+        """
+        Find the offset just past the n-th newline at or after `start`, which must be where the last dollop ended.
+
+        :param start: The offset from which to start counting lines.
+        :param n_lines: The number of lines to skip.
+        :return: The offset of the start of the next line, or the file size if the file runs out first.
+        """
+
+        # Fast path, for newlines that are already listed.
+        i = self._next + n_lines
+        if 0 < n_lines <= SHORT_SERVING_LINES and i <= len(self._ends):
+            self._next = i
+            return self._ends[i - 1]
+
+        if n_lines <= 0 or start >= self._size:
+            return min(start, self._size)
+
+        stop = self._skip_listed(n_lines) if n_lines <= SHORT_SERVING_LINES else self._skip_counted(start, n_lines)
+        self._line_bytes = (stop - start) / n_lines
+        return stop
+
+    def _skip_listed(self, n_lines: int) -> int:
+        ends, i = self._ends, self._next
+
+        while len(ends) - i < n_lines and self._scanned < self._size:
+            stop = min(self._scanned + max(BLOCK_SIZE >> 4, int(self._line_bytes * n_lines * 2)), self._size)
+            lines = self._mm[self._scanned:stop].split(b'\n')[:-1]
+            ends = ends[i:] + list(accumulate(map(add, map(len, lines), repeat(1)), initial=self._scanned))[1:]
+            i = 0
+            self._scanned = stop
+
+        if len(ends) - i < n_lines:
+            self._ends, self._next = [], 0
+            return self._size
+
+        self._ends, self._next = ends, i + n_lines
+        return ends[i + n_lines - 1]
+
+    def _skip_counted(self, start: int, n_lines: int) -> int:
+        # Newlines listed ahead would be skipped over, so start listing again afterwards.
+        self._ends, self._next = [], 0
+
+        # Count the newlines in windows sized for the lines still needed, plus a couple to spare. The spare room
+        # doubles each time, in case the lines are much longer than those seen so far.
+        remaining = n_lines
+        spare = 16
+        while True:
+            window = self._mm[start:start + int(self._line_bytes * (remaining + 2)) + spare]
+            n_newlines = window.count(b'\n')
+            if n_newlines >= remaining:
+                break
+            if start + len(window) >= self._size:
+                self._scanned = self._size
+                return self._size
+            remaining -= n_newlines
+            start += len(window)
+            spare *= 2
+
+        end = len(window)
+        for _ in range(n_newlines - remaining + 1):
+            end = window.rfind(b'\n', 0, end)
+
+        self._scanned = start + end + 1
+        return self._scanned
+
+
+def _serve_indexed_lines(h, index: LineIndex, serving_size: int = None, n_servings: int = None, start: int = 0,
+                         as_list: bool = False) -> Generator[str, None, None]:
+    """
+    Serve an open handle in lines mode, using a line index to seek straight to the first requested dollop.
+
+    :param h: The open file handle.
+    :param index: The line index for the file.
+    :param serving_size: The max number of lines in each serving. Mutually exclusive with n_servings.
+    :param n_servings: The number of dollops, of roughly equal size. Mutually exclusive with serving_size.
+    :param start: The number of the first dollop to serve.
+    :param as_list: If True, yield each dollop as a list of lines rather than joining them.
+    :return: Generator yielding str or bytes dollops, matching the handle type.
+    """
+
+    if not index.is_valid(h):
+        raise ValueError('The line index is out of date for this file.')
+
+    slices = calculate_slices(len(index), serving_size=serving_size, n_servings=n_servings)[start:]
+    if not slices:
+        return
+
+    h.seek(index.offsets[slices[0].start])
+    join = h.read(0).join
+
+    for slc in slices:
+        lines = list(islice(h, slc.stop - slc.start))
+        yield lines if as_list else join(lines)
+
+
+def _skip_dollops(h, serve_handle, n_dollops: int) -> Generator[str, None, None]:
+    """
+    Serve an open handle, discarding the first few dollops.
+
+    :param h: The open file handle.
+    :param serve_handle: The function that serves the handle.
+    :param n_dollops: The number of dollops to discard.
+    :return: Generator yielding the remaining dollops.
+    """
+
+    yield from islice(serve_handle(h), n_dollops, None)
+
+
+def _instrument_dollops(h, serve_handle, stats: ServingStats = None, on_dollop: Callable = None,
+                        count: Callable = None) -> Generator[str, None, None]:
+    """
+    Serve an open handle, measuring each dollop with `instrument`.
+
+    :param h: The open file handle.
+    :param serve_handle: The function that serves the handle.
+    :param stats: A ServingStats in which to record the measurements.
+    :param on_dollop: Function called with a DollopRecord of the measurements for each dollop.
+    :param count: Function returning the number of items in a dollop.
+    :return: Generator yielding the dollops.
+    """
+
+    yield from instrument(serve_handle(h), stats, on_dollop, count=count)
+
+
+def _count_dollop_lines(dollop: Union[str, memoryview]) -> int:
+    """
+    Count the lines in a dollop served in lines mode, including a final line with no trailing newline.
+
+    :param dollop: The dollop, as a string or memoryview.
+    :return: The number of lines.
+    """
+
+    if isinstance(dollop, str):
+        return dollop.count('\n') + int(bool(dollop) and not dollop.endswith('\n'))
+
+    return _count_lines(dollop)
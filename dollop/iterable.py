@@ -0,0 +1,64 @@
+from itertools import islice
+from typing import Any, Callable, Generator, Iterable
+from collections.abc import Iterable as IterableType
+
+from .stats import DollopRecord, ServingStats, instrument
+from ._utils import validate_serving_args
+
+
+def serve(items: Iterable[Any], serving_size: int = None, n_servings: int = None, container: Callable = None,
+          stats: ServingStats = None, on_dollop: Callable[[DollopRecord], None] = None) \
+        -> Generator[Any, None, None]:
+    """
+    Split any iterable, such as a generator, map object or database cursor, into dollops as it is consumed.
+    Only one dollop is held in memory at a time.
+
+    :param items: The iterable of items.
+    :param serving_size: The number of items per dollop.
+    :param n_servings: Not supported, since the length of an iterable is not known in advance.
+    :param container: The type of each dollop: list (default), tuple, numpy.ndarray, or any other callable that
+        builds a container from a list of items.
+    :param stats: A ServingStats in which to record the timings, sizes and throughput of the dollops.
+    :param on_dollop: Function called with a DollopRecord of the measurements for each dollop.
+    :return: Generator yielding containers of items.
+    """
+
+    if not isinstance(items, IterableType):
+        raise NotImplementedError('Dollop iterable.serve only supports iterable objects.')
+
+    if n_servings is not None:
+        raise ValueError('Iterables cannot be dolloped using n_servings. Use serving_size instead.')
+
+    validate_serving_args(serving_size, n_servings)
+
+    make_container = _container_factory(container)
+    iterator = iter(items)
+
+    # Pull lists of items until an empty one shows the iterator is exhausted.
+    dollops = map(make_container, iter(lambda: list(islice(iterator, serving_size)), []))
+
+    if stats is not None or on_dollop is not None:
+        dollops = instrument(dollops, stats, on_dollop)
+
+    yield from dollops
+
+
+def _container_factory(container: Callable = None) -> Callable:
+    """
+    Get the function that turns a list of items into a dollop of the requested container type.
+
+    :param container: The requested container type, or None for a list.
+    :return: A function taking a list and returning the dollop.
+    """
+
+    if container is None or container is list:
+        return lambda dollop: dollop
+
+    if not callable(container):
+        raise TypeError('container must be list, tuple, numpy.ndarray or another callable.')
+
+    if getattr(container, '__module__', None) == "numpy" and getattr(container, '__name__', None) == "ndarray":
+        import numpy
+        return numpy.array
+
+    return container
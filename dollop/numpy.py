@@ -1,20 +1,48 @@
-from typing import Generator, TYPE_CHECKING
+from typing import Callable, Generator, Iterable, Iterator, Sequence, Tuple, TYPE_CHECKING
 
-from ._utils import calculate_slices
+from .stats import DollopRecord, ServingStats, instrument
+from ._utils import Tile, calculate_adaptive_slices, calculate_slices, calculate_tiles, calculate_weighted_slices, \
+    calculate_windows, max_adaptive_size, serving_size_from_bytes
 
 if TYPE_CHECKING:
     import numpy # Keep this here for string-based type-checking
 
 
-def serve(array: "numpy.ndarray", serving_size: int = None, n_servings: int = None, dim: int = 0) -> \
+def serve(array: "numpy.ndarray", serving_size: "int | str" = None, n_servings: int = None, dim: int = 0,
+          serving_bytes: int = None, weights: "Sequence[float] | Callable" = None,
+          contiguous: bool = False, out: "numpy.ndarray | Sequence[numpy.ndarray]" = None, window: int = None,
+          step: int = 1, target_latency: float = None, min_serving_size: int = 1, max_serving_size: int = None,
+          stats: ServingStats = None, on_dollop: Callable[[DollopRecord], None] = None) -> \
         Generator["numpy.ndarray", None, None]:
     """
     Read a NumPy array small dollops at a time.
 
     :param array: The NumPy array to slice.
-    :param serving_size: The size of each dollop. Mutually exclusive with n_servings.
+    :param serving_size: The size of each dollop, or 'auto' to size each dollop so that it takes about
+        target_latency seconds. Mutually exclusive with n_servings.
     :param n_servings: The number of dollops, of roughly equal size. Mutually exclusive with serving_size.
     :param dim: The dimension along which to slice. Default is 0.
+    :param serving_bytes: The max number of bytes in each dollop, from which the serving size is worked out.
+        Mutually exclusive with serving_size and n_servings.
+    :param weights: With n_servings, balance the dollops by total weight instead of size along dim. Either a
+        sequence with the (non-negative) weight of each index along dim, or a function returning the weight of
+        the sub-array at an index.
+    :param window: Serve overlapping windows of this size along dim instead, one every `step` indices. Only whole
+        windows are served. Each window is a view, so they all share the array's memory. Mutually exclusive with
+        serving_size, n_servings, serving_bytes and weights.
+    :param step: With window, the distance along dim between the starts of consecutive windows. Default is 1.
+    :param target_latency: With serving_size='auto', the desired time in seconds to produce and consume each
+        dollop. Dollop sizes start at min_serving_size, and are adjusted to a smoothed estimate of the time taken
+        per index along dim.
+    :param min_serving_size: With serving_size='auto', the smallest dollop size. Default is 1.
+    :param max_serving_size: With serving_size='auto', the largest dollop size. Default is no limit. Needed with
+        contiguous or out, whose buffers must hold the largest dollop.
+    :param stats: A ServingStats in which to record the timings, sizes and throughput of the dollops.
+    :param on_dollop: Function called with a DollopRecord of the measurements for each dollop.
+    :param contiguous: If True, yield C-contiguous dollops. Dollops that aren't already contiguous are copied into
+        one of two buffers that are reused in turn, so each such dollop is only valid until two more are served.
+    :param out: Caller-supplied C-contiguous buffer, or sequence of buffers used in turn, into which every dollop
+        is copied. Each must have the same dtype as the array and at least as many elements as the largest dollop.
     :return: Generator yielding array slices.
     """
 
@@ -27,7 +55,22 @@ def serve(array: "numpy.ndarray", serving_size: int = None, n_servings: int = No
     if dim < 0 or dim >= array.ndim:
         raise ValueError(f"Specified dim ({dim}) must be smaller than the number of array dimensions ({array.ndim})")
 
-    slices = calculate_slices(total=array.shape[dim], serving_size=serving_size, n_servings=n_servings)
+    size = array.shape[dim]
+
+    if serving_bytes is not None:
+        row_bytes = array.itemsize * (array.size // size) if size else 0
+        serving_size = serving_size_from_bytes(serving_bytes, row_bytes, size, serving_size, n_servings)
+
+    if window is not None:
+        slices = calculate_windows(size, window, step, serving_size, n_servings, weights)
+    elif weights is not None:
+        # A weights function is applied to each sub-array along dim.
+        items = array.swapaxes(0, dim) if callable(weights) else None
+        slices = calculate_weighted_slices(weights, items, size, serving_size=serving_size, n_servings=n_servings)
+    elif serving_size == 'auto':
+        slices = calculate_adaptive_slices(size, target_latency, min_serving_size, max_serving_size, n_servings)
+    else:
+        slices = calculate_slices(total=size, serving_size=serving_size, n_servings=n_servings)
 
     # Make a view of the array with the chosen dim at the front.
     axes = list(range(array.ndim))
@@ -37,6 +80,99 @@ def serve(array: "numpy.ndarray", serving_size: int = None, n_servings: int = No
     # Get inverse permutation
     axes_inv = [axes.index(i) for i in range(array.ndim)]
 
-    for slc in slices:
-        dollop = array_permutated[slc]
-        yield dollop.transpose(axes_inv)
+    dollops = (array_permutated[slc].transpose(axes_inv) for slc in slices)
+
+    if out is not None or contiguous:
+        max_rows = max_adaptive_size(max_serving_size, size, 'contiguous or out') if serving_size == 'auto' else \
+            slices.max_size
+        max_dollop_size = max_rows * (array.size // size if size else 0)
+        dollops = _copy_to_buffers(dollops, array, max_dollop_size, out, copy_contiguous=out is not None)
+
+    if stats is not None or on_dollop is not None:
+        dollops = instrument(dollops, stats, on_dollop, dim=dim)
+
+    yield from dollops
+
+
+def serve_tiles(array: "numpy.ndarray", tile: Sequence[int], dims: Sequence[int] = None,
+                halo: "int | Sequence[int]" = 0) -> Generator[Tuple[Tile, "numpy.ndarray"], None, None]:
+    """
+    Read a NumPy array one N-D tile at a time, e.g. 512x512 blocks of an image.
+
+    :param array: The NumPy array to tile.
+    :param tile: The size of each tile along each of dims. Tiles at the far edges may be smaller.
+    :param dims: The dims to tile, one per entry of tile. Defaults to the leading dims.
+    :param halo: The margin of neighbouring elements to include on each side of a tile (clipped at the edges of
+        the array), either one for all of dims or one per dim.
+    :return: Generator yielding (tile, view) pairs, where tile is a Tile giving the tile's position and view is
+        a view of the array covering tile.region.
+    """
+
+    if not (array.__class__.__module__.startswith("numpy") and array.__class__.__name__ == "ndarray"):
+        raise TypeError('Dollop numpy.serve_tiles only supports NumPy ndarray types.')
+
+    for tile_ in calculate_tiles(array.shape, tile, dims, halo):
+        yield tile_, array[tile_.region]
+
+
+def stitch(pieces: Iterable[Tuple[Tile, "numpy.ndarray"]], out: "numpy.ndarray") -> "numpy.ndarray":
+    """
+    Assemble per-tile outputs, e.g. from serve_tiles, into a preallocated array. The halo of each piece is
+    dropped, and its core is written in place.
+
+    :param pieces: (tile, piece) pairs, where each piece has the shape of tile.region along the tiled dims.
+    :param out: The array to write into.
+    :return: out.
+    """
+
+    for tile_, piece in pieces:
+        out[tile_.core] = piece[tile_.inner]
+
+    return out
+
+
+def _copy_to_buffers(dollops: Iterator["numpy.ndarray"], array: "numpy.ndarray", max_dollop_size: int,
+                     out: "numpy.ndarray | Sequence[numpy.ndarray]" = None, copy_contiguous: bool = True) \
+        -> Generator["numpy.ndarray", None, None]:
+    """
+    Copy each dollop into the next of a set of reusable C-contiguous buffers.
+
+    :param dollops: The dollops, as views of the array.
+    :param array: The NumPy array being served.
+    :param max_dollop_size: The number of elements in the largest dollop.
+    :param out: Caller-supplied buffer(s). If None, two buffers are allocated.
+    :param copy_contiguous: If False, dollops that are already C-contiguous are yielded as they are.
+    :return: Generator yielding the dollops, as C-contiguous arrays.
+    """
+
+    import numpy
+
+    if out is None:
+        buffers = [numpy.empty(max_dollop_size, dtype=array.dtype) for _ in range(2)]
+
+    else:
+        buffers = [out] if isinstance(out, numpy.ndarray) else list(out)
+
+        if not buffers:
+            raise ValueError("out must contain at least one buffer.")
+
+        for buffer in buffers:
+            if not (isinstance(buffer, numpy.ndarray) and buffer.flags.c_contiguous):
+                raise ValueError("Each out buffer must be a C-contiguous NumPy array.")
+            if buffer.dtype != array.dtype:
+                raise ValueError(f"Each out buffer must have dtype {array.dtype}, not {buffer.dtype}.")
+            if buffer.size < max_dollop_size:
+                raise ValueError(f"Each out buffer needs at least {max_dollop_size} elements, not {buffer.size}.")
+
+        buffers = [buffer.reshape(-1) for buffer in buffers]
+
+    i = 0
+    for dollop in dollops:
+        if not copy_contiguous and dollop.flags.c_contiguous:
+            yield dollop
+            continue
+
+        target = buffers[i % len(buffers)][:dollop.size].reshape(dollop.shape)
+        numpy.copyto(target, dollop)
+        i += 1
+        yield target
@@ -1,19 +1,49 @@
-from typing import Generator, TYPE_CHECKING
+import sys
 
-from ._utils import calculate_slices
+from typing import Any, Callable, Generator, List, TYPE_CHECKING
+
+from .stats import DollopRecord, ServingStats, instrument
+from ._utils import BoundaryPlan, budget_bounds, calculate_adaptive_slices, calculate_slices, \
+    calculate_weighted_slices, calculate_windows, prefix_sums, serving_size_from_bytes, validate_serving_args, \
+    validate_serving_bytes
 
 if TYPE_CHECKING:
+    import numpy # Keep this here for string-based type-checking
     import pandas # Keep this here for string-based type-checking
 
 
-def serve(pandas_obj: "pandas.DataFrame | pandas.Series", serving_size: int = None, n_servings: int = None) -> \
-        Generator["pandas.DataFrame | pandas.Series", None, None]:
+def serve(pandas_obj: "pandas.DataFrame | pandas.Series", serving_size: "int | str" = None, n_servings: int = None,
+          serving_bytes: int = None, group_by: Any = None, weights: Any = None, window: int = None,
+          step: int = 1, target_latency: float = None, min_serving_size: int = 1, max_serving_size: int = None,
+          stats: ServingStats = None, on_dollop: Callable[[DollopRecord], None] = None) \
+        -> Generator["pandas.DataFrame | pandas.Series", None, None]:
     """
     Read a Pandas object small dollops at a time.
 
     :param pandas_obj: The Pandas object.
-    :param serving_size: The size of each dollop. Mutually exclusive with n_servings.
+    :param serving_size: The size of each dollop, or 'auto' to size each dollop so that it takes about
+        target_latency seconds. Mutually exclusive with n_servings.
     :param n_servings: The number of dollops, of roughly equal size. Mutually exclusive with serving_size.
+    :param serving_bytes: The max (deep) memory usage of each dollop, in bytes, including the index. Rows holding
+        Python objects such as strings are measured individually, so dollops may have different numbers of rows.
+        Mutually exclusive with serving_size and n_servings.
+    :param group_by: Keep all rows with the same key in the same dollop. Either a column label or list of column
+        labels (DataFrames only), or an array of keys with one per row. Rows with the same key must be next to
+        each other. Dollops hold as many whole groups as fit in serving_size (a larger group gets a dollop of its
+        own), or with n_servings, the dollop boundaries are moved to the nearest group boundary.
+    :param weights: With n_servings, balance the dollops by total weight instead of number of rows. Either a column
+        label (DataFrames only), an array with the (non-negative) weight of each row, or a function returning the
+        weight of a row.
+    :param window: Serve overlapping windows of this many rows instead, one every `step` rows. Only whole windows
+        are served. Mutually exclusive with serving_size, n_servings, serving_bytes, group_by and weights.
+    :param step: With window, the number of rows between the starts of consecutive windows. Default is 1.
+    :param target_latency: With serving_size='auto', the desired time in seconds to produce and consume each
+        dollop. Dollop sizes start at min_serving_size, and are adjusted to a smoothed estimate of the time taken
+        per row.
+    :param min_serving_size: With serving_size='auto', the smallest dollop size. Default is 1.
+    :param max_serving_size: With serving_size='auto', the largest dollop size. Default is no limit.
+    :param stats: A ServingStats in which to record the timings, sizes and throughput of the dollops.
+    :param on_dollop: Function called with a DollopRecord of the measurements for each dollop.
     :return: Generator yielding sliced pandas objects.
     """
 
@@ -24,8 +54,182 @@ def serve(pandas_obj: "pandas.DataFrame | pandas.Series", serving_size: int = No
     if not (is_dataframe or is_series):
         raise TypeError(f"Dollop pandas.serve only supports pandas DataFrame or Series")
 
-    slices = calculate_slices(total=len(pandas_obj), serving_size=serving_size, n_servings=n_servings)
+    if window is not None:
+        if group_by is not None or serving_bytes is not None:
+            raise ValueError("window cannot be combined with group_by or serving_bytes.")
+        slices = calculate_windows(len(pandas_obj), window, step, serving_size, n_servings, weights)
+
+    elif group_by is not None:
+        if weights is not None:
+            raise ValueError("group_by cannot be combined with weights.")
+        if serving_bytes is not None:
+            raise ValueError("group_by cannot be combined with serving_bytes.")
+        validate_serving_args(serving_size, n_servings)
+        slices = _group_slices(pandas_obj, group_by, is_dataframe, serving_size=serving_size, n_servings=n_servings)
+
+    elif weights is not None:
+        if serving_bytes is not None:
+            raise ValueError("weights cannot be combined with serving_bytes.")
+
+        from pandas.api.types import is_hashable
+        if is_dataframe and is_hashable(weights) and weights in pandas_obj.columns:
+            weights = pandas_obj[weights].to_numpy()
+        elif callable(weights):
+            weights = (pandas_obj.apply(weights, axis=1) if is_dataframe else pandas_obj.map(weights)).to_numpy()
+        slices = calculate_weighted_slices(weights, total=len(pandas_obj), serving_size=serving_size,
+                                           n_servings=n_servings)
+
+    elif serving_bytes is not None:
+        validate_serving_bytes(serving_bytes, serving_size, n_servings)
+        row_bytes = _row_bytes(pandas_obj, is_dataframe)
+
+        if isinstance(row_bytes, int):
+            serving_size = serving_size_from_bytes(serving_bytes, row_bytes, len(pandas_obj))
+            slices = calculate_slices(total=len(pandas_obj), serving_size=serving_size)
+        else:
+            slices = BoundaryPlan(budget_bounds(prefix_sums(row_bytes), serving_bytes))
+
+    elif serving_size == 'auto':
+        slices = calculate_adaptive_slices(len(pandas_obj), target_latency, min_serving_size, max_serving_size,
+                                           n_servings)
+
+    else:
+        slices = calculate_slices(total=len(pandas_obj), serving_size=serving_size, n_servings=n_servings)
+
+    dollops = (pandas_obj.iloc[slc] for slc in slices)
+
+    if stats is not None or on_dollop is not None:
+        dollops = instrument(dollops, stats, on_dollop)
+
+    yield from dollops
+
+
+def _row_bytes(pandas_obj: "pandas.DataFrame | pandas.Series", is_dataframe: bool) -> "int | numpy.ndarray":
+    """
+    Estimate the deep memory usage of each row of a pandas object, including its index.
+
+    Columns of Python objects and of strings are measured element by element, as `memory_usage(deep=True)` does.
+    Other columns take the same number of bytes in every row.
+
+    :param pandas_obj: The Pandas object.
+    :param is_dataframe: Whether the object is a DataFrame rather than a Series.
+    :return: The number of bytes per row, or a NumPy array of bytes for each row if they vary.
+    """
+
+    import numpy
+    from pandas.api.types import is_string_dtype
+
+    n_rows = len(pandas_obj)
+    columns = [pandas_obj.index] + ([pandas_obj.iloc[:, i] for i in range(pandas_obj.shape[1])]
+                                    if is_dataframe else [pandas_obj])
+
+    fixed_bytes = 0
+    variable_bytes = None
+
+    for column in columns:
+        if column.__class__.__name__ == "RangeIndex":
+            # A range index takes the same memory however many rows it covers.
+            continue
+
+        is_string = is_string_dtype(column.dtype)
+
+        if column.dtype == object or is_string and getattr(column.dtype, 'storage', None) == 'python':
+            # Each row holds a pointer plus the object it points to.
+            sizes = numpy.fromiter(map(sys.getsizeof, column), dtype=numpy.int64, count=n_rows)
+            variable_bytes = sizes if variable_bytes is None else variable_bytes + sizes
+            fixed_bytes += numpy.dtype(object).itemsize
+
+        elif is_string and n_rows:
+            # Arrow-backed strings: each row holds its own bytes, and shares the offsets and validity bitmap evenly.
+            import pyarrow
+            import pyarrow.compute
+
+            sizes = pyarrow.compute.binary_length(pyarrow.array(column.array)).fill_null(0).to_numpy()
+            sizes = sizes.astype(numpy.int64, copy=False)
+            variable_bytes = sizes if variable_bytes is None else variable_bytes + sizes
+            memory = column.memory_usage(deep=True) if column is pandas_obj.index \
+                else column.memory_usage(index=False, deep=True)
+            fixed_bytes += -(-max(memory - int(sizes.sum()), 0) // n_rows)
+
+        elif n_rows:
+            memory = column.memory_usage(deep=True) if column is pandas_obj.index \
+                else column.memory_usage(index=False, deep=True)
+            fixed_bytes += -(-memory // n_rows)
+
+    if variable_bytes is None:
+        return int(fixed_bytes)
+
+    return variable_bytes + fixed_bytes
+
+
+def _group_slices(pandas_obj: "pandas.DataFrame | pandas.Series", group_by: Any, is_dataframe: bool,
+                  serving_size: int = None, n_servings: int = None) -> BoundaryPlan:
+    """
+    Work out dollop boundaries that fall between runs of equal keys, using vectorised run-length detection.
+
+    :param pandas_obj: The Pandas object.
+    :param group_by: Column label(s) or array of keys, as for `serve`.
+    :param is_dataframe: Whether the object is a DataFrame rather than a Series.
+    :param serving_size: The target size of each dollop. Mutually exclusive with n_servings.
+    :param n_servings: The number of dollops. Mutually exclusive with serving_size.
+    :return: BoundaryPlan of dollop slices.
+    """
+
+    import numpy
+    import pandas
+
+    n_rows = len(pandas_obj)
+    keys = _group_keys(pandas_obj, group_by, is_dataframe)
+
+    if any(len(key) != n_rows for key in keys):
+        raise ValueError("group_by keys must have one entry per row.")
+
+    codes = numpy.column_stack([pandas.factorize(key)[0] for key in keys]) if n_rows \
+        else numpy.zeros((0, len(keys)), dtype=numpy.int64)
+
+    # Group runs start wherever any key differs from the previous row's.
+    run_starts = numpy.flatnonzero((codes[1:] != codes[:-1]).any(axis=1)) + 1
+    run_bounds = numpy.concatenate(([0], run_starts, [n_rows])) if n_rows else numpy.zeros(1, dtype=numpy.int64)
+
+    if len(numpy.unique(codes, axis=0)) != len(run_bounds) - 1:
+        raise ValueError("Rows with the same group_by key must be contiguous. Sort by the key first.")
+
+    if serving_size is not None:
+        # The run boundaries are the prefix sums of the group sizes.
+        bounds = run_bounds[budget_bounds(run_bounds, serving_size)]
+
+    else:
+        targets = calculate_slices(n_rows, n_servings=n_servings).stops[:-1]
+        right = numpy.minimum(run_bounds.searchsorted(targets), len(run_bounds) - 1)
+        left = numpy.maximum(right - 1, 0)
+        nearest = numpy.where(targets - run_bounds[left] <= run_bounds[right] - targets, run_bounds[left],
+                              run_bounds[right])
+        bounds = numpy.concatenate(([0], nearest, [n_rows]))
+
+    return BoundaryPlan(bounds)
+
+
+def _group_keys(pandas_obj: "pandas.DataFrame | pandas.Series", group_by: Any, is_dataframe: bool) -> List[Any]:
+    """
+    Resolve the group_by argument into a list of key arrays, one per key column.
+
+    :param pandas_obj: The Pandas object.
+    :param group_by: Column label(s) or array of keys, as for `serve`.
+    :param is_dataframe: Whether the object is a DataFrame rather than a Series.
+    :return: List of key arrays.
+    """
+
+    from pandas.api.types import is_hashable
+
+    if is_dataframe:
+        if is_hashable(group_by) and group_by in pandas_obj.columns:
+            return [pandas_obj[group_by].to_numpy()]
+
+        if isinstance(group_by, list) and group_by and \
+                all(is_hashable(label) and label in pandas_obj.columns for label in group_by):
+            return [pandas_obj[label].to_numpy() for label in group_by]
 
-    for slc in slices:
-        yield pandas_obj.iloc[slc]
+    if is_hashable(group_by):
+        raise ValueError(f"group_by {group_by!r} is not a column of the pandas object.")
 
+    return [group_by]
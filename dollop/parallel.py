@@ -0,0 +1,277 @@
+import os
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Generator, NamedTuple, TYPE_CHECKING
+
+from ._utils import SlicePlan, calculate_slices
+from .auto import serve
+
+if TYPE_CHECKING:
+    import numpy # Keep this here for string-based type-checking
+    import pandas # Keep this here for string-based type-checking
+
+# State set up once in each worker process by `_init_worker`.
+_worker = {}
+
+
+class _SharedArray(NamedTuple):
+    """
+    Description of a NumPy array copied into a shared memory block, from which workers can rebuild it.
+    """
+    name: str
+    shape: tuple
+    dtype: str
+
+
+class _SharedPandas(NamedTuple):
+    """
+    Description of a pandas object whose NumPy-backed columns were copied into a shared memory block, from which
+    workers can rebuild it. Each entry of columns is either the (offset, dtype) of a column in the block, or the
+    values of a column that couldn't be shared (e.g. Python objects or extension types), to be pickled.
+    """
+    name: str
+    n_rows: int
+    columns: list
+    labels: Any
+    index: Any
+    is_series: bool
+
+
+def serve_map(fn: Callable[[Any], Any], obj: Any, serving_size: int = None, n_servings: int = None,
+              workers: int = None, ordered: bool = True, dim: int = 0, **kwargs) -> Generator[Any, None, None]:
+    """
+    Apply a function to every dollop of an object in a pool of worker processes.
+
+    NumPy arrays, and the NumPy-backed columns of DataFrames and Series, are copied once into shared memory.
+    Other pandas columns, pandas indexes and sequences are sent once to each worker, so each worker holds its own
+    copy of them. Workers then cut their own dollops using the slice plan, so no dollop is pickled. Anything else
+    is served as usual and each dollop is sent to a worker.
+
+    :param fn: The function to apply to each dollop. Must be picklable, e.g. defined at module level.
+    :param obj: The object that we wish to serve.
+    :param serving_size: The max number of items in each dollop. Mutually exclusive with n_servings.
+    :param n_servings: The number of (almost equal-sized) dollops. Mutually exclusive with serving_size.
+    :param workers: The number of worker processes. Defaults to the number of CPUs.
+    :param ordered: If True, yield results in dollop order; otherwise yield them as they complete.
+    :param dim: For arrays, the dimension along which to slice. Default is 0.
+    :param kwargs: Any additional arguments to pass to `dollop.serve`, for objects served as usual.
+    :return: Generator yielding the result of fn for each dollop.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    shared_memory = None
+
+    if _is_shareable_array(obj) and not kwargs:
+        if dim < 0 or dim >= obj.ndim:
+            raise ValueError(f"Specified dim ({dim}) must be smaller than the number of array dimensions ({obj.ndim})")
+        shared_memory, source = _share_array(obj)
+        plan = calculate_slices(obj.shape[dim], serving_size=serving_size, n_servings=n_servings)
+
+    elif _is_pandas(obj) and not kwargs and dim == 0:
+        shared_memory, source = _share_pandas(obj)
+        plan = calculate_slices(len(obj), serving_size=serving_size, n_servings=n_servings)
+
+    elif _is_sliceable(obj) and not kwargs and dim == 0:
+        source = obj
+        plan = calculate_slices(len(obj), serving_size=serving_size, n_servings=n_servings)
+
+    else:
+        if dim:
+            kwargs['dim'] = dim
+        source, plan = None, None
+        dollops = serve(obj, serving_size=serving_size, n_servings=n_servings, **kwargs)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(fn, source, plan, dim)) as executor:
+
+            if plan is not None:
+                submissions = (executor.submit(_run_slice, k) for k in range(len(plan)))
+            else:
+                submissions = (executor.submit(_run_dollop, dollop) for dollop in dollops)
+
+            yield from _collect_results(submissions, max_pending=2 * workers, ordered=ordered)
+
+    finally:
+        if shared_memory is not None:
+            shared_memory.close()
+            shared_memory.unlink()
+
+
+def _collect_results(submissions, max_pending: int, ordered: bool) -> Generator[Any, None, None]:
+    """
+    Submit tasks lazily, keeping a bounded number in flight, and yield their results.
+
+    :param submissions: Iterator that submits one task per step, returning its future.
+    :param max_pending: The max number of tasks in flight at a time.
+    :param ordered: If True, yield results in submission order; otherwise as they complete.
+    :return: Generator yielding the results.
+    """
+
+    pending = deque()
+
+    def next_results():
+        if ordered:
+            return [pending.popleft().result()]
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future_done in done:
+            pending.remove(future_done)
+        return [future_done.result() for future_done in done]
+
+    try:
+        for future in submissions:
+            pending.append(future)
+            while len(pending) >= max_pending:
+                yield from next_results()
+
+        while pending:
+            yield from next_results()
+
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _is_shareable_array(obj: Any) -> bool:
+    """
+    Check whether an object is a NumPy array that can be copied into shared memory.
+    """
+    cls = obj.__class__
+    return cls.__module__.startswith("numpy") and cls.__name__ == "ndarray" and obj.ndim > 0 and not obj.dtype.hasobject
+
+
+def _is_pandas(obj: Any) -> bool:
+    """
+    Check whether an object is a pandas DataFrame or Series, whose columns can be shared.
+    """
+    cls = obj.__class__
+    return cls.__module__.startswith("pandas") and cls.__name__ in ("DataFrame", "Series")
+
+
+def _is_sliceable(obj: Any) -> bool:
+    """
+    Check whether an object is a built-in sequence that workers can slice themselves.
+    """
+    return obj.__class__ in (list, tuple, str, bytes, bytearray, range)
+
+
+def _share_array(array: "numpy.ndarray"):
+    """
+    Copy an array into a new shared memory block.
+
+    :param array: The NumPy array.
+    :return: The shared memory block, and the description that workers use to attach to it.
+    """
+
+    import numpy
+    from multiprocessing.shared_memory import SharedMemory
+
+    shared_memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+    numpy.ndarray(array.shape, dtype=array.dtype, buffer=shared_memory.buf)[...] = array
+    return shared_memory, _SharedArray(shared_memory.name, array.shape, array.dtype.str)
+
+
+def _share_pandas(pandas_obj: "pandas.DataFrame | pandas.Series"):
+    """
+    Copy the NumPy-backed columns of a DataFrame or Series into a new shared memory block.
+
+    :param pandas_obj: The pandas object.
+    :return: The shared memory block, and the description that workers use to rebuild the object.
+    """
+
+    import numpy
+    from multiprocessing.shared_memory import SharedMemory
+
+    is_series = pandas_obj.ndim == 1
+    n_rows = len(pandas_obj)
+    columns = [pandas_obj] if is_series else [pandas_obj.iloc[:, i] for i in range(pandas_obj.shape[1])]
+    shareable = [isinstance(column.dtype, numpy.dtype) and not column.dtype.hasobject for column in columns]
+
+    # Place the columns one after another, each aligned to 64 bytes.
+    offsets = []
+    size = 0
+    for column, share in zip(columns, shareable):
+        offsets.append(size)
+        if share:
+            size += -(-column.dtype.itemsize * n_rows // 64) * 64
+
+    shared_memory = SharedMemory(create=True, size=max(size, 1))
+
+    descriptions = []
+    for column, share, offset in zip(columns, shareable, offsets):
+        if share:
+            numpy.ndarray(n_rows, dtype=column.dtype, buffer=shared_memory.buf, offset=offset)[...] = column.to_numpy()
+            descriptions.append((offset, column.dtype.str))
+        else:
+            descriptions.append(column.array)
+
+    labels = pandas_obj.name if is_series else pandas_obj.columns
+    return shared_memory, _SharedPandas(shared_memory.name, n_rows, descriptions, labels, pandas_obj.index, is_series)
+
+
+def _attach_pandas(source: _SharedPandas, buffer: memoryview) -> "pandas.DataFrame | pandas.Series":
+    """
+    Rebuild a pandas object shared by `_share_pandas`, with its shared columns as views of the buffer.
+    """
+
+    import numpy
+    import pandas
+
+    arrays = [numpy.ndarray(source.n_rows, dtype=column[1], buffer=buffer, offset=column[0])
+              if isinstance(column, tuple) else column for column in source.columns]
+
+    if source.is_series:
+        return pandas.Series(arrays[0], index=source.index, name=source.labels, copy=False)
+
+    df = pandas.DataFrame(dict(enumerate(arrays)), index=source.index, copy=False)
+    df.columns = source.labels
+    return df
+
+
+def _init_worker(fn: Callable, source: Any, plan: SlicePlan, dim: int) -> None:
+    """
+    Set up a worker process with the function, the object to slice (attaching to shared memory if needed),
+    and the slice plan.
+    """
+
+    _worker.update(fn=fn, source=source, plan=plan, dim=dim)
+
+    if isinstance(source, _SharedArray):
+        import numpy
+        from multiprocessing.shared_memory import SharedMemory
+
+        # Keep a reference to the block, so the mapping lives as long as the worker.
+        _worker['shared_memory'] = shared_memory = SharedMemory(name=source.name)
+        _worker['source'] = numpy.ndarray(source.shape, dtype=source.dtype, buffer=shared_memory.buf)
+
+    elif isinstance(source, _SharedPandas):
+        from multiprocessing.shared_memory import SharedMemory
+
+        _worker['shared_memory'] = shared_memory = SharedMemory(name=source.name)
+        _worker['source'] = _attach_pandas(source, shared_memory.buf)
+
+
+def _run_slice(k: int) -> Any:
+    """
+    Cut the k-th dollop in a worker process and apply the function to it.
+    """
+
+    source, slc, dim = _worker['source'], _worker['plan'][k], _worker['dim']
+
+    if source.__class__.__module__.startswith("pandas"):
+        dollop = source.iloc[slc]
+    elif source.__class__.__module__.startswith("numpy"):
+        dollop = source[(slice(None),) * dim + (slc,)]
+    else:
+        dollop = source[slc]
+
+    return _worker['fn'](dollop)
+
+
+def _run_dollop(dollop: Any) -> Any:
+    """
+    Apply the function to a dollop sent to a worker process.
+    """
+
+    return _worker['fn'](dollop)
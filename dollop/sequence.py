@@ -1,23 +1,148 @@
-from typing import Any, Generator, Sequence
+from itertools import chain
+from typing import Any, Callable, Generator, List, Sequence, Union
 from collections.abc import Sequence as SequenceType
 
-from ._utils import calculate_slices
+from .stats import DollopRecord, ServingStats, instrument
+from ._utils import BoundaryPlan, budget_bounds, calculate_adaptive_slices, calculate_slices, \
+    calculate_weighted_slices, calculate_windows, prefix_sums
 
 
-def serve(items: Sequence[Any], serving_size: int = None, n_servings: int = None) -> Generator[Sequence[Any], None, None]:
+def serve(items: Sequence[Any], serving_size: Union[int, str] = None, n_servings: int = None,
+          weights: Union[Sequence[float], Callable[[Any], float]] = None, max_cost: float = None,
+          cost: Union[Sequence[float], Callable[[Any], float]] = len, lookahead: int = 0, window: int = None,
+          step: int = 1, target_latency: float = None, min_serving_size: int = 1, max_serving_size: int = None,
+          stats: ServingStats = None, on_dollop: Callable[[DollopRecord], None] = None) \
+        -> Generator[Sequence[Any], None, None]:
     """
     Split a sequence of items into a number of smaller dollops.
 
     :param items: The original sequence of items.
-    :param serving_size: The number of items per dollop. Mutually exclusive with n_servings.
+    :param serving_size: The number of items per dollop, or 'auto' to size each dollop so that it takes about
+        target_latency seconds. Mutually exclusive with n_servings.
     :param n_servings: The number of dollops, of roughly equal size. Mutually exclusive with serving_size.
+    :param weights: With n_servings, balance the dollops by total weight instead of number of items. Either a
+        sequence with the (non-negative) weight of each item, or a function returning the weight of an item.
+    :param max_cost: Pack consecutive items into dollops whose total cost is at most max_cost, e.g. a cap on bytes
+        or tokens per batch. An item costing more than max_cost gets a dollop of its own. Mutually exclusive with
+        serving_size and n_servings.
+    :param cost: With max_cost, either a sequence with the cost of each item, or a function returning the cost of
+        an item. Default is len.
+    :param lookahead: With max_cost, let each dollop also take later items, up to this many places beyond its
+        first item, that still fit under the cap. This gives fewer, fuller dollops, but items may be served out
+        of order. Dollops of types other than str, bytes, bytearray, list and tuple are then served as lists.
+    :param window: Serve overlapping windows of this many items instead, one every `step` items. Only whole
+        windows are served. Mutually exclusive with serving_size, n_servings, weights and max_cost.
+    :param step: With window, the number of items between the starts of consecutive windows. Default is 1.
+    :param target_latency: With serving_size='auto', the desired time in seconds to produce and consume each
+        dollop. Dollop sizes start at min_serving_size, and are adjusted to a smoothed estimate of the time taken
+        per item.
+    :param min_serving_size: With serving_size='auto', the smallest dollop size. Default is 1.
+    :param max_serving_size: With serving_size='auto', the largest dollop size. Default is no limit.
+    :param stats: A ServingStats in which to record the timings, sizes and throughput of the dollops.
+    :param on_dollop: Function called with a DollopRecord of the measurements for each dollop.
     :return: Generator yielding sliced subsequences.
     """
 
     if not isinstance(items, SequenceType):
         raise NotImplementedError('Dollop sequence.serve only supports objects of Sequence type.')
 
-    slices = calculate_slices(total=len(items), serving_size=serving_size, n_servings=n_servings)
+    if max_cost is not None:
+        if serving_size is not None or n_servings is not None or weights is not None or window is not None:
+            raise ValueError('max_cost cannot be combined with serving_size, n_servings, weights or window.')
+        if not isinstance(lookahead, int) or lookahead < 0:
+            raise ValueError('lookahead must be a non-negative integer.')
 
-    for slc in slices:
-        yield items[slc]
+        costs = list(map(cost, items)) if callable(cost) else cost
+        if len(costs) != len(items):
+            raise ValueError(f'Expected {len(items)} costs, one per item, but got {len(costs)}.')
+
+        if lookahead:
+            slices = _pack_with_lookahead(costs, max_cost, lookahead)
+        else:
+            slices = BoundaryPlan(budget_bounds(prefix_sums(costs), max_cost))
+
+    elif window is not None:
+        slices = calculate_windows(len(items), window, step, serving_size, n_servings, weights)
+
+    elif weights is not None:
+        slices = calculate_weighted_slices(weights, items, len(items), serving_size=serving_size, n_servings=n_servings)
+
+    elif serving_size == 'auto':
+        slices = calculate_adaptive_slices(len(items), target_latency, min_serving_size, max_serving_size, n_servings)
+
+    else:
+        slices = calculate_slices(total=len(items), serving_size=serving_size, n_servings=n_servings)
+
+    if max_cost is not None and lookahead:
+        dollops = (_take(items, indices) for indices in slices)
+    else:
+        dollops = (items[slc] for slc in slices)
+
+    if stats is not None or on_dollop is not None:
+        dollops = instrument(dollops, stats, on_dollop)
+
+    yield from dollops
+
+
+def _pack_with_lookahead(costs: Sequence[float], max_cost: float, lookahead: int) -> Generator[List[int], None, None]:
+    """
+    Pack items into dollops first-fit: each dollop starts at the first unpacked item, then takes any unpacked
+    items within `lookahead` places after it that still fit under the cap.
+
+    :param costs: The cost of each item.
+    :param max_cost: The max total cost per dollop.
+    :param lookahead: How many places beyond its first item each dollop may look for more items.
+    :return: Generator yielding the indices of the items in each dollop, in increasing order.
+    """
+
+    if max_cost <= 0:
+        raise ValueError('max_cost must be positive.')
+
+    n_items = len(costs)
+    packed = bytearray(n_items)
+    first = 0
+
+    while first < n_items:
+        dollop = [first]
+        total = costs[first]
+        packed[first] = True
+
+        for i in range(first + 1, min(first + lookahead + 1, n_items)):
+            if not packed[i] and total + costs[i] <= max_cost:
+                dollop.append(i)
+                total += costs[i]
+                packed[i] = True
+
+        yield dollop
+
+        while first < n_items and packed[first]:
+            first += 1
+
+
+def _take(items: Sequence[Any], indices: List[int]) -> Sequence[Any]:
+    """
+    Gather items by (increasing) index, slicing out runs of consecutive indices.
+
+    :param items: The original sequence of items.
+    :param indices: The indices to take.
+    :return: A subsequence of the same type as items for str, bytes, bytearray, list and tuple, otherwise a list.
+    """
+
+    pieces = []
+    start = prev = indices[0]
+    for i in indices[1:]:
+        if i != prev + 1:
+            pieces.append(items[start:prev + 1])
+            start = i
+        prev = i
+    pieces.append(items[start:prev + 1])
+
+    if isinstance(items, (str, bytes, bytearray, list, tuple)):
+        if len(pieces) == 1:
+            return pieces[0]
+        if isinstance(items, (str, bytes, bytearray)):
+            return items[:0].join(pieces)
+        return type(items)(chain.from_iterable(pieces))
+
+    # Other sequences can't always be built from their pieces, so every dollop is a list, even a contiguous one.
+    return list(chain.from_iterable(pieces))
@@ -0,0 +1,177 @@
+import time
+
+from typing import Any, Callable, Generator, Iterable, List, NamedTuple, Optional
+
+
+class DollopRecord(NamedTuple):
+    """
+    Measurements for a single dollop.
+
+    :param index: The number of the dollop, counting from 0.
+    :param n_items: The number of items in the dollop (rows, lines, elements along dim, ...).
+    :param n_bytes: The size of the dollop's data in bytes, or None if it isn't known for this type of dollop.
+    :param produce_seconds: The time spent producing the dollop, i.e. that the consumer waited for it.
+    :param consume_seconds: The time the consumer held the dollop before asking for the next one.
+    """
+    index: int
+    n_items: int
+    n_bytes: Optional[int]
+    produce_seconds: float
+    consume_seconds: float
+
+
+class ServingStats:
+    """
+    Running totals for the dollops served, to pass as `stats=` to `serve`. If most of the time is spent producing
+    dollops (see `produce_fraction`), the pipeline is stalling on the serving side, e.g. on file reads; if most of it
+    is spent consuming, it is limited by the downstream work.
+
+    :param keep_records: If True, also keep the DollopRecord of every dollop in `records`.
+    """
+
+    def __init__(self, keep_records: bool = True):
+        self.keep_records = keep_records
+        self.records: List[DollopRecord] = []
+        self.n_dollops = 0
+        self.n_items = 0
+        self.n_bytes = 0
+        self.produce_seconds = 0.
+        self.consume_seconds = 0.
+
+    def add(self, record: DollopRecord) -> None:
+        """
+        Add the measurements for one dollop to the totals.
+
+        :param record: The measurements.
+        """
+
+        self.n_dollops += 1
+        self.n_items += record.n_items
+        self.n_bytes += record.n_bytes or 0
+        self.produce_seconds += record.produce_seconds
+        self.consume_seconds += record.consume_seconds
+        if self.keep_records:
+            self.records.append(record)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        """
+        The total time spent producing and consuming dollops.
+        """
+        return self.produce_seconds + self.consume_seconds
+
+    @property
+    def items_per_second(self) -> float:
+        """
+        The number of items served per second, over the time spent so far.
+        """
+        return self.n_items / self.elapsed_seconds if self.elapsed_seconds else 0.
+
+    @property
+    def bytes_per_second(self) -> float:
+        """
+        The number of bytes served per second, over the time spent so far. Dollops of unknown size count as 0 bytes.
+        """
+        return self.n_bytes / self.elapsed_seconds if self.elapsed_seconds else 0.
+
+    @property
+    def produce_fraction(self) -> float:
+        """
+        The fraction of the time spent producing dollops, between 0 and 1.
+        """
+        return self.produce_seconds / self.elapsed_seconds if self.elapsed_seconds else 0.
+
+    def __repr__(self) -> str:
+        return (f'ServingStats(n_dollops={self.n_dollops}, n_items={self.n_items}, n_bytes={self.n_bytes}, '
+                f'produce_seconds={self.produce_seconds:.6f}, consume_seconds={self.consume_seconds:.6f})')
+
+
+def instrument(dollops: Iterable[Any], stats: ServingStats = None, on_dollop: Callable[[DollopRecord], Any] = None,
+               dim: int = 0, count: Callable[[Any], int] = None, clock: Callable[[], float] = time.perf_counter) \
+        -> Generator[Any, None, None]:
+    """
+    Time the production and consumption of each dollop, passing the measurements to `stats` and/or `on_dollop`.
+    The measurements for a dollop are reported when the consumer asks for the next one, or stops.
+
+    :param dollops: The dollops.
+    :param stats: ServingStats to add the measurements to.
+    :param on_dollop: Function called with the DollopRecord of each dollop.
+    :param dim: The dim along which array and tensor dollops were cut, for counting their items.
+    :param count: Function returning the number of items in a dollop, if `len` or the size along dim won't do.
+    :param clock: Function returning the current time in seconds.
+    :return: Generator yielding the same dollops.
+    """
+
+    dollops = iter(dollops)
+    index = 0
+
+    try:
+        while True:
+            start = clock()
+            try:
+                dollop = next(dollops)
+            except StopIteration:
+                return
+            produced = clock()
+
+            n_items = count(dollop) if count is not None else _count_items(dollop, dim)
+            n_bytes = _count_bytes(dollop)
+
+            try:
+                yield dollop
+            finally:
+                record = DollopRecord(index, n_items, n_bytes, produced - start, clock() - produced)
+                if stats is not None:
+                    stats.add(record)
+                if on_dollop is not None:
+                    on_dollop(record)
+                index += 1
+
+    finally:
+        close = getattr(dollops, 'close', None)
+        if close is not None:
+            close()
+
+
+def _count_items(dollop: Any, dim: int = 0) -> int:
+    """
+    Count the items in a dollop: rows for Arrow and pandas objects, the size along dim for arrays and tensors, and
+    the length of anything else.
+    """
+
+    num_rows = getattr(dollop, 'num_rows', None)
+    if isinstance(num_rows, int):
+        return num_rows
+
+    shape = getattr(dollop, 'shape', None)
+    if isinstance(shape, tuple) and len(shape) > dim:
+        return int(shape[dim])
+
+    return len(dollop)
+
+
+def _count_bytes(dollop: Any) -> Optional[int]:
+    """
+    Measure the size of a dollop's data in bytes, without copying it, or return None if that can't be done cheaply.
+    """
+
+    if isinstance(dollop, (bytes, bytearray)):
+        return len(dollop)
+
+    if isinstance(dollop, str):
+        return len(dollop) if dollop.isascii() else len(dollop.encode())
+
+    cls = dollop.__class__
+    if cls.__module__.startswith("pandas"):
+        memory_usage = dollop.memory_usage(index=True)
+        return int(memory_usage.sum() if hasattr(memory_usage, 'sum') else memory_usage)
+
+    if cls.__module__.startswith("torch") and cls.__name__ == "Tensor":
+        return dollop.numel() * dollop.element_size()
+
+    nbytes = getattr(dollop, 'nbytes', None)
+    if isinstance(nbytes, int):
+        # memoryviews, NumPy arrays and Arrow objects.
+        return nbytes
+
+    return None
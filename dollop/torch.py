@@ -1,20 +1,50 @@
-from typing import Generator, TYPE_CHECKING
+from typing import Callable, Generator, Iterable, Iterator, Sequence, Tuple, TYPE_CHECKING
 
-from ._utils import calculate_slices
+from .stats import DollopRecord, ServingStats, instrument
+from ._utils import Tile, calculate_adaptive_slices, calculate_slices, calculate_tiles, calculate_weighted_slices, \
+    calculate_windows, max_adaptive_size, serving_size_from_bytes
 
 if TYPE_CHECKING:
     import torch # Keep this here for string-based type-checking
 
 
-def serve(tensor: "torch.Tensor", serving_size: int = None, n_servings: int = None, dim: int = 0) -> \
+def serve(tensor: "torch.Tensor", serving_size: "int | str" = None, n_servings: int = None, dim: int = 0,
+          serving_bytes: int = None, weights: "Sequence[float] | Callable" = None,
+          device: "str | torch.device" = None, pin_memory: bool = False, window: int = None, step: int = 1,
+          target_latency: float = None, min_serving_size: int = 1, max_serving_size: int = None,
+          stats: ServingStats = None, on_dollop: Callable[[DollopRecord], None] = None) -> \
         Generator["torch.Tensor", None, None]:
     """
     Read a PyTorch tensor small dollops at a time.
 
     :param tensor: The tensor object.
-    :param serving_size: The size of each dollop. Mutually exclusive with n_servings.
+    :param serving_size: The size of each dollop, or 'auto' to size each dollop so that it takes about
+        target_latency seconds. Mutually exclusive with n_servings.
     :param n_servings: The number of dollops, of roughly equal size. Mutually exclusive with serving_size.
     :param dim: The dimension along which to slice. Default is 0.
+    :param serving_bytes: The max number of bytes in each dollop, from which the serving size is worked out.
+        Mutually exclusive with serving_size and n_servings.
+    :param weights: With n_servings, balance the dollops by total weight instead of size along dim. Either a
+        sequence with the (non-negative) weight of each index along dim, or a function returning the weight of
+        the sub-tensor at an index.
+    :param window: Serve overlapping windows of this size along dim instead, one every `step` indices. Only whole
+        windows are served. Each window is a view, so they all share the tensor's memory. Mutually exclusive with
+        serving_size, n_servings, serving_bytes and weights.
+    :param step: With window, the distance along dim between the starts of consecutive windows. Default is 1.
+    :param target_latency: With serving_size='auto', the desired time in seconds to produce and consume each
+        dollop. Dollop sizes start at min_serving_size, and are adjusted to a smoothed estimate of the time taken
+        per index along dim.
+    :param min_serving_size: With serving_size='auto', the smallest dollop size. Default is 1.
+    :param max_serving_size: With serving_size='auto', the largest dollop size. Default is no limit. Needed with
+        pin_memory=True, whose buffers must hold the largest dollop.
+    :param stats: A ServingStats in which to record the timings, sizes and throughput of the dollops.
+    :param on_dollop: Function called with a DollopRecord of the measurements for each dollop.
+    :param device: If given, move each dollop to this device. The copy of the next dollop is started (without
+        blocking) before the current one is yielded, so transfers overlap with the consumer's work. With
+        serving_size='auto', each dollop is only moved once it is asked for, so that its size is timed against the
+        consumer's work rather than the next transfer.
+    :param pin_memory: If True, copy CPU dollops into reusable page-locked buffers before sending them to a CUDA
+        device, which allows truly asynchronous transfers. Ignored when CUDA isn't available or not needed.
     :return: Generator yielding tensor slices.
     """
 
@@ -27,7 +57,22 @@ def serve(tensor: "torch.Tensor", serving_size: int = None, n_servings: int = No
     if dim < 0 or dim >= tensor.ndim:
         raise ValueError(f"Invalid dim={dim}; tensor has {tensor.ndim} dimensions.")
 
-    slices = calculate_slices(total=tensor.shape[dim], serving_size=serving_size, n_servings=n_servings)
+    size = tensor.shape[dim]
+
+    if serving_bytes is not None:
+        row_bytes = tensor.element_size() * (tensor.numel() // size) if size else 0
+        serving_size = serving_size_from_bytes(serving_bytes, row_bytes, size, serving_size, n_servings)
+
+    if window is not None:
+        slices = calculate_windows(size, window, step, serving_size, n_servings, weights)
+    elif weights is not None:
+        # A weights function is applied to each sub-tensor along dim.
+        items = tensor.unbind(dim) if callable(weights) else None
+        slices = calculate_weighted_slices(weights, items, size, serving_size=serving_size, n_servings=n_servings)
+    elif serving_size == 'auto':
+        slices = calculate_adaptive_slices(size, target_latency, min_serving_size, max_serving_size, n_servings)
+    else:
+        slices = calculate_slices(total=size, serving_size=serving_size, n_servings=n_servings)
 
     # Make a view of the array with the chosen dim at the front.
     axes = list(range(tensor.ndim))
@@ -37,6 +82,115 @@ def serve(tensor: "torch.Tensor", serving_size: int = None, n_servings: int = No
     # Get inverse permutation
     axes_inv = [axes.index(i) for i in range(tensor.ndim)]
 
-    for slc in slices:
-        dollop = tensor_permuted[slc]
-        yield dollop.permute(*axes_inv)
+    dollops = (tensor_permuted[slc].permute(*axes_inv) for slc in slices)
+
+    if device is not None or pin_memory:
+        if serving_size != 'auto':
+            max_rows = slices.max_size
+        elif pin_memory:
+            max_rows = max_adaptive_size(max_serving_size, size, 'pin_memory')
+        else:
+            # Only pinned buffers need to know the size of the largest dollop.
+            max_rows = 0
+        max_dollop_size = max_rows * (tensor.numel() // size if size else 0)
+        dollops = _transfer(dollops, tensor, max_dollop_size, device=device, pin_memory=pin_memory,
+                            ahead=serving_size != 'auto')
+
+    if stats is not None or on_dollop is not None:
+        dollops = instrument(dollops, stats, on_dollop, dim=dim)
+
+    yield from dollops
+
+
+def serve_tiles(tensor: "torch.Tensor", tile: Sequence[int], dims: Sequence[int] = None,
+                halo: "int | Sequence[int]" = 0) -> Generator[Tuple[Tile, "torch.Tensor"], None, None]:
+    """
+    Read a PyTorch tensor one N-D tile at a time, e.g. 512x512 blocks of an image.
+
+    :param tensor: The tensor object.
+    :param tile: The size of each tile along each of dims. Tiles at the far edges may be smaller.
+    :param dims: The dims to tile, one per entry of tile. Defaults to the leading dims.
+    :param halo: The margin of neighbouring elements to include on each side of a tile (clipped at the edges of
+        the tensor), either one for all of dims or one per dim.
+    :return: Generator yielding (tile, view) pairs, where tile is a Tile giving the tile's position and view is
+        a view of the tensor covering tile.region.
+    """
+
+    if not (tensor.__class__.__module__.startswith("torch") and tensor.__class__.__name__ == "Tensor"):
+        raise TypeError('Dollop torch.serve_tiles only supports PyTorch Tensor types.')
+
+    for tile_ in calculate_tiles(tuple(tensor.shape), tile, dims, halo):
+        yield tile_, tensor[tile_.region]
+
+
+def stitch(pieces: Iterable[Tuple[Tile, "torch.Tensor"]], out: "torch.Tensor") -> "torch.Tensor":
+    """
+    Assemble per-tile outputs, e.g. from serve_tiles, into a preallocated tensor. The halo of each piece is
+    dropped, and its core is copied in place (across devices if needed).
+
+    :param pieces: (tile, piece) pairs, where each piece has the shape of tile.region along the tiled dims.
+    :param out: The tensor to write into.
+    :return: out.
+    """
+
+    for tile_, piece in pieces:
+        out[tile_.core].copy_(piece[tile_.inner])
+
+    return out
+
+
+def _transfer(dollops: Iterator["torch.Tensor"], tensor: "torch.Tensor", max_dollop_size: int,
+              device: "str | torch.device" = None, pin_memory: bool = False, ahead: bool = True) \
+        -> Generator["torch.Tensor", None, None]:
+    """
+    Move dollops to a device, starting the transfer of each dollop before the previous one is yielded.
+
+    :param dollops: The dollops, as views of the tensor.
+    :param tensor: The tensor being served.
+    :param max_dollop_size: The number of elements in the largest dollop.
+    :param device: The target device. Defaults to the tensor's own device.
+    :param pin_memory: Whether to stage CPU dollops in pinned buffers on their way to a CUDA device.
+    :param ahead: Whether to start each transfer before the previous dollop is yielded. If False, each dollop is
+        taken from `dollops` only once the previous one has been consumed.
+    :return: Generator yielding the dollops on the target device.
+    """
+
+    import torch
+
+    device = torch.device(device) if device is not None else tensor.device
+    use_pinned = pin_memory and tensor.device.type == 'cpu' and device.type == 'cuda' and torch.cuda.is_available()
+
+    if use_pinned:
+        # Two staging buffers, so one can be filled while the other is still being copied from.
+        buffers = [torch.empty(max_dollop_size, dtype=tensor.dtype, pin_memory=True) for _ in range(2)]
+        copied = [None, None]
+
+    def send(i, dollop):
+        if not use_pinned:
+            return dollop.to(device, non_blocking=True)
+
+        if copied[i % 2] is not None:
+            copied[i % 2].synchronize()
+
+        staged = buffers[i % 2][:dollop.numel()].view(dollop.shape)
+        staged.copy_(dollop)
+        moved = staged.to(device, non_blocking=True)
+
+        copied[i % 2] = torch.cuda.Event()
+        copied[i % 2].record()
+        return moved
+
+    if not ahead:
+        for i, dollop in enumerate(dollops):
+            yield send(i, dollop)
+        return
+
+    pending = None
+    for i, dollop in enumerate(dollops):
+        moved = send(i, dollop)
+        if pending is not None:
+            yield pending
+        pending = moved
+
+    if pending is not None:
+        yield pending
@@ -0,0 +1,125 @@
+import io
+import pyarrow as pa
+import pyarrow.feather
+import pyarrow.parquet
+import pytest
+
+from dollop.arrow import serve
+
+
+@pytest.fixture
+def table():
+    return pa.table({'a': range(100), 'b': [str(i) for i in range(100)], 'c': [i / 2 for i in range(100)]})
+
+
+@pytest.fixture
+def arrow_files(tmp_path, table):
+    parquet_path = tmp_path / 'yogurt.parquet'
+    ipc_path = tmp_path / 'yogurt.arrow'
+    pyarrow.parquet.write_table(table, parquet_path, row_group_size=30)
+    pyarrow.feather.write_feather(table, ipc_path, chunksize=17)
+    return {'parquet': parquet_path, 'ipc': ipc_path}
+
+
+def expected_sizes(total, serving_size=None, n_servings=None):
+    if serving_size is not None:
+        return [min(serving_size, total - i) for i in range(0, total, serving_size)]
+    return [total // n_servings + (i < total % n_servings) for i in range(n_servings)]
+
+
+@pytest.mark.parametrize('kind', ('table', 'record_batch'))
+@pytest.mark.parametrize('size_arg, size', (('serving_size', 1), ('serving_size', 30), ('serving_size', 1000),
+                                            ('n_servings', 1), ('n_servings', 7)))
+def test_serve_arrow_in_memory(kind, size_arg, size, table):
+    obj = table if kind == 'table' else table.combine_chunks().to_batches()[0]
+
+    dollops = [*serve(obj, **{size_arg: size})]
+
+    assert all(isinstance(d, type(obj)) for d in dollops)
+    assert [d.num_rows for d in dollops] == expected_sizes(100, **{size_arg: size})
+    assert pa.Table.from_batches([b for d in dollops for b in (d.to_batches() if kind == 'table' else [d])]) \
+        .equals(table.combine_chunks())
+
+
+def test_serve_arrow_in_memory_is_zero_copy(table):
+    table = table.combine_chunks()
+    dollop = [*serve(table, serving_size=30)][1]
+    assert dollop.column('a').chunk(0).buffers()[1].address == table.column('a').chunk(0).buffers()[1].address
+
+
+@pytest.mark.parametrize('file_format', ('parquet', 'ipc'))
+@pytest.mark.parametrize('size_arg, size', (('serving_size', 1), ('serving_size', 25), ('serving_size', 1000),
+                                            ('n_servings', 3), ('n_servings', 7)))
+@pytest.mark.parametrize('columns', (None, ['a'], ['c', 'b']))
+def test_serve_arrow_files(file_format, size_arg, size, columns, table, arrow_files):
+    dollops = [*serve(arrow_files[file_format], columns=columns, **{size_arg: size})]
+
+    expected = table if columns is None else table.select(columns)
+    assert [d.num_rows for d in dollops] == expected_sizes(100, **{size_arg: size})
+    assert all(d.column_names == expected.column_names for d in dollops)
+    assert pa.concat_tables(dollops).equals(expected)
+
+
+@pytest.mark.parametrize('file_format', ('parquet', 'ipc'))
+@pytest.mark.parametrize('n_rows', (0, 3))
+@pytest.mark.parametrize('size_arg, size', (('serving_size', 2), ('n_servings', 5)))
+@pytest.mark.parametrize('columns', (None, ['c', 'b']))
+def test_serve_arrow_small_files(file_format, n_rows, size_arg, size, columns, table, tmp_path):
+    small = table.slice(0, n_rows)
+    path = tmp_path / f'small.{"parquet" if file_format == "parquet" else "arrow"}'
+    if file_format == 'parquet':
+        pyarrow.parquet.write_table(small, path)
+    else:
+        pyarrow.feather.write_feather(small, path)
+
+    dollops = [*serve(path, columns=columns, **{size_arg: size})]
+
+    expected = small if columns is None else small.select(columns)
+    assert [d.num_rows for d in dollops] == expected_sizes(n_rows, **{size_arg: size})
+    assert all(d.schema.equals(expected.schema) for d in dollops)
+    if dollops:
+        assert pa.concat_tables(dollops).equals(expected)
+
+
+@pytest.mark.parametrize('file_format', ('parquet', 'ipc'))
+def test_serve_arrow_file_object_with_format(file_format, table, arrow_files):
+    with open(arrow_files[file_format], 'rb') as f:
+        buffer = io.BytesIO(f.read())
+
+    dollops = [*serve(buffer, serving_size=40, format=file_format)]
+    assert pa.concat_tables(dollops).equals(table)
+
+    with pytest.raises(TypeError):
+        _ = [*serve(buffer, serving_size=40)]
+
+
+class CountingBytesIO(io.BytesIO):
+    n_read = 0
+
+    def read(self, *args):
+        data = super().read(*args)
+        self.n_read += len(data)
+        return data
+
+    def readinto(self, buffer):
+        n_bytes = super().readinto(buffer)
+        self.n_read += n_bytes
+        return n_bytes
+
+
+def test_serve_arrow_ipc_file_object_reads_only_selected_columns():
+    table = pa.table({'a': range(30000), 'b': [i / 2 for i in range(30000)], 'c': [i / 3 for i in range(30000)]})
+    buffer = io.BytesIO()
+    pyarrow.feather.write_feather(table, buffer, chunksize=1000, compression='uncompressed')
+    source = CountingBytesIO(buffer.getvalue())
+
+    dollops = [*serve(source, serving_size=700, columns=['c'], format='ipc')]
+
+    assert pa.concat_tables(dollops).equals(table.select(['c']))
+    assert source.n_read < len(buffer.getvalue()) / 2
+
+
+@pytest.mark.parametrize('kwargs', (dict(format='csv'), dict()))
+def test_serve_arrow_unknown_format_raises_error(kwargs, tmp_path):
+    with pytest.raises(ValueError):
+        _ = [*serve(tmp_path / 'yogurt.txt', serving_size=10, **kwargs)]
@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+import time
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from dollop.asyncio import serve
+
+
+content = ''.join(f'line {i}: {"x" * (i % 7)}\n' for i in range(30)) + 'trailing'
+
+
+def helper_collect(obj, **kwargs):
+
+    async def collect():
+        # Readers and async generators must be created inside the running event loop.
+        source = obj() if callable(obj) else obj
+        return [dollop async for dollop in serve(source, **kwargs)]
+
+    return asyncio.run(collect())
+
+
+def helper_stream_reader(data):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+@pytest.mark.parametrize('serving_size', (1, 3, 10, 100))
+def test_serve_stream_reader_lines(serving_size):
+    dollops = helper_collect(lambda: helper_stream_reader(content.encode()), serving_size=serving_size)
+
+    lines = content.encode().splitlines(keepends=True)
+    assert dollops == [b''.join(lines[i:i + serving_size]) for i in range(0, len(lines), serving_size)]
+
+
+@pytest.mark.parametrize('serving_size', (1, 3, 10, 1000))
+def test_serve_stream_reader_chars(serving_size):
+    dollops = helper_collect(lambda: helper_stream_reader(content.encode()), serving_size=serving_size, mode='chars')
+
+    data = content.encode()
+    assert dollops == [data[i:i + serving_size] for i in range(0, len(data), serving_size)]
+
+
+@pytest.mark.parametrize('n_items', (0, 1, 10, 13))
+@pytest.mark.parametrize('serving_size', (1, 3, 10))
+def test_serve_async_iterable(n_items, serving_size):
+
+    async def generate():
+        for i in range(n_items):
+            await asyncio.sleep(0)
+            yield i
+
+    dollops = helper_collect(generate, serving_size=serving_size, container=tuple)
+
+    items = tuple(range(n_items))
+    assert dollops == [items[i:i + serving_size] for i in range(0, n_items, serving_size)]
+
+
+@pytest.mark.parametrize('mode', ('lines', 'chars'))
+@pytest.mark.parametrize('serving_size', (1, 3, 100))
+def test_serve_file_in_executor(mode, serving_size):
+    with TemporaryDirectory() as td:
+        file_path = Path(td) / 'content.txt'
+        file_path.write_text(content)
+
+        dollops = helper_collect(file_path, serving_size=serving_size, mode=mode)
+
+    assert ''.join(dollops) == content
+    if mode == 'chars':
+        assert all(len(d) == serving_size for d in dollops[:-1])
+    else:
+        assert all(len(d.splitlines()) == serving_size for d in dollops[:-1])
+
+
+def test_serve_file_does_not_block_event_loop():
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0)
+
+    async def collect(file_path):
+        ticker = asyncio.ensure_future(tick())
+        dollops = [dollop async for dollop in serve(file_path, serving_size=1)]
+        ticker.cancel()
+        return dollops
+
+    with TemporaryDirectory() as td:
+        file_path = Path(td) / 'content.txt'
+        file_path.write_text(content)
+        dollops = asyncio.run(collect(file_path))
+
+    assert ''.join(dollops) == content
+    assert len(ticks) > 0
+
+
+def test_serve_file_cancelled_while_producing(monkeypatch):
+    closed = []
+
+    def slow_serve(obj, **kwargs):
+        try:
+            while True:
+                time.sleep(0.2)
+                yield 'dollop'
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr('dollop.asyncio.serve_sync', slow_serve)
+
+    async def cancel_first_dollop():
+        dollops = serve(Path('content.txt'), serving_size=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(dollops.__anext__(), timeout=0.05)
+
+    asyncio.run(cancel_first_dollop())
+    assert closed == [True]
+
+
+@pytest.mark.parametrize('n_servings', (1, 2, 5))
+def test_serve_sequence(n_servings):
+    dollops = helper_collect('Dolloping all day long', n_servings=n_servings)
+    assert len(dollops) == n_servings
+    assert ''.join(dollops) == 'Dolloping all day long'
+
+
+def test_serve_stream_reader_n_servings_raises_error():
+    with pytest.raises(ValueError):
+        helper_collect(lambda: helper_stream_reader(b'abc'), n_servings=2)
@@ -2,12 +2,14 @@ import io
 import numpy as np
 import pandas as pd
 import pathlib
+import pyarrow as pa
 import pytest
 import torch
 
 from unittest.mock import Mock, patch
 
 from dollop.auto import serve as serve
+from dollop.file import FileShard
 
 
 @pytest.fixture
@@ -52,6 +54,14 @@ def numpy_types():
     }
 
 
+@pytest.fixture
+def arrow_types():
+    return {
+        'table': pa.Table,
+        'record_batch': pa.RecordBatch,
+    }
+
+
 @pytest.fixture
 def other_types():
     return {
@@ -64,7 +74,7 @@ def other_types():
 @pytest.mark.parametrize('sequence_type', ('list', 'tuple', 'str', 'range', 'bytes', 'bytearray'))
 def test_serve_auto_sequence_type(sequence_type, sequence_types):
     mock_obj = Mock(spec=sequence_types[sequence_type])
-    with patch('dollop.auto.serve_sequence') as serve_sequence:
+    with patch('dollop.sequence.serve') as serve_sequence:
         serve_sequence.return_value = iter([None])
         _ = [*serve(mock_obj, serving_size=10)]
         serve_sequence.assert_called_once()
@@ -73,7 +83,7 @@ def test_serve_auto_sequence_type(sequence_type, sequence_types):
 @pytest.mark.parametrize('file_type', ('handle', 'pathlib'))
 def test_serve_auto_file_type(file_type, file_types):
     mock_obj = Mock(spec=file_types[file_type])
-    with patch('dollop.auto.serve_file') as serve_file:
+    with patch('dollop.file.serve') as serve_file:
         serve_file.return_value = iter([None])
         _ = [*serve(mock_obj, serving_size=10)]
         serve_file.assert_called_once()
@@ -89,7 +99,7 @@ def test_serve_auto_file_type_cant_dollop_by_n_servings(file_type, file_types):
 @pytest.mark.parametrize('pandas_type', ('series', 'df'))
 def test_serve_auto_pandas_type(pandas_type, pandas_types):
     mock_obj = Mock(spec=pandas_types[pandas_type])
-    with patch('dollop.auto.serve_pandas') as serve_pandas:
+    with patch('dollop.pandas.serve') as serve_pandas:
         serve_pandas.return_value = iter([None])
         _ = [*serve(mock_obj, serving_size=10)]
         serve_pandas.assert_called_once()
@@ -98,7 +108,7 @@ def test_serve_auto_pandas_type(pandas_type, pandas_types):
 @pytest.mark.parametrize('numpy_type', ('array',))
 def test_serve_auto_numpy_types(numpy_type, numpy_types):
     mock_obj = Mock(spec=numpy_types[numpy_type])
-    with patch('dollop.auto.serve_numpy') as serve_numpy:
+    with patch('dollop.numpy.serve') as serve_numpy:
         serve_numpy.return_value = iter([None])
         _ = [*serve(mock_obj, serving_size=10)]
         serve_numpy.assert_called_once()
@@ -107,15 +117,127 @@ def test_serve_auto_numpy_types(numpy_type, numpy_types):
 @pytest.mark.parametrize('torch_type', ('tensor',))
 def test_serve_auto_torch_type(torch_type, torch_types):
     mock_obj = Mock(spec=torch_types[torch_type])
-    with patch('dollop.auto.serve_torch') as serve_torch:
+    with patch('dollop.torch.serve') as serve_torch:
         serve_torch.return_value = iter([None])
         _ = [*serve(mock_obj, serving_size=10)]
         serve_torch.assert_called_once()
 
 
+@pytest.mark.parametrize('arrow_type', ('table', 'record_batch'))
+def test_serve_auto_arrow_type(arrow_type, arrow_types):
+    mock_obj = Mock(spec=arrow_types[arrow_type])
+    with patch('dollop.arrow.serve') as serve_arrow:
+        serve_arrow.return_value = iter([None])
+        _ = [*serve(mock_obj, serving_size=10)]
+        serve_arrow.assert_called_once()
+
+
+@pytest.mark.parametrize('path, served_as_arrow', (
+    ('yogurt.parquet', True), ('yogurt.PQ', True), ('yogurt.arrow', True), ('yogurt.feather', True),
+    ('yogurt.txt', False), ('yogurt', False),
+))
+def test_serve_auto_routes_arrow_files_by_suffix(path, served_as_arrow):
+    with patch('dollop.arrow.serve') as serve_arrow, patch('dollop.file.serve') as serve_file:
+        serve_arrow.return_value = serve_file.return_value = iter([None])
+        _ = [*serve(pathlib.Path(path), serving_size=10)]
+        assert serve_arrow.called == served_as_arrow
+        assert serve_file.called != served_as_arrow
+
+
 @pytest.mark.parametrize('other_type', ('int', 'float', 'none'))
 def test_serve_auto_other_type(other_type, other_types):
     mock_obj = Mock(spec=other_types[other_type])
-    with patch('dollop.auto.serve_sequence') as serve_sequence:
+    with patch('dollop.sequence.serve') as serve_sequence:
         with pytest.raises(NotImplementedError):
             _ = [*serve(mock_obj, serving_size=10)]
+
+
+@pytest.mark.parametrize('file_type', ('handle', 'pathlib'))
+def test_serve_auto_file_type_passes_n_servings_through(file_type, file_types):
+    mock_obj = Mock(spec=file_types[file_type])
+    with patch('dollop.file.serve') as serve_file:
+        serve_file.return_value = iter([None])
+        _ = [*serve(mock_obj, n_servings=10, mmap=True)]
+        serve_file.assert_called_once_with(mock_obj, serving_size=None, n_servings=10, mmap=True)
+
+
+def test_serve_auto_file_shard():
+    file_shard = FileShard('yogurt.txt', 0, 10)
+    with patch('dollop.file.serve') as serve_file:
+        serve_file.return_value = iter([None])
+        _ = [*serve(file_shard, serving_size=10)]
+        serve_file.assert_called_once()
+
+
+@pytest.mark.parametrize('iterable', ((i for i in range(3)), map(str, range(3)), {1, 2, 3}, {'a': 1}))
+def test_serve_auto_iterable_type(iterable):
+    with patch('dollop.iterable.serve') as serve_iterable:
+        serve_iterable.return_value = iter([None])
+        _ = [*serve(iterable, serving_size=10)]
+        serve_iterable.assert_called_once()
+
+
+@pytest.mark.parametrize('prefetch', (1, 3))
+def test_serve_auto_prefetch(prefetch):
+    assert [*serve('Dolloping all day long', serving_size=6, prefetch=prefetch)] == \
+           ['Dollop', 'ing al', 'l day ', 'long']
+
+
+@pytest.mark.parametrize('kwargs', (dict(contiguous=True), dict(out=np.empty((10, 4)))))
+def test_serve_auto_prefetch_with_reused_buffers_raises_error(kwargs):
+    with pytest.raises(ValueError):
+        _ = [*serve(np.zeros((10, 10)), serving_size=4, dim=1, prefetch=3, **kwargs)]
+
+
+@pytest.fixture
+def registry():
+    from dollop import auto
+    saved = list(auto._registry)
+    yield auto
+    auto._registry[:] = saved
+    auto._backends.clear()
+
+
+class Yogurt:
+    def __init__(self, pots):
+        self.pots = pots
+
+
+def serve_yogurt(yogurt, serving_size=None, n_servings=None):
+    return (yogurt.pots[i:i + serving_size] for i in range(0, len(yogurt.pots), serving_size))
+
+
+@pytest.mark.parametrize('key', (Yogurt, __name__, f'{__name__}.Yogurt'))
+@pytest.mark.parametrize('backend', (serve_yogurt, f'{__name__}:serve_yogurt'))
+def test_serve_auto_registered_backend(key, backend, registry):
+    with pytest.raises(NotImplementedError):
+        _ = [*serve(Yogurt([1, 2, 3]), serving_size=2)]
+
+    registry.register(key, backend)
+    assert [*serve(Yogurt([1, 2, 3]), serving_size=2)] == [[1, 2], [3]]
+
+
+def test_serve_auto_registered_backend_takes_precedence(registry):
+    serve_list = Mock(return_value=iter(['served as a list']))
+    registry.register(list, serve_list)
+    with patch('dollop.sequence.serve') as serve_sequence:
+        assert [*serve([1, 2, 3], serving_size=2)] == ['served as a list']
+        serve_list.assert_called_once_with([1, 2, 3], serving_size=2, n_servings=None)
+        serve_sequence.assert_not_called()
+
+
+def test_serve_auto_caches_backend_per_class(registry):
+    with patch.object(registry, '_find_backend', wraps=registry._find_backend) as find_backend:
+        for _ in range(3):
+            _ = [*serve([1, 2, 3], serving_size=2)]
+            _ = [*serve((1, 2, 3), serving_size=2)]
+        assert find_backend.call_count == 2
+
+
+def test_import_does_not_import_backends():
+    import subprocess
+    import sys
+    code = 'import sys, dollop; print(sorted(m for m in sys.modules if m.startswith(("dollop.", "pathlib"))))'
+    modules = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert 'dollop.pandas' not in modules
+    assert 'dollop.file' not in modules
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+import torch
+
+from unittest.mock import patch
+
+from dollop import collect, serve_apply
+
+
+def double(x):
+    return x * 2
+
+
+@pytest.mark.parametrize('dim', [0, 1, 2])
+@pytest.mark.parametrize('size_arg, size', [('serving_size', 1), ('serving_size', 3), ('n_servings', 2)])
+def test_serve_apply_numpy(dim, size_arg, size):
+    array = np.random.rand(5, 6, 7)
+
+    with patch('numpy.concatenate') as concatenate:
+        result = serve_apply(double, array, dim=dim, **{size_arg: size})
+        concatenate.assert_not_called()
+
+    np.testing.assert_array_equal(result, array * 2)
+
+
+@pytest.mark.parametrize('dim', [0, 1])
+def test_serve_apply_torch(dim):
+    tensor = torch.rand(5, 6)
+
+    with patch('torch.cat') as cat:
+        result = serve_apply(double, tensor, serving_size=2, dim=dim)
+        cat.assert_not_called()
+
+    assert torch.equal(result, tensor * 2)
+
+
+def test_serve_apply_into_out():
+    array = np.random.rand(10, 3)
+    out = np.empty_like(array)
+
+    assert serve_apply(np.sqrt, array, serving_size=4, out=out) is out
+    np.testing.assert_array_equal(out, np.sqrt(array))
+
+    with pytest.raises(ValueError):
+        serve_apply(np.sqrt, array, serving_size=4, out=np.empty((9, 3)))
+    with pytest.raises(ValueError):
+        serve_apply(np.sqrt, array, serving_size=4, out=np.empty((11, 3)))
+
+
+@pytest.mark.parametrize('fn', [lambda x: x[:1], lambda x: np.concatenate([x, x]), lambda x: x[:, :1]])
+def test_serve_apply_falls_back_to_concatenation(fn):
+    array = np.random.rand(10, 3)
+    result = serve_apply(fn, array, serving_size=4)
+    np.testing.assert_array_equal(result, np.concatenate([fn(array[i:i + 4]) for i in range(0, 10, 4)]))
+
+
+def test_serve_apply_pandas():
+    df = pd.DataFrame({'a': range(10), 'b': np.arange(10.) / 3}, index=range(100, 110))
+
+    with patch('pandas.concat') as concat:
+        result = serve_apply(double, df, serving_size=4)
+        concat.assert_not_called()
+
+    pd.testing.assert_frame_equal(result, df * 2)
+    pd.testing.assert_series_equal(serve_apply(double, df['b'], serving_size=3), df['b'] * 2)
+
+
+@pytest.mark.parametrize('fn', [lambda d: d.assign(c=d['a'].astype(str)), lambda d: d.head(1), lambda d: d[['b']]])
+def test_serve_apply_pandas_falls_back_to_concatenation(fn):
+    df = pd.DataFrame({'a': range(10), 'b': np.arange(10.) / 3})
+    result = serve_apply(fn, df, serving_size=4)
+    pd.testing.assert_frame_equal(result, pd.concat([fn(df.iloc[i:i + 4]) for i in range(0, 10, 4)]))
+
+
+@pytest.mark.parametrize('obj, fn, expected', [
+    ('abcdefg', str.upper, 'ABCDEFG'),
+    (b'abcdefg', bytes.upper, b'ABCDEFG'),
+    (list(range(5)), lambda x: [i * 2 for i in x], [0, 2, 4, 6, 8]),
+    (tuple(range(5)), lambda x: x[::-1], (1, 0, 3, 2, 4)),
+    (list(range(5)), sum, [1, 5, 4]),
+])
+def test_serve_apply_other_types(obj, fn, expected):
+    assert serve_apply(fn, obj, serving_size=2) == expected
+
+
+def test_serve_apply_arrow():
+    table = pa.table({'a': range(10)})
+    result = serve_apply(lambda t: t, table, serving_size=4)
+    assert result.equals(table)
+    assert result.column('a').num_chunks == 3
+
+
+def test_collect_without_total_concatenates():
+    results = [np.ones((2, 3)), np.zeros((1, 3))]
+    np.testing.assert_array_equal(collect(iter(results)), np.concatenate(results))
+
+
+def test_collect_promotes_mismatched_dtypes():
+    result = collect([np.array([1, 2]), np.array([.5, 1.5])], total=4)
+    np.testing.assert_array_equal(result, [1., 2., .5, 1.5])
+
+    result = serve_apply(lambda d: d * 0.5 if d[0] > 1 else d, np.arange(4), serving_size=2)
+    np.testing.assert_array_equal(result, [0., 1., 1., 1.5])
+
+    result = collect([torch.tensor([1, 2]), torch.tensor([.5, 1.5])], total=4)
+    assert torch.equal(result, torch.tensor([1., 2., .5, 1.5]))
+
+
+def test_collect_casts_into_out():
+    out = np.empty(4, dtype=int)
+    assert collect([np.array([1, 2]), np.array([3., 4.])], out=out) is out
+    np.testing.assert_array_equal(out, [1, 2, 3, 4])
+
+
+def test_collect_nothing():
+    out = np.empty(0)
+    assert collect([], out=out) is out
+    with pytest.raises(ValueError):
+        collect([])
+
+
+def test_serve_apply_with_workers():
+    array = np.random.rand(20, 3)
+    np.testing.assert_array_equal(serve_apply(double, array, serving_size=3, workers=2), array * 2)
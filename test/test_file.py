@@ -1,11 +1,18 @@
+import bz2
+import gzip
+import lzma
+import mmap
+import os
 import pytest
+import threading
+import time
 
 from pathlib import Path
 from tempfile import NamedTemporaryFile, TemporaryDirectory
-from dollop.file import serve
+from dollop.file import LineIndex, _LineCursor, build_index, serve, shard
 
 
-def helper_create_and_serve_file_obj(content, file_obj_type, mode, serving_size):
+def helper_create_and_serve_file_obj(content, file_obj_type, mode, serving_size, with_index=False, **kwargs):
 
     with TemporaryDirectory() as td:
 
@@ -13,6 +20,9 @@ def helper_create_and_serve_file_obj(content, file_obj_type, mode, serving_size)
         with open(file_path, 'w') as f:
             f.write(content)
 
+        if with_index:
+            kwargs['index'] = build_index(file_path)
+
         if file_obj_type == 'string':
             file_obj = file_path
         elif file_obj_type == 'pathlib':
@@ -24,7 +34,7 @@ def helper_create_and_serve_file_obj(content, file_obj_type, mode, serving_size)
         else:
             raise ValueError('Invalid file_obj_type.')
 
-        dollops = [*serve(file_obj, serving_size=serving_size, mode=mode)]
+        dollops = [*serve(file_obj, serving_size=serving_size, mode=mode, **kwargs)]
         return dollops
 
 
@@ -140,3 +150,442 @@ def test_nonexistent_file_raises_error():
         with pytest.raises(FileNotFoundError):
             _ = [*serve(f'{td}/file.txt', serving_size=1)]
 
+
+def helper_serve_chars_one_at_a_time(h, serving_size):
+    # Reference implementation: the original character-by-character chars mode.
+    finished = False
+    while not finished:
+        dollop = h.read(0)
+        for _ in range(serving_size):
+            token = h.read(1)
+            if token:
+                dollop += token
+            else:
+                finished = True
+                break
+        if dollop:
+            yield dollop
+
+
+@pytest.mark.parametrize('block_size', (1, 3, 7, 64, 1 << 20))
+@pytest.mark.parametrize('serving_size', (1, 2, 5, 13, 100, 5000))
+@pytest.mark.parametrize('file_obj_type', ('string', 'handle', 'handle_binary'))
+def test_serve_chars_matches_one_at_a_time(block_size, serving_size, file_obj_type, monkeypatch):
+    monkeypatch.setattr('dollop.file.BLOCK_SIZE', block_size)
+    content = ''.join(f'line {i}: {"x" * (i % 17)}\n' for i in range(300))
+
+    dollops = helper_create_and_serve_file_obj(content, file_obj_type, 'chars', serving_size)
+
+    with TemporaryDirectory() as td:
+        file_path = f'{td}/content.txt'
+        with open(file_path, 'w') as f:
+            f.write(content)
+        with open(file_path, 'rb' if file_obj_type == 'handle_binary' else 'r') as f:
+            expected = [*helper_serve_chars_one_at_a_time(f, serving_size)]
+
+    assert dollops == expected
+
+
+def test_serve_chars_throughput_beats_one_at_a_time():
+    content = 'The fog comes on little cat feet.\n' * 30000
+
+    with TemporaryDirectory() as td:
+        file_path = f'{td}/content.txt'
+        with open(file_path, 'w') as f:
+            f.write(content)
+
+        with open(file_path, 'r') as f:
+            start = time.perf_counter()
+            expected = [*helper_serve_chars_one_at_a_time(f, 1000)]
+            reference_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dollops = [*serve(file_path, serving_size=1000, mode='chars')]
+        buffered_time = time.perf_counter() - start
+
+    assert dollops == expected
+    assert buffered_time < reference_time
+
+
+@pytest.mark.parametrize('serving_size', (1, 3, 10, 20))
+@pytest.mark.parametrize('file_obj_type', ('string', 'pathlib', 'handle', 'handle_binary'))
+def test_serve_lines_as_list(serving_size, file_obj_type):
+    content = ''.join(f'line {i}\n' for i in range(10)) + 'no trailing newline'
+
+    dollops = helper_create_and_serve_file_obj(content, file_obj_type, 'lines', serving_size, as_list=True)
+    joined = helper_create_and_serve_file_obj(content, file_obj_type, 'lines', serving_size)
+
+    assert all(isinstance(d, list) for d in dollops)
+    assert all(len(d) == serving_size for d in dollops[:-1])
+    assert [''.join(d) if isinstance(d[0], str) else b''.join(d) for d in dollops] == joined
+
+
+def test_serve_chars_as_list_raises_error():
+    with pytest.raises(ValueError):
+        _ = [*serve('file.txt', serving_size=1, mode='chars', as_list=True)]
+
+
+def test_serve_lines_large_serving_size():
+    content = ''.join(f'{i}\n' for i in range(200000))
+
+    dollops = helper_create_and_serve_file_obj(content, 'string', 'lines', serving_size=100000)
+
+    assert len(dollops) == 2
+    assert ''.join(dollops) == content
+
+
+def helper_write_file(td, content):
+    file_path = f'{td}/content.txt'
+    with open(file_path, 'w') as f:
+        f.write(content)
+    return file_path
+
+
+mmap_contents = (
+    '',
+    'no newline at all',
+    ''.join(f'line {i}: {"x" * (i % 7)}\n' for i in range(50)),
+    ''.join(f'line {i}\n' for i in range(50)) + 'trailing',
+    '\n\n\nnice to\n\nmeet you\n\n',
+)
+
+
+@pytest.mark.parametrize('content', mmap_contents)
+@pytest.mark.parametrize('serving_size', (1, 3, 10, 17, 40, 1000))
+@pytest.mark.parametrize('mode', ('lines', 'chars'))
+@pytest.mark.parametrize('file_obj_type', ('string', 'pathlib', 'handle', 'handle_binary'))
+def test_serve_mmap_by_serving_size(content, serving_size, mode, file_obj_type):
+    dollops = helper_create_and_serve_file_obj(content, file_obj_type, mode, serving_size, mmap=True)
+
+    assert all(isinstance(d, memoryview) for d in dollops)
+    assert b''.join(dollops) == content.encode()
+
+    if mode == 'lines':
+        expected = helper_create_and_serve_file_obj(content, 'handle_binary', mode, serving_size)
+    else:
+        data = content.encode()
+        expected = [data[i:i + serving_size] for i in range(0, len(data), serving_size)]
+    assert [bytes(d) for d in dollops] == expected
+
+
+@pytest.mark.parametrize('content', mmap_contents)
+@pytest.mark.parametrize('n_servings', (1, 2, 3, 7, 100))
+@pytest.mark.parametrize('mode', ('lines', 'chars'))
+def test_serve_mmap_by_n_servings(content, n_servings, mode):
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, content)
+        dollops = [bytes(d) for d in serve(file_path, n_servings=n_servings, mode=mode, mmap=True)]
+
+    assert len(dollops) == n_servings
+    assert b''.join(dollops) == content.encode()
+
+    sizes = [len(d.splitlines()) if mode == 'lines' else len(d) for d in dollops]
+    assert max(sizes) - min(sizes) <= 1
+
+
+def test_mmap_line_cursor_with_mixed_sizes():
+    content = ''.join(f'line {i}: {"x" * (i % 37)}\n' for i in range(2000)) + 'trailing'
+    lines = content.encode().splitlines(keepends=True)
+    sizes = [1, 5, 200, 3, 16, 17, 1000, 2, 0, 64] * 3
+
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, content)
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            cursor = _LineCursor(mm)
+            start, n_taken = 0, 0
+            for n_lines in sizes:
+                stop = cursor.skip(start, n_lines)
+                assert mm[start:stop] == b''.join(lines[n_taken:n_taken + n_lines])
+                start, n_taken = stop, n_taken + n_lines
+
+
+@pytest.mark.parametrize('serving_size', (10, 1000))
+def test_serve_mmap_lines_is_not_slower_than_text_mode(serving_size):
+
+    def best_time(**kwargs):
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            for _ in serve(file_path, serving_size=serving_size, **kwargs):
+                pass
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, ''.join(f'line {i}: {"x" * (i % 50)}\n' for i in range(50_000)))
+        # Generous margins, so that only a real regression fails on a busy machine.
+        assert best_time(mmap=True) < 2 * best_time() + 0.01
+
+
+def test_serve_mmap_slices_outlive_generator():
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, 'abc\ndef\n')
+        dollops = [*serve(file_path, serving_size=1, mmap=True)]
+        assert [bytes(d) for d in dollops] == [b'abc\n', b'def\n']
+
+
+def test_serve_n_servings_without_mmap_raises_error():
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, 'abc\ndef\n')
+        with pytest.raises(ValueError):
+            _ = [*serve(file_path, n_servings=2)]
+
+
+def test_serve_mmap_as_list_raises_error():
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, 'abc\ndef\n')
+        with pytest.raises(ValueError):
+            _ = [*serve(file_path, serving_size=2, mmap=True, as_list=True)]
+
+
+@pytest.mark.parametrize('content', mmap_contents + ('x' * 100 + '\nshort\n',))
+@pytest.mark.parametrize('n_shards', (1, 2, 3, 7, 32))
+def test_shard_splits_on_line_boundaries(content, n_shards):
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, content)
+        shards = shard(file_path, n_shards=n_shards)
+
+        with open(file_path, 'rb') as f:
+            data = f.read()
+
+    assert len(shards) == n_shards
+    assert shards[0].start == 0
+    assert shards[-1].end == len(data)
+    assert all(a.end == b.start for a, b in zip(shards[:-1], shards[1:]))
+    assert all(s.start == 0 or data[s.start - 1:s.start] == b'\n' for s in shards if s.start < s.end)
+
+
+@pytest.mark.parametrize('content', mmap_contents)
+@pytest.mark.parametrize('n_shards', (1, 2, 3, 7))
+@pytest.mark.parametrize('mode,serving_size', (('lines', 1), ('lines', 4), ('chars', 1), ('chars', 9)))
+def test_serve_shards_reassemble_file(content, n_shards, mode, serving_size):
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, content)
+        shards = shard(Path(file_path), n_shards=n_shards)
+        served = [[*serve(s, serving_size=serving_size, mode=mode)] for s in shards]
+
+    assert all(type(d) == str for dollops in served for d in dollops)
+    assert ''.join(d for dollops in served for d in dollops) == content
+
+    if mode == 'lines':
+        assert all(len(d.splitlines()) == serving_size for dollops in served for d in dollops[:-1])
+
+
+def test_shard_non_path_raises_error():
+    with pytest.raises(TypeError):
+        shard(10, n_shards=2)
+
+
+@pytest.mark.parametrize('content', mmap_contents)
+@pytest.mark.parametrize('block_size', (1, 5, 1 << 20))
+def test_build_index_offsets(content, block_size, monkeypatch):
+    monkeypatch.setattr('dollop.file.BLOCK_SIZE', block_size)
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, content)
+        index = build_index(file_path)
+        with open(file_path, 'rb') as f:
+            lines = f.readlines()
+
+    assert len(index) == len(lines)
+    assert list(index.offsets) == [sum(len(line) for line in lines[:i]) for i in range(len(lines) + 1)]
+
+
+@pytest.mark.parametrize('content', mmap_contents)
+@pytest.mark.parametrize('serving_size', (1, 3, 1000))
+@pytest.mark.parametrize('start', (0, 1, 2, 100))
+@pytest.mark.parametrize('file_obj_type', ('string', 'pathlib', 'handle', 'handle_binary'))
+def test_serve_indexed_by_serving_size(content, serving_size, start, file_obj_type):
+    expected = helper_create_and_serve_file_obj(content, file_obj_type, 'lines', serving_size)[start:]
+    dollops = helper_create_and_serve_file_obj(content, file_obj_type, 'lines', serving_size,
+                                               with_index=True, start=start)
+    assert dollops == expected
+
+
+@pytest.mark.parametrize('content', mmap_contents)
+@pytest.mark.parametrize('n_servings', (1, 2, 3, 7, 100))
+def test_serve_indexed_by_n_servings(content, n_servings):
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, content)
+        index = build_index(file_path)
+        dollops = [*serve(file_path, n_servings=n_servings, index=index)]
+
+    assert len(dollops) == n_servings
+    assert ''.join(dollops) == content
+
+    sizes = [len(d.splitlines()) for d in dollops]
+    assert max(sizes) - min(sizes) <= 1
+
+
+@pytest.mark.parametrize('start', (0, 1, 3, 100))
+def test_serve_start_without_index(start):
+    content = ''.join(f'line {i}\n' for i in range(10))
+    expected = helper_create_and_serve_file_obj(content, 'string', 'lines', serving_size=3)[start:]
+    dollops = helper_create_and_serve_file_obj(content, 'string', 'lines', serving_size=3, start=start)
+    assert dollops == expected
+
+
+def test_build_index_sidecar_round_trip():
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, 'abc\ndef\nghi')
+        index = build_index(file_path, sidecar=True)
+
+        loaded = LineIndex.load(f'{file_path}.idx')
+        assert list(loaded.offsets) == list(index.offsets) == [0, 4, 8, 11]
+        assert loaded.is_valid(file_path)
+        assert list(build_index(file_path, sidecar=True).offsets) == [0, 4, 8, 11]
+
+
+def test_stale_index_raises_error():
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, 'abc\ndef\n')
+        index = build_index(file_path)
+        helper_write_file(td, 'abc\ndef\nghi\n')
+
+        assert not index.is_valid(file_path)
+        with pytest.raises(ValueError):
+            _ = [*serve(file_path, serving_size=1, index=index)]
+
+        # A stale sidecar is rebuilt rather than trusted.
+        index.save(f'{file_path}.idx')
+        assert len(build_index(file_path, sidecar=True)) == 3
+
+
+def test_serve_index_chars_mode_raises_error():
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, 'abc\ndef\n')
+        index = build_index(file_path)
+        with pytest.raises(ValueError):
+            _ = [*serve(file_path, serving_size=1, mode='chars', index=index)]
+
+
+compressors = {'gzip': gzip, 'bz2': bz2, 'xz': lzma}
+
+
+def helper_write_compressed_file(td, content, compression, suffix):
+    file_path = f'{td}/content.txt{suffix}'
+    with compressors[compression].open(file_path, 'wt') as f:
+        f.write(content)
+    return file_path
+
+
+@pytest.mark.parametrize('content', mmap_contents)
+@pytest.mark.parametrize('compression, suffix', (
+    ('gzip', '.gz'), ('bz2', '.bz2'), ('xz', '.xz'), ('gzip', ''), ('bz2', '.log'), ('xz', ''),
+))
+@pytest.mark.parametrize('mode, serving_size', (('lines', 1), ('lines', 4), ('chars', 1), ('chars', 9)))
+def test_serve_compressed_file(content, compression, suffix, mode, serving_size):
+    expected = helper_create_and_serve_file_obj(content, 'string', mode, serving_size)
+
+    with TemporaryDirectory() as td:
+        file_path = helper_write_compressed_file(td, content, compression, suffix)
+        assert [*serve(file_path, serving_size=serving_size, mode=mode)] == expected
+        assert [*serve(Path(file_path), serving_size=serving_size, mode=mode, compression=compression)] == expected
+
+
+@pytest.mark.parametrize('compression, suffix', (('gzip', '.gz'), ('bz2', ''), ('xz', '.log')))
+def test_shard_compressed_file_raises_error(compression, suffix):
+    with TemporaryDirectory() as td:
+        file_path = helper_write_compressed_file(td, 'abc\n' * 100, compression, suffix)
+        with pytest.raises(ValueError):
+            shard(file_path, n_shards=2)
+
+
+def test_serve_compressed_file_across_blocks(monkeypatch):
+    monkeypatch.setattr('dollop.file.BLOCK_SIZE', 7)
+    content = ''.join(f'line {i}: {"x" * (i % 7)}\n' for i in range(500))
+
+    with TemporaryDirectory() as td:
+        file_path = helper_write_compressed_file(td, content, 'gzip', '.gz')
+        assert ''.join(serve(file_path, serving_size=13)) == content
+
+
+def test_serve_compressed_file_without_decompressing():
+    with TemporaryDirectory() as td:
+        file_path = helper_write_compressed_file(td, 'abc\n', 'gzip', '.gz')
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        assert b''.join(serve(file_path, serving_size=1, mmap=True, mode='chars', compression=None)) == data
+
+
+def test_serve_compressed_file_stops_background_thread(monkeypatch):
+    # Small blocks, so that the background thread is still running when the consumer stops.
+    monkeypatch.setattr('dollop.file.BLOCK_SIZE', 16)
+
+    with TemporaryDirectory() as td:
+        file_path = helper_write_compressed_file(td, 'abc\n' * 100000, 'bz2', '.bz2')
+        n_threads = threading.active_count()
+
+        dollops = serve(file_path, serving_size=1)
+        next(dollops)
+        assert threading.active_count() == n_threads + 1
+
+        dollops.close()
+        time.sleep(0.5)
+        assert threading.active_count() == n_threads
+
+
+def test_serve_plain_file_is_not_treated_as_compressed():
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, 'BZh9 looks a bit like bz2\n')
+        assert [*serve(file_path, serving_size=1)] == ['BZh9 looks a bit like bz2\n']
+
+
+def test_serve_file_with_positional_mode():
+    with TemporaryDirectory() as td:
+        file_path = helper_write_file(td, 'abcdefg\nh\n')
+        assert [*serve(file_path, 4, 'chars')] == ['abcd', 'efg\n', 'h\n']
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason='Named pipes are not available.')
+def test_serve_named_pipe_is_opened_once():
+    with TemporaryDirectory() as td:
+        fifo_path = f'{td}/fifo'
+        os.mkfifo(fifo_path)
+
+        def write():
+            with open(fifo_path, 'w') as f:
+                f.write('first line\nsecond line\n')
+
+        writer = threading.Thread(target=write, daemon=True)
+        writer.start()
+
+        # A second open of the pipe would block forever, so serve it on a thread that can be given up on.
+        dollops = []
+        reader = threading.Thread(target=lambda: dollops.extend(serve(fifo_path, serving_size=1)), daemon=True)
+        reader.start()
+        reader.join(timeout=10)
+
+        assert not reader.is_alive()
+        assert dollops == ['first line\n', 'second line\n']
+
+
+@pytest.mark.parametrize('kwargs', (dict(mmap=True), dict(compression='zip')))
+def test_serve_compressed_file_bad_args_raise_error(kwargs):
+    with TemporaryDirectory() as td:
+        file_path = helper_write_compressed_file(td, 'abc\n', 'gzip', '.gz')
+        with pytest.raises(ValueError):
+            _ = [*serve(file_path, serving_size=1, **kwargs)]
+
+
+@pytest.mark.parametrize('mode', ['lines', 'chars'])
+@pytest.mark.parametrize('file_obj_type', ['string', 'handle', 'handle_binary'])
+def test_serve_file_auto(mode, file_obj_type):
+    content = ''.join(f'{i}\n' for i in range(100))
+
+    # A quick consumer never gets near the target, so the dollops double in size.
+    dollops = helper_create_and_serve_file_obj(content, file_obj_type, mode, 'auto', target_latency=10.)
+
+    sizes = [len(dollop.splitlines()) if mode == 'lines' else len(dollop) for dollop in dollops]
+    assert sizes[:6] == [1, 2, 4, 8, 16, 32]
+    joined = dollops[0][:0].join(dollops)
+    assert joined == (content.encode() if file_obj_type == 'handle_binary' else content)
+
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(target_latency=0.1, mmap=True),
+                                    dict(target_latency=0.1, n_servings=2)])
+def test_serve_file_auto_bad_args_raise_error(kwargs):
+    with TemporaryDirectory() as td:
+        file_path = f'{td}/content.txt'
+        Path(file_path).write_text('abc\n')
+        with pytest.raises(ValueError):
+            _ = [*serve(file_path, serving_size='auto', **kwargs)]
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from dollop.iterable import serve
+
+
+@pytest.fixture
+def iterable_creators():
+
+    def create_generator(n):
+        return (i for i in range(n))
+
+    def create_map(n):
+        return map(int, range(n))
+
+    def create_iterator(n):
+        return iter(list(range(n)))
+
+    def create_set(n):
+        return set(range(n))
+
+    return {
+        'generator': create_generator,
+        'map': create_map,
+        'iterator': create_iterator,
+        'set': create_set,
+    }
+
+
+@pytest.mark.parametrize('iterable_type', ('generator', 'map', 'iterator', 'set'))
+@pytest.mark.parametrize("n_items", (0, 5, 10, 13, 17, 25, 50, 100))
+@pytest.mark.parametrize("serving_size", [1, 2, 3, 5, 10, 21, 25, 27, 100, 200])
+def test_serve_iterable_by_serving_size(n_items, serving_size, iterable_type, iterable_creators):
+
+    items = iterable_creators[iterable_type](n=n_items)
+    dollops = [*serve(items, serving_size=serving_size)]
+
+    expected_full = n_items // serving_size
+    remainder = n_items % serving_size
+
+    if remainder == 0:
+        assert len(dollops) == expected_full
+        assert all(len(d) == serving_size for d in dollops)
+    else:
+        assert len(dollops) == expected_full + 1
+        assert all(len(d) == serving_size for d in dollops[:-1])
+        assert len(dollops[-1]) == remainder
+
+    assert all(isinstance(d, list) for d in dollops)
+    assert sorted(x for d in dollops for x in d) == list(range(n_items))
+
+
+@pytest.mark.parametrize('container,expected_type', ((None, list), (list, list), (tuple, tuple),
+                                                     (np.ndarray, np.ndarray), (frozenset, frozenset)))
+def test_serve_iterable_container(container, expected_type):
+    dollops = [*serve((i for i in range(10)), serving_size=4, container=container)]
+
+    assert all(isinstance(d, expected_type) for d in dollops)
+    assert [len(d) for d in dollops] == [4, 4, 2]
+    assert [x for d in dollops for x in d] == list(range(10))
+
+
+def test_serve_iterable_is_lazy():
+    consumed = []
+
+    def generator():
+        for i in range(100):
+            consumed.append(i)
+            yield i
+
+    dollops = serve(generator(), serving_size=10)
+    assert next(dollops) == list(range(10))
+    assert len(consumed) == 10
+
+
+def test_serve_iterable_n_servings_raises_error():
+    with pytest.raises(ValueError):
+        _ = [*serve(iter(range(10)), n_servings=2)]
+
+
+def test_serve_iterable_bad_container_raises_error():
+    with pytest.raises(TypeError):
+        _ = [*serve(iter(range(10)), serving_size=2, container=5)]
+
+
+@pytest.mark.parametrize('non_iterable', (10, 10.1, None))
+def test_non_iterable_raises_error(non_iterable):
+    with pytest.raises(NotImplementedError):
+        _ = [*serve(non_iterable, serving_size=10)]
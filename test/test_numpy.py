@@ -1,7 +1,7 @@
 import numpy as np
 import pytest
 
-from dollop.numpy import serve
+from dollop.numpy import serve, serve_tiles, stitch
 
 sizes = (
     (1,),
@@ -106,3 +106,168 @@ def test_serve_numpy_non_numpy_obj_raises_error(bad_input):
 
     with pytest.raises(TypeError):
         _ = [*serve(bad_input, n_servings=5)]
+
+
+@pytest.mark.parametrize("array", arrays)
+@pytest.mark.parametrize("dim", [0, 1, 2])
+@pytest.mark.parametrize("serving_bytes", [1, 8, 100, 8000, 10 ** 9])
+def test_serve_numpy_by_serving_bytes(array, dim, serving_bytes):
+    if array.ndim <= dim:
+        return
+
+    dollops = [*serve(array, serving_bytes=serving_bytes, dim=dim)]
+
+    row_bytes = array.nbytes // array.shape[dim]
+    expected_serving_size = max(serving_bytes // row_bytes, 1)
+    assert all(d.shape[dim] == expected_serving_size for d in dollops[:-1])
+    assert all(d.nbytes <= serving_bytes for d in dollops if d.shape[dim] > 1)
+    np.testing.assert_array_equal(np.concatenate(dollops, axis=dim), array)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {'serving_bytes': 100, 'serving_size': 1},
+    {'serving_bytes': 100, 'n_servings': 1},
+    {'serving_bytes': 0},
+    {'serving_bytes': 1.5},
+])
+def test_serve_numpy_invalid_serving_bytes_raises(kwargs):
+    with pytest.raises(ValueError):
+        _ = [*serve(np.zeros(10), **kwargs)]
+
+
+@pytest.mark.parametrize("array", arrays)
+@pytest.mark.parametrize("dim", [0, 1, 2])
+@pytest.mark.parametrize("serving_size", [1, 3, 27, 200])
+def test_serve_numpy_contiguous(array, dim, serving_size):
+    if array.ndim <= dim:
+        return
+
+    dollops = []
+    for d in serve(array, serving_size=serving_size, dim=dim, contiguous=True):
+        assert d.flags.c_contiguous
+        dollops.append(d.copy())
+
+    expected = [*serve(array, serving_size=serving_size, dim=dim)]
+    assert len(dollops) == len(expected)
+    assert all(np.array_equal(d, e) for d, e in zip(dollops, expected))
+
+
+def test_serve_numpy_contiguous_reuses_two_buffers():
+    array = np.arange(60).reshape(3, 20)
+
+    dollops = [*serve(array, serving_size=4, dim=1, contiguous=True)]
+
+    assert len({d.__array_interface__['data'][0] for d in dollops}) == 2
+    assert all(not np.shares_memory(d, array) for d in dollops)
+
+
+@pytest.mark.parametrize("n_buffers", [1, 3])
+def test_serve_numpy_out(n_buffers):
+    array = np.random.random(size=(10, 7, 5))
+    buffers = [np.empty((3, 7, 5)) for _ in range(n_buffers)]
+    out = buffers[0] if n_buffers == 1 else buffers
+
+    for i, d in enumerate(serve(array, serving_size=3, dim=0, out=out)):
+        assert np.shares_memory(d, buffers[i % n_buffers])
+        np.testing.assert_array_equal(d, array[3 * i:3 * i + 3])
+
+
+@pytest.mark.parametrize("out", [
+    np.empty(10),
+    np.empty((3, 7, 5), dtype=np.float32),
+    np.empty((7, 5, 3)).transpose(2, 0, 1),
+    [],
+])
+def test_serve_numpy_invalid_out_raises(out):
+    with pytest.raises(ValueError):
+        _ = [*serve(np.random.random(size=(10, 7, 5)), serving_size=3, out=out)]
+
+
+@pytest.mark.parametrize("dim", [0, 1])
+@pytest.mark.parametrize("n_servings", [1, 2, 3, 7])
+def test_serve_numpy_by_weights(dim, n_servings):
+    array = np.random.random(size=(20, 30))
+    weights = np.arange(array.shape[dim])
+
+    dollops = [*serve(array, n_servings=n_servings, dim=dim, weights=weights)]
+
+    assert len(dollops) == n_servings
+    np.testing.assert_array_equal(np.concatenate(dollops, axis=dim), array)
+
+    # Heavier items come later, so later dollops hold fewer of them.
+    sizes = [d.shape[dim] for d in dollops]
+    assert sizes[0] == max(sizes) and sizes[-1] == min(sizes)
+
+
+def test_serve_numpy_by_weight_function():
+    array = np.zeros((6, 3))
+    array[[0, 3]] = 1
+
+    dollops = [*serve(array, n_servings=2, weights=lambda row: row.sum() * 10 + 1)]
+
+    assert [d.shape[0] for d in dollops] == [3, 3]
+
+
+@pytest.mark.parametrize('tile, dims, halo', [((4, 4), None, 0), ((3, 5), (2, 0), 2), ((2,), (1,), (1,))])
+def test_serve_numpy_tiles(tile, dims, halo):
+    array = np.random.rand(10, 8, 6)
+
+    pieces = [*serve_tiles(array, tile, dims, halo)]
+
+    for t, view in pieces:
+        assert np.shares_memory(view, array)
+        np.testing.assert_array_equal(view, array[t.region])
+
+    # A per-tile function that needs the halo, stitched back together.
+    result = stitch(((t, view * 2) for t, view in pieces), np.empty_like(array))
+    np.testing.assert_array_equal(result, array * 2)
+
+
+def test_serve_numpy_tiles_non_numpy_raises_error():
+    with pytest.raises(TypeError):
+        _ = [*serve_tiles([[1, 2], [3, 4]], (1, 1))]
+
+
+@pytest.mark.parametrize('dim', [0, 1, 2])
+@pytest.mark.parametrize('window, step', [(1, 1), (4, 2), (5, 5)])
+def test_serve_numpy_by_window(dim, window, step):
+    array = np.random.rand(10, 9, 8)
+
+    dollops = [*serve(array, window=window, step=step, dim=dim)]
+
+    starts = range(0, array.shape[dim] - window + 1, step)
+    assert len(dollops) == len(starts)
+    for start, dollop in zip(starts, dollops):
+        assert np.shares_memory(dollop, array)
+        np.testing.assert_array_equal(dollop, np.take(array, range(start, start + window), axis=dim))
+
+
+def test_serve_numpy_by_window_with_serving_size_raises_error():
+    with pytest.raises(ValueError):
+        _ = [*serve(np.zeros(10), serving_size=2, window=2)]
+
+
+@pytest.mark.parametrize('dim', [0, 1])
+def test_serve_numpy_auto(dim):
+    array = np.random.rand(100, 70)
+
+    # A quick consumer never gets near the target, so the dollops double in size up to max_serving_size.
+    dollops = [*serve(array, serving_size='auto', target_latency=10., max_serving_size=16, dim=dim)]
+
+    sizes = [dollop.shape[dim] for dollop in dollops]
+    assert sizes[:5] == [1, 2, 4, 8, 16] and set(sizes[5:-1]) == {16}
+    np.testing.assert_array_equal(np.concatenate(dollops, axis=dim), array)
+
+
+def test_serve_numpy_auto_contiguous():
+    array = np.random.rand(50, 6)
+
+    served = serve(array, serving_size='auto', target_latency=10., max_serving_size=4, dim=1, contiguous=True)
+    dollops = [dollop.copy() for dollop in served]
+
+    np.testing.assert_array_equal(np.concatenate(dollops, axis=1), array)
+
+
+def test_serve_numpy_auto_contiguous_without_max_raises_error():
+    with pytest.raises(ValueError, match='max_serving_size'):
+        _ = [*serve(np.zeros((10, 3)), serving_size='auto', target_latency=0.1, dim=1, contiguous=True)]
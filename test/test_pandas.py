@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -93,3 +94,190 @@ def test_non_pandas_obj_raises_error(non_sequence_type, non_pandas_objs):
         _ = [*serve(non_sequence, serving_size=10)]
     with pytest.raises(TypeError):
         _ = [*serve(non_sequence, n_servings=10)]
+
+
+def helper_deep_row_memory(pandas_obj):
+    # Deep memory usage, counting the index unless it is a RangeIndex (whose size doesn't depend on the rows).
+    usage = np.sum(pandas_obj.memory_usage(deep=True, index=False))
+    if not isinstance(pandas_obj.index, pd.RangeIndex):
+        usage += pandas_obj.index.memory_usage(deep=True)
+    return usage
+
+
+@pytest.mark.parametrize('pandas_obj_type', ('series', 'df'))
+@pytest.mark.parametrize("n_items", (0, 5, 13, 100))
+@pytest.mark.parametrize("serving_bytes", [1, 100, 1000, 10 ** 9])
+def test_serve_pandas_by_serving_bytes(n_items, serving_bytes, pandas_obj_type, pandas_obj_creators):
+    pandas_obj = pandas_obj_creators[pandas_obj_type](n=n_items)
+
+    dollops = [*serve(pandas_obj, serving_bytes=serving_bytes)]
+
+    assert all(isinstance(d, type(pandas_obj)) for d in dollops)
+    assert all(helper_deep_row_memory(d) <= serving_bytes for d in dollops if len(d) > 1)
+    assert sum(len(d) for d in dollops) == n_items
+    if n_items > 0:
+        assert pd.concat(dollops).equals(pandas_obj)
+
+
+@pytest.mark.parametrize("serving_bytes", [1, 200, 500, 2000, 10 ** 9])
+def test_serve_pandas_by_serving_bytes_variable_width(serving_bytes):
+    df = pd.DataFrame({
+        'number': range(40),
+        'text': ['x' * (i * 7 % 50) for i in range(40)],
+        'mixed': [list(range(i % 5)) for i in range(40)],
+    })
+
+    dollops = [*serve(df, serving_bytes=serving_bytes)]
+
+    assert pd.concat(dollops).equals(df)
+    for d, next_d in zip(dollops, dollops[1:] + [None]):
+        usage = d.memory_usage(deep=True, index=False).sum()
+        if len(d) > 1:
+            assert usage <= serving_bytes
+        if next_d is not None:
+            # Dollops are packed greedily, so the next row would not have fitted.
+            grown = df.iloc[d.index[0]:d.index[-1] + 2]
+            assert grown.memory_usage(deep=True, index=False).sum() > serving_bytes
+
+
+@pytest.mark.parametrize("dtype", [object, 'string', 'string[pyarrow]'])
+def test_serve_pandas_by_serving_bytes_string_dtypes(dtype):
+    series = pd.Series(['a'] * 90 + ['x' * 10000] * 10, dtype=dtype)
+
+    dollops = [*serve(series, serving_bytes=20000)]
+
+    assert pd.concat(dollops).equals(series)
+    assert all(d.memory_usage(deep=True, index=False) <= 20000 for d in dollops if len(d) > 1)
+
+
+def test_serve_pandas_serving_bytes_with_serving_size_raises_error():
+    with pytest.raises(ValueError):
+        _ = [*serve(pd.Series(range(10)), serving_bytes=100, serving_size=2)]
+
+
+def helper_grouped_dataframe(group_sizes):
+    keys = [k for k, size in enumerate(group_sizes) for _ in range(size)]
+    return pd.DataFrame({'key': keys, 'other': [k % 2 for k in keys], 'value': range(len(keys))})
+
+
+def helper_check_groups_intact(dollops, df, key_columns):
+    assert pd.concat(dollops).equals(df) if len(df) else sum(len(d) for d in dollops) == 0
+    seen = set()
+    for d in dollops:
+        dollop_keys = set(map(tuple, d[key_columns].to_numpy()))
+        assert not (seen & dollop_keys)
+        seen |= dollop_keys
+
+
+group_sizes = ([], [1], [5], [1, 1, 1, 1, 1, 1], [3, 1, 4, 1, 5, 9, 2, 6], [10, 1, 1, 1, 10])
+
+
+@pytest.mark.parametrize("sizes", group_sizes)
+@pytest.mark.parametrize("serving_size", (1, 2, 4, 7, 100))
+def test_serve_pandas_group_by_serving_size(sizes, serving_size):
+    df = helper_grouped_dataframe(sizes)
+
+    dollops = [*serve(df, serving_size=serving_size, group_by='key')]
+
+    helper_check_groups_intact(dollops, df, ['key'])
+    for d, next_d in zip(dollops, dollops[1:]):
+        assert len(d) <= serving_size or d['key'].nunique() == 1
+        # Dollops are packed greedily, so the next group would not have fitted.
+        assert len(d) + (next_d['key'] == next_d['key'].iloc[0]).sum() > serving_size
+
+
+@pytest.mark.parametrize("sizes", group_sizes)
+@pytest.mark.parametrize("n_servings", (1, 2, 3, 5, 30))
+def test_serve_pandas_group_by_n_servings(sizes, n_servings):
+    df = helper_grouped_dataframe(sizes)
+
+    dollops = [*serve(df, n_servings=n_servings, group_by='key')]
+
+    assert len(dollops) == n_servings
+    helper_check_groups_intact(dollops, df, ['key'])
+
+
+def test_serve_pandas_group_by_multiple_columns_and_arrays():
+    df = helper_grouped_dataframe([3, 1, 4, 1, 5])
+
+    by_columns = [*serve(df, serving_size=3, group_by=['key', 'other'])]
+    by_array = [*serve(df, serving_size=3, group_by=df['key'].to_numpy())]
+    by_series = [*serve(df['value'], serving_size=3, group_by=df['key'])]
+
+    helper_check_groups_intact(by_columns, df, ['key', 'other'])
+    assert [len(d) for d in by_columns] == [len(d) for d in by_array] == [len(d) for d in by_series] == [3, 1, 4, 1, 5]
+
+
+def test_serve_pandas_group_by_non_contiguous_raises_error():
+    df = pd.DataFrame({'key': [1, 1, 2, 1], 'value': range(4)})
+    with pytest.raises(ValueError):
+        _ = [*serve(df, serving_size=2, group_by='key')]
+
+
+@pytest.mark.parametrize("kwargs", (
+    {'group_by': 'missing', 'serving_size': 2},
+    {'group_by': [1, 2], 'serving_size': 2},
+    {'group_by': 'key', 'serving_bytes': 100},
+    {'group_by': 'key'},
+))
+def test_serve_pandas_group_by_invalid_args_raise_error(kwargs):
+    df = pd.DataFrame({'key': [1, 1, 2, 2], 'value': range(4)})
+    with pytest.raises(ValueError):
+        _ = [*serve(df, **kwargs)]
+
+
+@pytest.mark.parametrize("n_servings", [1, 2, 3, 7])
+def test_serve_pandas_by_weights(n_servings):
+    df = pd.DataFrame({'text': ['x' * (i * 5) for i in range(20)], 'length': [i * 5 for i in range(20)]})
+
+    by_column = [*serve(df, n_servings=n_servings, weights='length')]
+    by_array = [*serve(df, n_servings=n_servings, weights=df['length'].to_numpy())]
+    by_function = [*serve(df, n_servings=n_servings, weights=lambda row: len(row['text']))]
+    by_series_function = [*serve(df['text'], n_servings=n_servings, weights=len)]
+
+    assert len(by_column) == n_servings
+    assert pd.concat(by_column).equals(df)
+
+    sizes = [len(d) for d in by_column]
+    assert sizes == sorted(sizes, reverse=True)
+    assert sizes == [len(d) for d in by_array] == [len(d) for d in by_function] == [len(d) for d in by_series_function]
+
+
+def test_serve_pandas_weights_with_group_by_raises_error():
+    df = pd.DataFrame({'key': [1, 1, 2, 2], 'value': range(4)})
+    with pytest.raises(ValueError):
+        _ = [*serve(df, n_servings=2, group_by='key', weights='value')]
+
+
+@pytest.mark.parametrize('window, step', [(1, 1), (4, 2), (5, 5), (20, 1)])
+def test_serve_pandas_by_window(window, step):
+    df = pd.DataFrame({'a': range(10), 'b': list('abcdefghij')})
+
+    dollops = [*serve(df, window=window, step=step)]
+
+    starts = range(0, 10 - window + 1, step)
+    assert len(dollops) == len(starts)
+    for start, dollop in zip(starts, dollops):
+        pd.testing.assert_frame_equal(dollop, df.iloc[start:start + window])
+
+
+@pytest.mark.parametrize('kwargs', [dict(serving_size=2), dict(group_by='b'), dict(serving_bytes=100)])
+def test_serve_pandas_by_window_bad_args_raise_error(kwargs):
+    with pytest.raises(ValueError):
+        _ = [*serve(pd.DataFrame({'a': range(10), 'b': 1}), window=2, **kwargs)]
+
+
+def test_serve_pandas_auto():
+    df = pd.DataFrame({'a': range(100), 'b': 1.})
+
+    # A quick consumer never gets near the target, so the dollops double in size.
+    dollops = [*serve(df, serving_size='auto', target_latency=10.)]
+
+    assert [len(dollop) for dollop in dollops] == [1, 2, 4, 8, 16, 32, 37]
+    pd.testing.assert_frame_equal(pd.concat(dollops), df)
+
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(group_by='a'), dict(serving_bytes=100)])
+def test_serve_pandas_auto_bad_args_raise_error(kwargs):
+    with pytest.raises((TypeError, ValueError)):
+        _ = [*serve(pd.DataFrame({'a': range(10)}), serving_size='auto', **kwargs)]
@@ -0,0 +1,120 @@
+import mmap
+import numpy as np
+import pandas as pd
+import pytest
+
+from dollop.parallel import serve_map
+
+
+def helper_sum(dollop):
+    return dollop.sum()
+
+
+def helper_len(dollop):
+    return len(dollop)
+
+
+def helper_shape(dollop):
+    return dollop.shape
+
+
+def helper_identity(dollop):
+    return dollop
+
+
+def helper_fail(dollop):
+    raise KeyError('bad dollop')
+
+
+@pytest.mark.parametrize("dim", (0, 1, 2))
+@pytest.mark.parametrize("serving_size", (1, 3, 100))
+def test_serve_map_numpy_by_serving_size(dim, serving_size):
+    array = np.random.random(size=(10, 7, 5))
+
+    results = [*serve_map(helper_identity, array, serving_size=serving_size, workers=2, dim=dim)]
+
+    np.testing.assert_array_equal(np.concatenate(results, axis=dim), array)
+    assert all(r.shape[dim] == serving_size for r in results[:-1])
+
+
+@pytest.mark.parametrize("n_servings", (1, 3, 20))
+def test_serve_map_numpy_by_n_servings(n_servings):
+    array = np.arange(20 * 3).reshape(20, 3)
+
+    results = [*serve_map(helper_sum, array, n_servings=n_servings, workers=2)]
+
+    expected = [d.sum() for d in np.array_split(array, n_servings)]
+    assert results == expected
+
+
+def test_serve_map_numpy_unordered():
+    array = np.arange(1000)
+
+    results = [*serve_map(helper_sum, array, serving_size=7, workers=3, ordered=False)]
+
+    expected = [array[i:i + 7].sum() for i in range(0, 1000, 7)]
+    assert sorted(results) == sorted(expected)
+
+
+def test_serve_map_pandas():
+    df = pd.DataFrame({'a': range(25), 'b': [str(i) for i in range(25)]})
+
+    results = [*serve_map(helper_identity, df, serving_size=4, workers=2)]
+
+    assert all(isinstance(r, pd.DataFrame) for r in results)
+    assert pd.concat(results).equals(df)
+
+
+def helper_is_shared(dollop):
+    # Columns rebuilt from shared memory are views of its buffer, rather than arrays owning their data.
+    array = dollop.to_numpy()
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return isinstance(array.base, mmap.mmap)
+
+
+def test_serve_map_pandas_mixed_columns():
+    df = pd.DataFrame({'a': range(25), 'b': [str(i) for i in range(25)], 'c': np.arange(25.) / 3,
+                       'd': pd.array(range(25), dtype='Int64'), 'e': pd.date_range('2020', periods=25)},
+                      index=range(100, 125))
+    df.columns = ['a', 'b', 'c', 'd', 'a']
+
+    results = [*serve_map(helper_identity, df, serving_size=4, workers=2)]
+
+    pd.testing.assert_frame_equal(pd.concat(results), df)
+
+
+def test_serve_map_pandas_series_is_shared():
+    series = pd.Series(np.arange(25.), name='x')
+
+    results = [*serve_map(helper_identity, series, serving_size=7, workers=2)]
+    pd.testing.assert_series_equal(pd.concat(results), series)
+
+    assert all(serve_map(helper_is_shared, series, serving_size=7, workers=2))
+
+
+def test_serve_map_pandas_index_raises_error():
+    with pytest.raises(TypeError):
+        _ = [*serve_map(helper_len, pd.Index(range(10)), serving_size=2, workers=2)]
+
+
+@pytest.mark.parametrize("items", ('Dolloping all day long', list(range(20)), tuple(range(20))))
+def test_serve_map_sequence(items):
+    results = [*serve_map(helper_identity, items, serving_size=6, workers=2)]
+    assert results == [items[i:i + 6] for i in range(0, len(items), 6)]
+
+
+def test_serve_map_generator():
+    results = [*serve_map(helper_len, (i for i in range(10)), serving_size=4, workers=2)]
+    assert results == [4, 4, 2]
+
+
+def test_serve_map_object_array_is_not_shared():
+    array = np.array([{'a': i} for i in range(5)], dtype=object)
+    results = [*serve_map(helper_shape, array, serving_size=2, workers=2)]
+    assert results == [(2,), (2,), (1,)]
+
+
+def test_serve_map_raises_worker_errors():
+    with pytest.raises(KeyError):
+        _ = [*serve_map(helper_fail, np.arange(10), serving_size=2, workers=2)]
@@ -99,3 +99,119 @@ def test_non_sequence_raises_error(non_sequence_type, non_sequences):
         _ = [*serve(non_sequence, serving_size=10)]
     with pytest.raises(NotImplementedError):
         _ = [*serve(non_sequence, n_servings=10)]
+
+
+@pytest.mark.parametrize('sequence_type', ('list', 'tuple', 'str', 'range', 'bytes', 'bytearray'))
+@pytest.mark.parametrize("n_servings", [1, 2, 3, 5])
+def test_serve_sequence_by_weights(n_servings, sequence_type, sequence_creators):
+    items = sequence_creators[sequence_type](n=20)
+    weights = [100 if i < 4 else 1 for i in range(20)]
+
+    dollops = [*serve(items, n_servings=n_servings, weights=weights)]
+
+    assert len(dollops) == n_servings
+    assert all(isinstance(d, type(items)) for d in dollops)
+    assert [x for d in dollops for x in d] == list(items)
+    if n_servings == 2:
+        # Half of the weight is in the first two items.
+        assert len(dollops[0]) == 2
+
+
+def test_serve_sequence_by_weight_function():
+    items = ['a' * 10, 'b', 'c', 'd' * 8, 'e', 'f']
+    assert [*serve(items, n_servings=2, weights=len)] == [items[:2], items[2:]]
+
+
+def test_serve_sequence_weights_with_serving_size_raises_error():
+    with pytest.raises(ValueError):
+        _ = [*serve([1, 2, 3], serving_size=2, weights=[1, 1, 1])]
+
+
+@pytest.mark.parametrize('sequence_type', ('list', 'tuple', 'str', 'range', 'bytes', 'bytearray'))
+@pytest.mark.parametrize('max_cost', [1, 3, 10, 100])
+def test_serve_sequence_by_max_cost(max_cost, sequence_type, sequence_creators):
+    items = sequence_creators[sequence_type](n=20)
+    costs = [i % 4 for i in range(20)]
+
+    dollops = [*serve(items, max_cost=max_cost, cost=costs)]
+
+    assert all(isinstance(d, type(items)) for d in dollops)
+    assert [x for d in dollops for x in d] == list(items)
+
+    sizes = [len(d) for d in dollops]
+    starts = [sum(sizes[:i]) for i in range(len(sizes))]
+    for start, size in zip(starts, sizes):
+        dollop_cost = sum(costs[start:start + size])
+        assert size == 1 or dollop_cost <= max_cost
+        # Greedy: the next item would not have fitted.
+        if start + size < 20:
+            assert dollop_cost + costs[start + size] > max_cost
+
+
+def test_serve_sequence_by_max_cost_function():
+    items = ['aaaa', 'bb', 'cccccccc', 'd', 'eee', 'ff']
+    assert [*serve(items, max_cost=6)] == [['aaaa', 'bb'], ['cccccccc'], ['d', 'eee', 'ff']]
+    assert [*serve(items, max_cost=2, cost=lambda x: 1)] == [items[0:2], items[2:4], items[4:6]]
+
+
+def test_serve_sequence_by_max_cost_with_lookahead():
+    items = ['aaaa', 'ccc', 'bbbb', 'dd', 'eee']
+
+    greedy = [*serve(items, max_cost=6)]
+    packed = [*serve(items, max_cost=6, lookahead=3)]
+
+    assert greedy == [['aaaa'], ['ccc'], ['bbbb', 'dd'], ['eee']]
+    assert packed == [['aaaa', 'dd'], ['ccc', 'eee'], ['bbbb']]
+    assert sorted(x for d in packed for x in d) == sorted(items)
+    assert all(sum(map(len, d)) <= 6 for d in packed)
+
+
+def test_serve_string_by_max_cost_with_lookahead():
+    costs = [1, 2, 2, 1, 1, 1, 3, 1, 1, 1]
+    assert [*serve('abcdefghij', max_cost=3, cost=costs, lookahead=2)] == ['ab', 'cd', 'ef', 'g', 'hij']
+    assert [*serve(range(4), max_cost=2, cost=[2, 1, 2, 1], lookahead=2)] == [[0], [1, 3], [2]]
+    assert [*serve(range(3), max_cost=5, cost=[1, 1, 1], lookahead=2)] == [[0, 1, 2]]
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(serving_size=2), dict(n_servings=2), dict(weights=[1, 1, 1]), dict(cost=[1, 1]), dict(lookahead=-1),
+])
+def test_serve_sequence_by_max_cost_bad_args_raise_error(kwargs):
+    with pytest.raises(ValueError):
+        _ = [*serve([1, 2, 3], max_cost=2, **kwargs)]
+
+
+@pytest.mark.parametrize('sequence_type', ('list', 'tuple', 'str', 'range', 'bytes', 'bytearray'))
+@pytest.mark.parametrize('window, step', [(1, 1), (5, 1), (5, 3), (8, 8), (30, 1)])
+def test_serve_sequence_by_window(window, step, sequence_type, sequence_creators):
+    items = sequence_creators[sequence_type](n=20)
+
+    dollops = [*serve(items, window=window, step=step)]
+
+    assert dollops == [items[i:i + window] for i in range(0, 20 - window + 1, step)]
+
+
+@pytest.mark.parametrize('kwargs', [dict(serving_size=2), dict(n_servings=2), dict(max_cost=2), dict(step=0)])
+def test_serve_sequence_by_window_bad_args_raise_error(kwargs):
+    with pytest.raises(ValueError):
+        _ = [*serve([1, 2, 3], window=2, **kwargs)]
+
+
+@pytest.mark.parametrize('sequence_type', ['list', 'tuple', 'str', 'range'])
+def test_serve_sequence_auto(sequence_type, sequence_creators):
+    items = sequence_creators[sequence_type](n=100)
+
+    # A quick consumer never gets near the target, so the dollops double in size.
+    dollops = [*serve(items, serving_size='auto', target_latency=10.)]
+
+    assert [len(dollop) for dollop in dollops] == [1, 2, 4, 8, 16, 32, 37]
+    assert [item for dollop in dollops for item in dollop] == list(items)
+
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(target_latency=0.1, n_servings=2),
+                                    dict(target_latency=0.1, max_serving_size=0),
+                                    dict(target_latency=0.1, weights=[1] * 3),
+                                    dict(target_latency=0.1, window=2)])
+def test_serve_sequence_auto_bad_args_raise_error(kwargs):
+    with pytest.raises(ValueError):
+        _ = [*serve([1, 2, 3], serving_size='auto', **kwargs)]
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+import torch
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from dollop import DollopRecord, ServingStats, serve
+from dollop.stats import instrument
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+def test_instrument_records_production_and_consumption():
+    clock = FakeClock()
+
+    def slow_dollops():
+        for i in range(3):
+            clock.now += 0.02
+            yield [i] * (i + 1)
+
+    stats = ServingStats()
+    records = []
+    for _ in instrument(slow_dollops(), stats, on_dollop=records.append, clock=clock):
+        clock.now += 0.04
+
+    assert stats.records == records
+    assert [r.index for r in records] == [0, 1, 2]
+    assert [r.n_items for r in records] == [1, 2, 3]
+    assert all(r.n_bytes is None for r in records)
+    assert all(r.produce_seconds == pytest.approx(0.02) for r in records)
+    assert all(r.consume_seconds == pytest.approx(0.04) for r in records)
+
+    assert stats.n_dollops == 3
+    assert stats.n_items == 6
+    assert stats.elapsed_seconds == pytest.approx(stats.produce_seconds + stats.consume_seconds)
+    assert stats.items_per_second == pytest.approx(6 / stats.elapsed_seconds)
+    assert stats.produce_fraction == pytest.approx(1 / 3)
+
+
+def test_instrument_reports_last_dollop_and_closes_source_when_consumer_stops():
+    closed = []
+
+    def dollops():
+        try:
+            yield from ([i] for i in range(10))
+        finally:
+            closed.append(True)
+
+    stats = ServingStats(keep_records=False)
+    instrumented = instrument(dollops(), stats)
+    next(instrumented)
+    next(instrumented)
+    instrumented.close()
+
+    assert stats.n_dollops == 2
+    assert stats.records == []
+    assert closed == [True]
+
+
+def test_empty_stats():
+    stats = ServingStats()
+    assert stats.items_per_second == stats.bytes_per_second == stats.produce_fraction == 0
+    assert 'n_dollops=0' in repr(stats)
+
+
+@pytest.mark.parametrize('obj, kwargs, n_items, n_bytes', [
+    (list(range(10)), dict(), [4, 4, 2], [None] * 3),
+    ('abcdefghij', dict(), [4, 4, 2], [4, 4, 2]),
+    (np.zeros((10, 3)), dict(), [4, 4, 2], [96, 96, 48]),
+    (np.zeros((3, 10), dtype=np.int8), dict(dim=1), [4, 4, 2], [12, 12, 6]),
+    (torch.zeros(3, 10), dict(dim=1), [4, 4, 2], [48, 48, 24]),
+    (pd.Series(np.zeros(10)), dict(), [4, 4, 2], [pd.Series(np.zeros(n)).memory_usage() for n in (4, 4, 2)]),
+    (pa.table({'a': np.zeros(10)}), dict(), [4, 4, 2], [32, 32, 16]),
+    (iter(range(10)), dict(), [4, 4, 2], [None] * 3),
+])
+def test_serve_with_stats(obj, kwargs, n_items, n_bytes):
+    stats = ServingStats()
+    records = []
+
+    dollops = [*serve(obj, serving_size=4, stats=stats, on_dollop=records.append, **kwargs)]
+
+    assert len(dollops) == 3
+    assert stats.records == records
+    assert all(isinstance(r, DollopRecord) for r in records)
+    assert [r.n_items for r in records] == n_items
+    assert [r.n_bytes for r in records] == n_bytes
+
+
+@pytest.mark.parametrize('mode, kwargs, n_items', [
+    ('lines', dict(), [3, 3, 1]),
+    ('lines', dict(as_list=True), [3, 3, 1]),
+    ('lines', dict(mmap=True), [3, 3, 1]),
+    ('chars', dict(), [3, 3, 3, 3, 3, 2]),
+])
+def test_serve_file_with_stats_counts_lines(mode, kwargs, n_items):
+    with TemporaryDirectory() as td:
+        file_path = Path(td) / 'content.txt'
+        file_path.write_text('ab\ncd\nef\ngh\n\nij\nk')
+
+        stats = ServingStats()
+        _ = [*serve(file_path, serving_size=3, mode=mode, stats=stats, **kwargs)]
+
+    assert [r.n_items for r in stats.records] == n_items
+    # Lists of lines are not measured.
+    assert stats.n_bytes == (0 if kwargs.get('as_list') else 17)
+
+
+def test_serve_with_stats_and_prefetch():
+    stats = ServingStats()
+    assert [*serve(list(range(10)), serving_size=3, prefetch=2, stats=stats)] == \
+           [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]]
+    assert stats.n_dollops == 4
+    assert stats.n_items == 10
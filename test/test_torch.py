@@ -1,8 +1,10 @@
+import time
+
 import numpy as np
 import pytest
 
 import torch
-from dollop.torch import serve
+from dollop.torch import _transfer, serve, serve_tiles, stitch
 
 sizes = (
     (1,),
@@ -102,3 +104,161 @@ def test_serve_torch_non_tensor_obj_raises_error(bad_input):
         _ = [*serve(bad_input, serving_size=5)]
     with pytest.raises(TypeError):
         _ = [*serve(bad_input, n_servings=5)]
+
+
+@pytest.mark.parametrize("tensor", arrays)
+@pytest.mark.parametrize("dim", [0, 1, 2])
+@pytest.mark.parametrize("serving_bytes", [1, 8, 100, 8000, 10 ** 9])
+def test_serve_torch_by_serving_bytes(tensor, dim, serving_bytes):
+    if tensor.ndim <= dim:
+        return
+
+    dollops = [*serve(tensor, serving_bytes=serving_bytes, dim=dim)]
+
+    row_bytes = tensor.element_size() * tensor.numel() // tensor.shape[dim]
+    expected_serving_size = max(serving_bytes // row_bytes, 1)
+    assert all(d.shape[dim] == expected_serving_size for d in dollops[:-1])
+    assert all(d.element_size() * d.numel() <= serving_bytes for d in dollops if d.shape[dim] > 1)
+    np.testing.assert_array_equal(torch.cat(dollops, dim=dim).numpy(), tensor.numpy())
+
+
+@pytest.mark.parametrize("kwargs", [
+    {'serving_bytes': 100, 'serving_size': 1},
+    {'serving_bytes': 100, 'n_servings': 1},
+    {'serving_bytes': 0},
+])
+def test_serve_torch_invalid_serving_bytes_raises(kwargs):
+    with pytest.raises(ValueError):
+        _ = [*serve(torch.zeros(10), **kwargs)]
+
+
+@pytest.mark.parametrize("device", ['cpu', torch.device('cpu')])
+@pytest.mark.parametrize("pin_memory", [False, True])
+@pytest.mark.parametrize("dim", [0, 1])
+@pytest.mark.parametrize("serving_size", [1, 7, 200])
+def test_serve_torch_to_device(device, pin_memory, dim, serving_size):
+    tensor = torch.rand(101, 13, 3)
+
+    dollops = [*serve(tensor, serving_size=serving_size, dim=dim, device=device, pin_memory=pin_memory)]
+    expected = [*serve(tensor, serving_size=serving_size, dim=dim)]
+
+    assert len(dollops) == len(expected)
+    assert all(d.device == torch.device(device) for d in dollops)
+    assert all(torch.equal(d, e) for d, e in zip(dollops, expected))
+
+
+def test_serve_torch_transfer_runs_one_dollop_ahead():
+    tensor = torch.rand(10, 3)
+    moved = []
+
+    class Recorder:
+        def __init__(self, dollop):
+            self.dollop = dollop
+
+        def to(self, device, non_blocking=False):
+            moved.append(non_blocking)
+            return self.dollop
+
+    dollops = _transfer((Recorder(d) for d in tensor.split(2)), tensor, 6, device='cpu')
+
+    first = next(dollops)
+    assert torch.equal(first, tensor[:2])
+    assert moved == [True, True]
+
+
+def test_serve_torch_auto_to_device_times_the_consumer():
+    tensor = torch.rand(10, 3)
+
+    # Each dollop takes the consumer longer than the target, so the sizes never grow past the minimum. Were the
+    # next dollop taken before the consumer finished with this one, it would be timed as instant, and grow.
+    sizes = []
+    for dollop in serve(tensor, serving_size='auto', target_latency=0.001, device='cpu'):
+        time.sleep(0.01)
+        sizes.append(len(dollop))
+
+    assert sizes == [1] * 10
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="CUDA is not available")
+@pytest.mark.parametrize("dim", [0, 1])
+def test_serve_torch_to_cuda_pinned(dim):
+    tensor = torch.rand(101, 13, 3)
+
+    dollops = [d.cpu() for d in serve(tensor, serving_size=7, dim=dim, device='cuda', pin_memory=True)]
+
+    assert torch.equal(torch.cat(dollops, dim=dim), tensor)
+
+
+@pytest.mark.parametrize("dim", [0, 1])
+@pytest.mark.parametrize("n_servings", [1, 2, 3, 7])
+def test_serve_torch_by_weights(dim, n_servings):
+    tensor = torch.rand(20, 30)
+    weights = torch.arange(tensor.shape[dim])
+
+    dollops = [*serve(tensor, n_servings=n_servings, dim=dim, weights=weights)]
+
+    assert len(dollops) == n_servings
+    assert torch.equal(torch.cat(dollops, dim=dim), tensor)
+
+    # Heavier items come later, so later dollops hold fewer of them.
+    sizes = [d.shape[dim] for d in dollops]
+    assert sizes[0] == max(sizes) and sizes[-1] == min(sizes)
+
+
+def test_serve_torch_by_weight_function():
+    tensor = torch.zeros(6, 3)
+    tensor[[0, 3]] = 1
+
+    dollops = [*serve(tensor, n_servings=2, weights=lambda row: float(row.sum()) * 10 + 1)]
+
+    assert [d.shape[0] for d in dollops] == [3, 3]
+
+
+@pytest.mark.parametrize('tile, dims, halo', [((4, 4), None, 0), ((3, 5), (2, 0), 2), ((2,), (1,), (1,))])
+def test_serve_torch_tiles(tile, dims, halo):
+    tensor = torch.rand(10, 8, 6)
+
+    pieces = [*serve_tiles(tensor, tile, dims, halo)]
+
+    for t, view in pieces:
+        assert view.untyped_storage().data_ptr() == tensor.untyped_storage().data_ptr()
+        assert torch.equal(view, tensor[t.region])
+
+    result = stitch(((t, view * 2) for t, view in pieces), torch.empty_like(tensor))
+    assert torch.equal(result, tensor * 2)
+
+
+def test_serve_torch_tiles_non_tensor_raises_error():
+    with pytest.raises(TypeError):
+        _ = [*serve_tiles(np.zeros((2, 2)), (1, 1))]
+
+
+@pytest.mark.parametrize('dim', [0, 1, 2])
+@pytest.mark.parametrize('window, step', [(1, 1), (4, 2), (5, 5)])
+def test_serve_torch_by_window(dim, window, step):
+    tensor = torch.rand(10, 9, 8)
+
+    dollops = [*serve(tensor, window=window, step=step, dim=dim)]
+
+    windows = tensor.unfold(dim, window, step)
+    assert len(dollops) == windows.shape[dim]
+    for i, dollop in enumerate(dollops):
+        assert dollop.untyped_storage().data_ptr() == tensor.untyped_storage().data_ptr()
+        assert torch.equal(dollop.movedim(dim, -1), windows.select(dim, i))
+
+
+@pytest.mark.parametrize('dim', [0, 1])
+def test_serve_torch_auto(dim):
+    tensor = torch.rand(100, 70)
+
+    # A quick consumer never gets near the target, so the dollops double in size up to max_serving_size.
+    dollops = [*serve(tensor, serving_size='auto', target_latency=10., max_serving_size=16, dim=dim)]
+
+    sizes = [dollop.shape[dim] for dollop in dollops]
+    assert sizes[:5] == [1, 2, 4, 8, 16] and set(sizes[5:-1]) == {16}
+    assert torch.equal(torch.cat(dollops, dim=dim), tensor)
+
+
+def test_serve_torch_auto_pin_memory_without_max_raises_error():
+    with pytest.raises(ValueError, match='max_serving_size'):
+        _ = [*serve(torch.zeros(10), serving_size='auto', target_latency=0.1, device='cpu', pin_memory=True)]
@@ -0,0 +1,339 @@
+import numpy as np
+import pytest
+import threading
+import time
+
+from dollop._utils import BoundaryPlan, SlicePlan, budget_bounds, calculate_adaptive_sizes, calculate_adaptive_slices, \
+    calculate_slices, calculate_tiles, calculate_weighted_slices, calculate_windows, max_adaptive_size, prefetch, \
+    prefix_sums
+
+
+def helper_reference_slices(total, serving_size=None, n_servings=None):
+    if serving_size is not None:
+        return [slice(i, min(i + serving_size, total)) for i in range(0, total, serving_size)]
+
+    base, remainder = divmod(total, n_servings)
+    slices, start = [], 0
+    for i in range(n_servings):
+        stop = start + base + (1 if i < remainder else 0)
+        slices.append(slice(start, stop))
+        start = stop
+    return slices
+
+
+@pytest.mark.parametrize("total", (0, 1, 5, 10, 13, 100))
+@pytest.mark.parametrize("size_arg", ('serving_size', 'n_servings'))
+@pytest.mark.parametrize("size", (1, 2, 3, 7, 10, 200))
+def test_slice_plan_matches_reference(total, size_arg, size):
+    plan = calculate_slices(total, **{size_arg: size})
+    expected = helper_reference_slices(total, **{size_arg: size})
+
+    assert isinstance(plan, SlicePlan)
+    assert len(plan) == len(expected)
+    assert list(plan) == expected
+    assert list(reversed(plan)) == expected[::-1]
+    assert [plan[k] for k in range(len(plan))] == expected
+    assert [plan[-k] for k in range(1, len(plan) + 1)] == [expected[-k] for k in range(1, len(expected) + 1)]
+    assert list(plan[1:]) == expected[1:]
+    assert list(plan[::-2]) == expected[::-2]
+
+    np.testing.assert_array_equal(plan.starts, [slc.start for slc in expected])
+    np.testing.assert_array_equal(plan.stops, [slc.stop for slc in expected])
+    np.testing.assert_array_equal(plan[2:].starts, [slc.start for slc in expected[2:]])
+
+    for sub_plan, sub_expected in ((plan, expected), (plan[1:], expected[1:]), (plan[::-2], expected[::-2])):
+        assert sub_plan.max_size == max((slc.stop - slc.start for slc in sub_expected), default=0)
+
+
+def test_slice_plan_index_out_of_range():
+    plan = calculate_slices(10, serving_size=3)
+    with pytest.raises(IndexError):
+        _ = plan[4]
+
+
+def test_slice_plan_is_lazy():
+    plan = calculate_slices(10 ** 15, serving_size=1)
+    assert len(plan) == 10 ** 15
+    assert plan[-1] == slice(10 ** 15 - 1, 10 ** 15)
+    assert next(iter(plan)) == slice(0, 1)
+    assert plan.max_size == 1
+
+
+@pytest.mark.parametrize("kwargs", (
+    {},
+    {'serving_size': 1, 'n_servings': 1},
+    {'serving_size': 0},
+    {'n_servings': -1},
+    {'serving_size': 1.5},
+))
+def test_calculate_slices_invalid_args(kwargs):
+    with pytest.raises(ValueError):
+        calculate_slices(10, **kwargs)
+
+
+@pytest.mark.parametrize("n_dollops", (1, 2, 10))
+@pytest.mark.parametrize("n_items", (0, 1, 5, 50))
+def test_prefetch_preserves_order(n_dollops, n_items):
+    assert list(prefetch(iter(range(n_items)), n_dollops)) == list(range(n_items))
+
+
+def test_prefetch_runs_ahead_of_consumer():
+    produced = []
+
+    def generate():
+        for i in range(10):
+            produced.append(i)
+            yield i
+
+    dollops = prefetch(generate(), 3)
+    assert next(dollops) == 0
+
+    deadline = time.monotonic() + 5
+    while len(produced) < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # One dollop consumed, up to three waiting in the queue, and one blocked on the full queue.
+    assert len(produced) == 5
+    assert list(dollops) == list(range(1, 10))
+
+
+def test_prefetch_passes_exceptions_to_consumer():
+
+    def generate():
+        yield 0
+        yield 1
+        raise KeyError('bad dollop')
+
+    dollops = prefetch(generate(), 2)
+    assert next(dollops) == 0
+    assert next(dollops) == 1
+    with pytest.raises(KeyError):
+        next(dollops)
+
+
+def test_prefetch_closes_producer_when_consumer_stops():
+    closed = threading.Event()
+
+    def generate():
+        try:
+            for i in range(1000):
+                yield i
+        finally:
+            closed.set()
+
+    dollops = prefetch(generate(), 2)
+    assert next(dollops) == 0
+    dollops.close()
+
+    assert closed.wait(timeout=5)
+
+
+@pytest.mark.parametrize("n_dollops", (0, -1, 1.5))
+def test_prefetch_invalid_size(n_dollops):
+    with pytest.raises(ValueError):
+        _ = [*prefetch(iter(range(5)), n_dollops)]
+
+
+@pytest.mark.parametrize("bounds", ([0], [0, 3], [0, 1, 5, 5, 9], np.array([0, 2, 4, 10])))
+def test_boundary_plan(bounds):
+    plan = BoundaryPlan(bounds)
+    expected = [slice(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    assert len(plan) == len(expected)
+    assert list(plan) == expected
+    assert list(reversed(plan)) == expected[::-1]
+    assert [plan[k] for k in range(len(plan))] == expected
+    assert list(plan[1:]) == expected[1:]
+    np.testing.assert_array_equal(plan.starts, [slc.start for slc in expected])
+    np.testing.assert_array_equal(plan.stops, [slc.stop for slc in expected])
+    assert plan.max_size == max((slc.stop - slc.start for slc in expected), default=0)
+
+
+@pytest.mark.parametrize("costs", ([], [1] * 10, [5, 1, 1, 8, 2, 2, 2, 20, 1], np.array([3, 3, 3, 3])))
+@pytest.mark.parametrize("budget", (1, 4, 6, 100))
+def test_budget_bounds(costs, budget):
+    bounds = budget_bounds(prefix_sums(costs), budget)
+
+    assert bounds[0] == 0 and bounds[-1] == len(costs)
+    for start, stop, next_stop in zip(bounds[:-1], bounds[1:], bounds[2:] + [None]):
+        assert stop > start
+        assert stop - start == 1 or sum(costs[start:stop]) <= budget
+        if next_stop is not None:
+            assert sum(costs[start:stop + 1]) > budget
+
+
+@pytest.mark.parametrize("weights", (
+    [],
+    [1] * 10,
+    [10, 1, 1, 1, 1, 1, 1, 1, 1, 1, 10],
+    [0, 0, 5, 0, 0],
+    np.array([3.5, 0.5, 2, 8, 1, 1, 1, 1, 1, 1]),
+    list(range(50)),
+))
+@pytest.mark.parametrize("n_servings", (1, 2, 3, 4, 7))
+def test_calculate_weighted_slices(weights, n_servings):
+    plan = calculate_weighted_slices(weights, total=len(weights), n_servings=n_servings)
+
+    assert len(plan) == n_servings
+    assert plan[0].start == 0 and plan[-1].stop == len(weights)
+    assert all(a.stop == b.start for a, b in zip(plan[:-1], plan[1:]))
+
+    # Moving any boundary by one item doesn't bring the dollop ends closer to their even shares.
+    prefix = np.concatenate(([0], np.cumsum(weights)))
+    targets = prefix[-1] * np.arange(1, n_servings) / n_servings
+    for slc, target in zip(plan, targets):
+        error = abs(prefix[slc.stop] - target)
+        assert all(error <= abs(prefix[j] - target) + 1e-9 for j in (slc.stop - 1, slc.stop + 1)
+                   if slc.start <= j <= len(weights))
+
+
+def test_calculate_weighted_slices_with_function():
+    plan = calculate_weighted_slices(len, ['a' * 10, 'b', 'c', 'd' * 8, 'e', 'f'], total=6, n_servings=2)
+    assert list(plan) == [slice(0, 2), slice(2, 6)]
+
+
+@pytest.mark.parametrize("kwargs", (
+    {'weights': [1, 2, 3], 'total': 3, 'serving_size': 1},
+    {'weights': [1, 2, 3], 'total': 3},
+    {'weights': [1, 2], 'total': 3, 'n_servings': 2},
+    {'weights': [1, -2, 3], 'total': 3, 'n_servings': 2},
+    {'weights': np.array([1, -2, 3]), 'total': 3, 'n_servings': 2},
+))
+def test_calculate_weighted_slices_invalid_args(kwargs):
+    with pytest.raises(ValueError):
+        calculate_weighted_slices(**kwargs)
+
+
+@pytest.mark.parametrize('shape, tile, dims, halo', [
+    ((10, 7), (3, 3), None, 0),
+    ((10, 7), (4, 2), (1, 0), 1),
+    ((5, 6, 7), (2, 3), (0, 2), (1, 2)),
+    ((4, 9), (9,), (1,), 20),
+])
+def test_calculate_tiles(shape, tile, dims, halo):
+    tiles = [*calculate_tiles(shape, tile, dims, halo)]
+    coverage = np.zeros(shape, dtype=int)
+    values = np.arange(np.prod(shape)).reshape(shape)
+
+    for t in tiles:
+        coverage[t.core] += 1
+        # The core of the served region is the core of the array.
+        np.testing.assert_array_equal(values[t.region][t.inner], values[t.core])
+
+    # The cores exactly cover the array.
+    assert (coverage == 1).all()
+    assert [t.index for t in tiles] == sorted(t.index for t in tiles)
+
+
+def test_calculate_tiles_halo_is_clipped():
+    tiles = [*calculate_tiles((10,), (4,), halo=1)]
+    assert [t.core for t in tiles] == [(slice(0, 4),), (slice(4, 8),), (slice(8, 10),)]
+    assert [t.region for t in tiles] == [(slice(0, 5),), (slice(3, 9),), (slice(7, 10),)]
+    assert [t.inner for t in tiles] == [(slice(0, 4),), (slice(1, 5),), (slice(1, 3),)]
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(tile=()), dict(tile=(2, 2), dims=(0,)), dict(tile=(2,), dims=(2,)), dict(tile=(2, 2), dims=(0, 0)),
+    dict(tile=(0,)), dict(tile=(2,), halo=-1), dict(tile=(2, 2), halo=(1,)),
+])
+def test_calculate_tiles_invalid_args(kwargs):
+    with pytest.raises((ValueError, TypeError)):
+        _ = [*calculate_tiles((4, 4), **kwargs)]
+
+
+@pytest.mark.parametrize('total', [0, 1, 9, 10, 100])
+@pytest.mark.parametrize('window, step', [(1, 1), (4, 1), (4, 2), (3, 5), (10, 3)])
+def test_window_plan(total, window, step):
+    plan = calculate_windows(total, window, step)
+    expected = [slice(i, i + window) for i in range(0, total - window + 1, step)]
+
+    assert list(plan) == expected
+    assert len(plan) == len(expected)
+    assert [plan[i] for i in range(-len(plan), len(plan))] == expected * 2
+    assert list(reversed(plan)) == expected[::-1]
+    assert list(plan[1::2]) == expected[1::2]
+    assert plan.starts.tolist() == [s.start for s in expected]
+    assert plan.stops.tolist() == [s.stop for s in expected]
+    assert plan.max_size == (window if expected else 0)
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(window=0), dict(window=2, step=0), dict(window=2.0), dict(window=2, serving_size=2),
+    dict(window=2, n_servings=2), dict(window=2, weights=[1] * 10),
+])
+def test_calculate_windows_invalid_args(kwargs):
+    with pytest.raises(ValueError):
+        calculate_windows(10, **kwargs)
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+def helper_adaptive_sizes(seconds_per_item, n_dollops, **kwargs):
+    # Pretend that each dollop takes seconds_per_item(i) per item to produce and consume.
+    clock = FakeClock()
+    sizes = calculate_adaptive_sizes(clock=clock, **kwargs)
+    result = []
+    for i in range(n_dollops):
+        size = next(sizes)
+        result.append(size)
+        clock.now += seconds_per_item(i) * size
+    return result
+
+
+def test_adaptive_sizes_ramp_up_to_target():
+    sizes = helper_adaptive_sizes(lambda i: 0.001, 12, target_latency=0.1)
+    assert sizes == [1, 2, 4, 8, 16, 32, 64, 100, 100, 100, 100, 100]
+
+
+def test_adaptive_sizes_respect_bounds():
+    assert helper_adaptive_sizes(lambda i: 0.001, 10, target_latency=0.1, max_serving_size=50)[-3:] == [50] * 3
+    assert helper_adaptive_sizes(lambda i: 1., 5, target_latency=0.1, min_serving_size=3) == [3] * 5
+
+
+def test_adaptive_sizes_shrink_when_consumer_slows():
+    sizes = helper_adaptive_sizes(lambda i: 0.001 if i < 10 else 0.01, 30, target_latency=0.1)
+    assert sizes[9] == 100
+    assert sizes[-1] == 10
+    # The smoothing spreads the change over several dollops.
+    assert sizes[10] > sizes[11] > sizes[12] > 10
+
+
+def test_adaptive_sizes_grow_without_limit_when_instant():
+    assert helper_adaptive_sizes(lambda i: 0., 5, target_latency=0.1) == [1, 2, 4, 8, 16]
+
+
+@pytest.mark.parametrize("total", (0, 1, 10, 1000))
+def test_calculate_adaptive_slices_cover_total(total):
+    slices = list(calculate_adaptive_slices(total, target_latency=1e-3, max_serving_size=64))
+    assert [i for slc in slices for i in range(total)[slc]] == list(range(total))
+    assert all(0 < slc.stop - slc.start <= 64 for slc in slices)
+
+
+@pytest.mark.parametrize("kwargs", (
+    dict(target_latency=None),
+    dict(target_latency=0),
+    dict(target_latency=-1.),
+    dict(target_latency=0.1, n_servings=3),
+    dict(target_latency=0.1, min_serving_size=0),
+    dict(target_latency=0.1, min_serving_size=1.5),
+    dict(target_latency=0.1, min_serving_size=10, max_serving_size=5),
+    dict(target_latency=0.1, smoothing=0),
+))
+def test_calculate_adaptive_sizes_invalid_args(kwargs):
+    with pytest.raises(ValueError):
+        calculate_adaptive_sizes(**kwargs)
+
+
+def test_max_adaptive_size():
+    assert max_adaptive_size(10, 100, 'out') == 10
+    assert max_adaptive_size(10, 4, 'out') == 4
+    with pytest.raises(ValueError, match='out'):
+        max_adaptive_size(None, 100, 'out')